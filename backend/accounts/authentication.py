@@ -0,0 +1,165 @@
+"""JWT authentication that avoids loading the user row on every request.
+
+Tokens issued by ``LoginSerializer`` carry the user's ``auth_version``.
+``CachedJWTAuthentication`` keeps a snapshot of the fields the API reads, keyed
+by ``(user id, auth_version)``, for ``AUTH_USER_CACHE_TTL`` seconds and rebuilds a
+``User`` from it; other columns load lazily if something touches them.
+``ClaimsJWTAuthentication`` never touches the database: it returns a
+``TokenUser`` exposing the token's ``user_id``, ``email`` and ``role`` claims, for
+endpoints that need nothing else.
+
+Changing a user's email, role, active or staff flags bumps ``auth_version``
+(see ``User.save``). ``accounts.signals`` then drops the cached snapshot and
+records the new version, so tokens minted for the old state are rejected by
+both classes. When the record is missing (evicted, or never written to this
+process's cache), ``ClaimsJWTAuthentication`` reads the version from the
+database once and caches it. With a per-process cache a change is still only
+visible at once to the process that made it; use a shared cache when running
+several workers.
+"""
+
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+
+VERSION_CLAIM = "auth_version"
+CACHED_FIELDS = (
+    "id",
+    "email",
+    "first_name",
+    "last_name",
+    "role",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+    "auth_version",
+)
+
+
+def get_cache():
+    return caches[getattr(settings, "AUTH_USER_CACHE", "default")]
+
+
+def user_cache_key(user_id, version) -> str:
+    return f"auth:user:{user_id}:{version}"
+
+
+def version_cache_key(user_id) -> str:
+    return f"auth:user:{user_id}:version"
+
+
+def cache_timeout() -> int:
+    return getattr(settings, "AUTH_USER_CACHE_TTL", 60)
+
+
+def forget_user(user: User, *, deleted: bool = False) -> None:
+    """Drop cached snapshots of ``user`` and publish the version tokens must carry.
+
+    Deleted users get a version no token carries.
+    """
+    cache = get_cache()
+    cache.delete_many(
+        [
+            user_cache_key(user.pk, version)
+            for version in (user.auth_version, user.auth_version - 1)
+        ]
+    )
+    # Tokens live no longer than the refresh lifetime, so neither does the record.
+    lifetime = int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+    cache.set(version_cache_key(user.pk), 0 if deleted else user.auth_version, lifetime)
+
+
+def current_version(user_id) -> int:
+    """The ``auth_version`` tokens for ``user_id`` must carry; 0 if the user is gone."""
+    cache = get_cache()
+    key = version_cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = (
+            User.objects.filter(pk=user_id)
+            .values_list("auth_version", flat=True)
+            .first()
+            or 0
+        )
+        # add() keeps a newer version that forget_user() published meanwhile.
+        cache.add(
+            key, version, int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+        )
+    return version
+
+
+def snapshot(user: User) -> dict:
+    return {name: getattr(user, name) for name in CACHED_FIELDS}
+
+
+def user_from_snapshot(values: dict) -> User:
+    names = [
+        field.attname for field in User._meta.concrete_fields if field.attname in values
+    ]
+    return User.from_db(DEFAULT_DB_ALIAS, names, [values[name] for name in names])
+
+
+def token_identity(validated_token):
+    try:
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError as exc:
+        raise InvalidToken(
+            _("Token contained no recognizable user identification")
+        ) from exc
+    return user_id, validated_token.get(VERSION_CLAIM)
+
+
+def revoked() -> AuthenticationFailed:
+    return AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` resolving users from a short-TTL cache."""
+
+    def get_user(self, validated_token):
+        user_id, version = token_identity(validated_token)
+        if version is None:
+            # Tokens minted before auth_version existed.
+            return super().get_user(validated_token)
+
+        cache = get_cache()
+        key = user_cache_key(user_id, version)
+        values = cache.get(key)
+        if values is not None:
+            return user_from_snapshot(values)
+
+        try:
+            user = User.objects.only(*CACHED_FIELDS).get(pk=user_id)
+        except User.DoesNotExist as exc:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            ) from exc
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if user.auth_version != version:
+            raise revoked()
+        cache.set(key, snapshot(user), cache_timeout())
+        return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """Authenticate from token claims alone; ``request.user`` is a ``TokenUser``.
+
+    Suitable for endpoints that read nothing beyond ``pk``, ``email`` and ``role``.
+    """
+
+    def get_user(self, validated_token):
+        user_id, version = token_identity(validated_token)
+        if version != current_version(user_id):
+            raise revoked()
+        return TokenUser(validated_token)
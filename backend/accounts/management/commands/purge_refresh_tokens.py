@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import RefreshTokenFamily
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired and revoked refresh-token families. "
+        "Run it from cron, e.g. hourly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of families deleted per statement.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        expired = RefreshTokenFamily.objects.filter(expires_at__lte=timezone.now())
+        deleted = 0
+        while True:
+            batch = list(
+                expired.order_by("expires_at").values_list("pk", flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            deleted += RefreshTokenFamily.objects.filter(pk__in=batch).delete()[0]
+        self.stdout.write(
+            self.style.SUCCESS(f"Purged {deleted} refresh-token families.")
+        )
@@ -0,0 +1,67 @@
+from django.db import migrations
+from django.utils import timezone
+
+from accounts.tokens import legacy_family_id
+
+OUTSTANDING = "token_blacklist_outstandingtoken"
+BLACKLISTED = "token_blacklist_blacklistedtoken"
+
+
+def revoke_blacklisted_tokens(apps, schema_editor):
+    """Give every unexpired, already rotated pre-family token a revoked family.
+
+    ``FamilyRefreshToken.adopt_legacy`` would otherwise accept such a token once,
+    since the blacklist recording its rotation is dropped below.
+    """
+    connection = schema_editor.connection
+    if BLACKLISTED not in connection.introspection.table_names():
+        return
+    RefreshTokenFamily = apps.get_model("accounts", "RefreshTokenFamily")
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT o.jti, o.user_id, o.expires_at FROM {OUTSTANDING} o "
+            f"JOIN {BLACKLISTED} b ON b.token_id = o.id "
+            "WHERE o.user_id IS NOT NULL AND o.expires_at > %s",
+            [now],
+        )
+        rows = cursor.fetchall()
+    RefreshTokenFamily.objects.bulk_create(
+        [
+            RefreshTokenFamily(
+                id=legacy_family_id(jti),
+                user_id=user_id,
+                expires_at=now,
+                revoked_at=now,
+            )
+            for jti, user_id, _expires_at in rows
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+    """Drop the tables of the uninstalled ``rest_framework_simplejwt.token_blacklist``.
+
+    Refresh rotation is tracked by ``RefreshTokenFamily`` since 0003. The tables
+    are absent on databases created after that, hence ``IF EXISTS``. Dropping
+    them cannot be undone; reinstalling the app and migrating it recreates them
+    empty.
+    """
+
+    dependencies = [
+        ("accounts", "0003_refresh_token_family"),
+    ]
+
+    operations = [
+        migrations.RunPython(revoke_blacklisted_tokens, migrations.RunPython.noop),
+        migrations.RunSQL(
+            [
+                f"DROP TABLE IF EXISTS {BLACKLISTED}",
+                f"DROP TABLE IF EXISTS {OUTSTANDING}",
+                "DELETE FROM django_migrations WHERE app = 'token_blacklist'",
+            ],
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,3 +1,6 @@
+import uuid
+
+from django.conf import settings
 from django.contrib.auth.base_user import AbstractBaseUser, BaseUserManager
 from django.contrib.auth.models import PermissionsMixin
 from django.core.validators import EmailValidator
@@ -58,6 +61,11 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     date_joined = models.DateTimeField(default=timezone.now)
+    # Embedded in issued tokens; bumped whenever a field below changes so cached
+    # users and outstanding tokens for the old state stop authenticating.
+    auth_version = models.PositiveIntegerField(default=1)
+
+    AUTH_STATE_FIELDS = ("email", "role", "is_active", "is_staff", "is_superuser")
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS: list[str] = []
@@ -69,3 +77,57 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     def __str__(self) -> str:  # pragma: no cover - simple representation
         return self.email
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_auth_state = instance.auth_state()
+        return instance
+
+    def auth_state(self) -> dict:
+        loaded = self.__dict__
+        return {name: loaded[name] for name in self.AUTH_STATE_FIELDS if name in loaded}
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, "_loaded_auth_state", None)
+        current = self.auth_state()
+        self._auth_state_changed = loaded is not None and any(
+            loaded[name] != current[name] for name in loaded
+        )
+        if self._auth_state_changed:
+            self.auth_version += 1
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "auth_version"}
+        super().save(*args, **kwargs)
+        self._loaded_auth_state = self.auth_state()
+
+
+class RefreshTokenFamily(models.Model):
+    """One row per login session, shared by every refresh token rotated from it.
+
+    Refresh tokens carry the family id and the generation they were issued at.
+    Rotating advances ``generation`` with a conditional update, so presenting an
+    older generation means the token was replayed and the whole family is revoked.
+    Revoking also expires the row, leaving ``expires_at`` as the only column the
+    purge job needs.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="refresh_token_families",
+        on_delete=models.CASCADE,
+    )
+    generation = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["expires_at"], name="refresh_family_expires_idx")
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover - simple representation
+        return f"{self.user_id}:{self.pk}@{self.generation}"
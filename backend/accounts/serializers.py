@@ -1,7 +1,9 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 from .models import User
+from .tokens import FamilyRefreshToken
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -12,6 +14,7 @@ class UserSerializer(serializers.ModelSerializer):
 
 class LoginSerializer(TokenObtainPairSerializer):
     username_field = "email"
+    token_class = FamilyRefreshToken
 
     def validate(self, attrs):
         attrs[self.username_field] = attrs.get(self.username_field, "")
@@ -25,9 +28,24 @@ class LoginSerializer(TokenObtainPairSerializer):
         token = super().get_token(user)
         token["role"] = user.role
         token["email"] = user.email
+        token["auth_version"] = user.auth_version
         return token
 
 
+class RefreshSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+    access = serializers.CharField(read_only=True)
+
+    def validate(self, attrs):
+        try:
+            refresh = FamilyRefreshToken(attrs["refresh"])
+            access = str(refresh.access_token)
+            refresh.rotate()
+        except TokenError as exc:
+            raise InvalidToken(str(exc)) from exc
+        return {"access": access, "refresh": str(refresh)}
+
+
 class LogoutSerializer(serializers.Serializer):
     refresh = serializers.CharField()
 
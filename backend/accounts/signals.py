@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import forget_user
+from .models import User
+from .tokens import revoke_user_sessions
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_user(sender, instance: User, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    forget_user(instance)
+    if getattr(instance, "_auth_state_changed", False):
+        revoke_user_sessions(instance)
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user(sender, instance: User, **kwargs):
+    forget_user(instance, deleted=True)
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import RefreshTokenFamily, User, UserRole
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="broker@example.com", password="pass1234", first_name="Broker"
+        )
+
+    def login(self) -> APIClient:
+        client = APIClient()
+        response = client.post(
+            "/auth/login/",
+            {"email": self.user.email, "password": "pass1234"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return client
+
+    def test_user_is_served_from_cache_after_first_request(self):
+        client = self.login()
+        with self.assertNumQueries(1):
+            first = client.get("/users/me/")
+        with self.assertNumQueries(0):
+            second = client.get("/users/me/")
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(second.data["first_name"], "Broker")
+
+    def test_role_change_and_deactivation_revoke_tokens(self):
+        client = self.login()
+        client.get("/users/me/")
+
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = "Renamed"
+        user.save()
+        refreshed = client.get("/users/me/")
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertEqual(refreshed.data["first_name"], "Renamed")
+
+        user.role = UserRole.OFFICER
+        user.save()
+        self.assertEqual(client.get("/users/me/").status_code, 401)
+
+        client = self.login()
+        self.assertEqual(client.get("/users/me/").data["role"], UserRole.OFFICER)
+        user.is_active = False
+        user.save(update_fields=["is_active"])
+        self.assertEqual(client.get("/users/me/").status_code, 401)
+        self.assertEqual(client.get("/me/invitations/").status_code, 401)
+
+    def test_claims_only_endpoint_skips_user_query(self):
+        client = self.login()
+        # Only the invitation query itself; the user comes from the token claims.
+        with self.assertNumQueries(1):
+            response = client.get("/me/invitations/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_claims_check_database_version_when_record_is_missing(self):
+        client = self.login()
+        User.objects.filter(pk=self.user.pk).update(
+            email="moved@example.com", auth_version=2
+        )
+        cache.clear()
+
+        # One query reads the version; the rejection is then served from the cache.
+        with self.assertNumQueries(1):
+            self.assertEqual(client.get("/me/invitations/").status_code, 401)
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get("/me/invitations/").status_code, 401)
+
+
+class RefreshTokenFamilyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="broker@example.com", password="pass1234"
+        )
+        self.client = APIClient()
+
+    def login(self) -> str:
+        response = self.client.post(
+            "/auth/login/",
+            {"email": self.user.email, "password": "pass1234"},
+            format="json",
+        )
+        return response.data["refresh"]
+
+    def refresh(self, token: str):
+        return self.client.post("/auth/refresh/", {"refresh": token}, format="json")
+
+    def test_rotation_uses_one_row_per_session(self):
+        token = self.login()
+        for _ in range(5):
+            with self.assertNumQueries(1):
+                response = self.refresh(token)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("access", response.data)
+            token = response.data["refresh"]
+
+        family = RefreshTokenFamily.objects.get()
+        self.assertEqual(family.generation, 5)
+        self.assertIsNone(family.revoked_at)
+
+    def test_reused_refresh_token_revokes_the_family(self):
+        first = self.login()
+        second = self.refresh(first).data["refresh"]
+
+        self.assertEqual(self.refresh(first).status_code, 401)
+        self.assertEqual(self.refresh(second).status_code, 401)
+        self.assertIsNotNone(RefreshTokenFamily.objects.get().revoked_at)
+
+    def test_logout_and_auth_changes_revoke_sessions(self):
+        logged_out = self.login()
+        access = self.client.post(
+            "/auth/login/",
+            {"email": self.user.email, "password": "pass1234"},
+            format="json",
+        ).data["access"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        self.assertEqual(
+            self.client.post(
+                "/auth/logout/", {"refresh": logged_out}, format="json"
+            ).status_code,
+            205,
+        )
+        self.client.credentials()
+        self.assertEqual(self.refresh(logged_out).status_code, 401)
+
+        other = self.login()
+        user = User.objects.get(pk=self.user.pk)
+        user.role = UserRole.OFFICER
+        user.save()
+        self.assertEqual(self.refresh(other).status_code, 401)
+
+    def test_pre_family_token_is_adopted_once(self):
+        legacy = str(RefreshToken.for_user(self.user))
+
+        response = self.refresh(legacy)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(response.data["refresh"]).status_code, 200)
+
+        self.assertEqual(self.refresh(legacy).status_code, 401)
+        self.assertIsNotNone(RefreshTokenFamily.objects.get().revoked_at)
+
+    def test_purge_deletes_expired_and_revoked_families(self):
+        active = self.login()
+        replayed = self.login()
+        self.refresh(replayed)
+        self.refresh(replayed)
+        RefreshTokenFamily.objects.create(
+            user=self.user, expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        out = StringIO()
+        call_command("purge_refresh_tokens", "--batch-size", "1", stdout=out)
+
+        self.assertIn("Purged 2", out.getvalue())
+        self.assertEqual(RefreshTokenFamily.objects.count(), 1)
+        self.assertEqual(self.refresh(active).status_code, 200)
@@ -0,0 +1,109 @@
+"""Refresh tokens bound to a ``RefreshTokenFamily`` row instead of the blacklist app.
+
+Login creates one family row per session. ``/auth/refresh/`` rotates with a
+single ``UPDATE ... WHERE generation = <token generation>``, so nothing is
+inserted per refresh and no lookup precedes the write. When the update matches
+nothing, the token is stale, revoked or expired. If it is stale (its family has
+already moved past its generation), it was replayed and the family is revoked.
+
+Refresh tokens issued before families existed carry no family claim. Each is
+adopted into a family the first time it is presented (see
+``FamilyRefreshToken.adopt_legacy``), so deploying this does not log anyone out.
+"""
+
+from __future__ import annotations
+
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import RefreshTokenFamily
+
+FAMILY_CLAIM = "fam"
+GENERATION_CLAIM = "gen"
+# Families adopted by pre-family tokens are keyed by uuid5(namespace, jti).
+LEGACY_FAMILY_NAMESPACE = uuid.UUID("5f0c6f5e-2d0e-4f53-9a51-8f3cbb0e6f7a")
+
+
+def legacy_family_id(jti: str) -> uuid.UUID:
+    return uuid.uuid5(LEGACY_FAMILY_NAMESPACE, jti)
+
+
+class FamilyRefreshToken(RefreshToken):
+    no_copy_claims = (*RefreshToken.no_copy_claims, FAMILY_CLAIM, GENERATION_CLAIM)
+
+    @classmethod
+    def for_user(cls, user) -> FamilyRefreshToken:
+        token = super().for_user(user)
+        family = RefreshTokenFamily.objects.create(
+            user=user, expires_at=token.current_time + cls.lifetime
+        )
+        token[FAMILY_CLAIM] = str(family.pk)
+        token[GENERATION_CLAIM] = family.generation
+        return token
+
+    def family(self):
+        family_id = self.payload.get(FAMILY_CLAIM)
+        if family_id is None:
+            family_id = self.adopt_legacy()
+        return RefreshTokenFamily.objects.filter(pk=family_id)
+
+    def adopt_legacy(self) -> str:
+        """Bind a token issued before families existed to a family of its own.
+
+        The family id is derived from the token's jti, so only the first
+        presentation creates the row; later ones find it already rotated and are
+        refused as replays. Tokens the old blacklist had already rotated were
+        given revoked families by ``accounts.0004_drop_token_blacklist``.
+        """
+        user_id = self.payload.get(api_settings.USER_ID_CLAIM)
+        if not get_user_model().objects.filter(pk=user_id, is_active=True).exists():
+            raise TokenError(_("Token is not bound to a session"))
+        family, _created = RefreshTokenFamily.objects.get_or_create(
+            pk=legacy_family_id(str(self[api_settings.JTI_CLAIM])),
+            defaults={
+                "user_id": user_id,
+                "expires_at": datetime_from_epoch(self["exp"]),
+            },
+        )
+        self[FAMILY_CLAIM] = str(family.pk)
+        self[GENERATION_CLAIM] = self.payload.get(GENERATION_CLAIM, 0)
+        return self[FAMILY_CLAIM]
+
+    def rotate(self) -> FamilyRefreshToken:
+        """Advance the family to the next generation and re-issue this token for it."""
+        family = self.family()
+        generation = self.payload.get(GENERATION_CLAIM, 0)
+        now = timezone.now()
+        rotated = family.filter(
+            generation=generation, revoked_at=None, expires_at__gt=now
+        ).update(generation=F("generation") + 1, expires_at=now + self.lifetime)
+        if not rotated:
+            family.filter(generation__gt=generation, revoked_at=None).update(
+                revoked_at=now, expires_at=now
+            )
+            raise TokenError(_("Token is invalid, expired or has already been used"))
+
+        self.set_jti()
+        self.set_exp(from_time=now)
+        self.set_iat(at_time=now)
+        self[GENERATION_CLAIM] = generation + 1
+        return self
+
+    def revoke(self) -> None:
+        now = timezone.now()
+        self.family().filter(revoked_at=None).update(revoked_at=now, expires_at=now)
+
+
+def revoke_user_sessions(user) -> int:
+    now = timezone.now()
+    return RefreshTokenFamily.objects.filter(user=user, revoked_at=None).update(
+        revoked_at=now, expires_at=now
+    )
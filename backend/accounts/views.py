@@ -2,18 +2,26 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
-from .serializers import LoginSerializer, LogoutSerializer, UserSerializer
+from .serializers import (
+    LoginSerializer,
+    LogoutSerializer,
+    RefreshSerializer,
+    UserSerializer,
+)
+from .tokens import FamilyRefreshToken
 
 
 class LoginView(TokenObtainPairView):
     serializer_class = LoginSerializer
     permission_classes = [permissions.AllowAny]
+    # Password checks are expensive and a brute-force target.
+    throttle_cost = 5
 
 
 class RefreshView(TokenRefreshView):
+    serializer_class = RefreshSerializer
     permission_classes = [permissions.AllowAny]
 
 
@@ -25,8 +33,8 @@ class LogoutView(APIView):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
         try:
-            token = RefreshToken(serializer.validated_data["refresh"])
-            token.blacklist()
+            token = FamilyRefreshToken(serializer.validated_data["refresh"])
+            token.revoke()
         except TokenError as exc:  # pragma: no cover - passthrough error handling
             raise InvalidToken(detail={"detail": str(exc)})
         return Response(status=status.HTTP_205_RESET_CONTENT)
@@ -38,3 +46,7 @@ class MeView(generics.RetrieveAPIView):
 
     def get_object(self):
         return self.request.user
+
+    async def aget(self, request, *args, **kwargs):
+        # The user was resolved while authenticating; serializing it runs no query.
+        return self.retrieve(request, *args, **kwargs)
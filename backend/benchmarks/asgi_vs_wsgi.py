@@ -0,0 +1,212 @@
+"""Compare read throughput of the WSGI and ASGI deployments at a fixed worker count.
+
+Seeds a user with a few escrows through the API and starts gunicorn twice on
+the configured database: once with sync workers on ``config.wsgi``, once with
+uvicorn workers on ``config.asgi``, whose URLconf serves the async read
+endpoints. Each server gets the same number of workers. ``--concurrency`` client
+threads then replay the escrow list, detail, party list, broker list and
+``/users/me/`` reads for ``--seconds``. The response cache is disabled so every
+request reaches the database. Seeded rows are deleted at the end::
+
+    python benchmarks/asgi_vs_wsgi.py --workers 2 --concurrency 32 --seconds 15
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import importlib.util
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import django
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from django.test import override_settings  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from accounts.models import User  # noqa: E402
+from accounts.serializers import LoginSerializer  # noqa: E402
+from escrows.models import Escrow, PartyRole, TransactionType  # noqa: E402
+
+ESCROW = {
+    "name": "Bench escrow",
+    "participant_role": PartyRole.BROKER,
+    "currency": "USD",
+    "transaction_type": TransactionType.COMMISSION,
+    "property_type": "HOUSE",
+    "property_value": "500000.00",
+    "closing_date": "2025-01-12",
+    "property_address": "1 Bench St",
+    "commission_percentage": "3.0",
+    "commission_payer": "BUYER",
+    "commission_payment_date": "2025-01-15",
+    "broker_a_name": "A",
+    "broker_a_percentage": "60",
+    "broker_b_name": "B",
+    "broker_b_percentage": "40",
+}
+SERVERS = {
+    "wsgi": ["config.wsgi:application", "--worker-class", "sync", "--threads", "1"],
+    "asgi": [
+        "config.asgi:application",
+        "--worker-class",
+        "uvicorn.workers.UvicornWorker",
+    ],
+}
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+def seed(escrow_count: int) -> tuple[User, list[str]]:
+    user = User.objects.create_user(
+        email="bench-async@example.com", password="bench-pass"
+    )
+    client = APIClient()
+    client.force_authenticate(user)
+    paths = ["/escrows/", "/users/me/"]
+    for index in range(escrow_count):
+        escrow = client.post("/escrows/", ESCROW, format="json").data
+        base = f"/escrows/{escrow['id']}/"
+        client.post(
+            f"{base}parties/", {"name": f"Buyer {index}", "role": PartyRole.BUYER}
+        )
+        paths += [base, f"{base}parties/", f"{base}brokers/"]
+    return user, paths
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode: str, workers: int, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DJANGO_ALLOWED_HOSTS": "127.0.0.1",
+        "API_CACHE_TTL": "0",
+        "API_CACHE_LIST_TTL": "0",
+        "THROTTLE_ANON": "1000000/min",
+        "THROTTLE_USER": "1000000/min",
+    }
+    command = [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        *SERVERS[mode],
+        "--workers",
+        str(workers),
+    ]
+    command += ["--bind", f"127.0.0.1:{port}", "--log-level", "warning"]
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health/")
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+def load(
+    port: int, token: str, paths: list[str], concurrency: int, seconds: float
+) -> dict:
+    timings: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+    stop_at = time.monotonic() + seconds
+
+    def client(offset: int):
+        nonlocal errors
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        headers = {"Authorization": f"Bearer {token}"}
+        index = offset
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                connection.request("GET", paths[index % len(paths)], headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except OSError:
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                ok = False
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if ok:
+                    timings.append(elapsed)
+                else:
+                    errors += 1
+            index += 1
+        connection.close()
+
+    threads = [
+        threading.Thread(target=client, args=(offset,)) for offset in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    timings.sort()
+    return {
+        "rps": len(timings) / seconds,
+        "p50": statistics.median(timings) if timings else 0.0,
+        "p95": timings[int(len(timings) * 0.95) - 1] if timings else 0.0,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--escrows", type=int, default=5)
+    args = parser.parse_args()
+
+    user, paths = seed(args.escrows)
+    token = str(LoginSerializer.get_token(user).access_token)
+    try:
+        print(
+            f"{args.workers} workers, {args.concurrency} clients, "
+            f"{args.seconds:.0f}s per server"
+        )
+        print(f"{'server':<6} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+        for mode in SERVERS:
+            if mode == "asgi" and importlib.util.find_spec("uvicorn") is None:
+                print("asgi   skipped, uvicorn is not installed")
+                continue
+            port = free_port()
+            server = start_server(mode, args.workers, port)
+            try:
+                load(port, token, paths, args.concurrency, 2)  # warm up
+                result = load(port, token, paths, args.concurrency, args.seconds)
+            finally:
+                server.terminate()
+                server.wait()
+            print(
+                f"{mode:<6} {result['rps']:>9.1f} {result['p50']:>8.2f} "
+                f"{result['p95']:>8.2f} {result['errors']:>7}"
+            )
+    finally:
+        Escrow.objects.filter(created_by=user).delete()
+        user.delete()
+
+
+if __name__ == "__main__":
+    main()
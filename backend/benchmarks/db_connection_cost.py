@@ -0,0 +1,140 @@
+"""Compare the per-request database connection cost of the connection settings.
+
+Simulates requests the way Django's handlers drive connections: each one sends
+``request_started``, runs one small query and sends ``request_finished``, which
+is when Django closes or recycles connections. Three configurations are
+measured against the configured database:
+
+- ``per-request``: ``CONN_MAX_AGE = 0``, a new connection for every request.
+- ``persistent``: ``CONN_MAX_AGE`` with ``CONN_HEALTH_CHECKS``, one connection
+  per thread reused across requests.
+- ``pooled``: psycopg's connection pool (PostgreSQL with psycopg 3 only).
+
+Point it at the PostgreSQL server the app really uses, so connection set-up
+includes its network, TLS and authentication cost::
+
+    python benchmarks/db_connection_cost.py --requests 500 --threads 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import django
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+from django.conf import settings  # noqa: E402
+
+MODES = ("per-request", "persistent", "pooled")
+
+
+def configure_aliases() -> list[str]:
+    """Add one database alias per mode, all pointing at the default database."""
+    base = copy.deepcopy(settings.DATABASES["default"])
+    base.setdefault("OPTIONS", {}).pop("pool", None)
+    settings.DATABASES["per-request"] = {
+        **base,
+        "CONN_MAX_AGE": 0,
+        "CONN_HEALTH_CHECKS": False,
+    }
+    settings.DATABASES["persistent"] = {
+        **base,
+        "CONN_MAX_AGE": max(base.get("CONN_MAX_AGE") or 0, 60),
+        "CONN_HEALTH_CHECKS": True,
+    }
+    modes = ["per-request", "persistent"]
+    if base["ENGINE"] == "django.db.backends.postgresql":
+        try:
+            from psycopg_pool import ConnectionPool
+        except ImportError:
+            print("pooled: skipped, psycopg 3 with psycopg_pool is not installed")
+        else:
+            pool = {
+                "min_size": 2,
+                "max_size": 10,
+                "check": ConnectionPool.check_connection,
+            }
+            settings.DATABASES["pooled"] = {
+                **base,
+                "CONN_MAX_AGE": 0,
+                "OPTIONS": {**base["OPTIONS"], "pool": pool},
+            }
+            modes.append("pooled")
+    else:
+        print(f"pooled: skipped, {base['ENGINE']} has no connection pool")
+    return modes
+
+
+MEASURED = configure_aliases()
+django.setup()
+
+from django.core.signals import request_finished, request_started  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+
+opened = {mode: 0 for mode in MODES}
+opened_lock = threading.Lock()
+
+
+def count_connection(sender, connection, **kwargs):
+    with opened_lock:
+        opened[connection.alias] = opened.get(connection.alias, 0) + 1
+
+
+connection_created.connect(count_connection)
+
+
+def fake_request(alias: str) -> float:
+    start = time.perf_counter()
+    request_started.send(sender=None)
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    request_finished.send(sender=None)
+    return (time.perf_counter() - start) * 1000
+
+
+def run(alias: str, requests: int, threads: int) -> list[float]:
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        timings = list(executor.map(fake_request, [alias] * requests))
+        # Connections are per thread; close them from the threads that own them.
+        list(executor.map(lambda _: connections[alias].close(), range(threads)))
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    print(
+        f"{args.requests} requests on {args.threads} threads "
+        f"against {connections['default'].vendor}"
+    )
+    print(f"{'mode':<12} {'connects':>8} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for alias in MEASURED:
+        run(alias, args.threads, args.threads)  # warm up imports and any pool
+        opened[alias] = 0
+        timings = sorted(run(alias, args.requests, args.threads))
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(
+            f"{alias:<12} {opened[alias]:>8} {statistics.mean(timings):>8.3f} "
+            f"{statistics.median(timings):>8.3f} {p95:>8.3f}"
+        )
+        if alias == "pooled":
+            connections[alias].close_pool()
+
+
+if __name__ == "__main__":
+    main()
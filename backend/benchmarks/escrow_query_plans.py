@@ -0,0 +1,169 @@
+"""Compare query plans of the escrow hot paths with and without the index pack.
+
+Seeds a synthetic dataset inside a transaction, prints ``EXPLAIN`` output for
+each hot query with the indexes from ``escrows.0004_hot_path_indexes`` in place,
+drops those indexes, prints the plans again and rolls everything back. The
+dropped indexes stay locked until the rollback, so point it at a scratch or
+staging PostgreSQL database for representative plans::
+
+    python benchmarks/escrow_query_plans.py --escrows 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import django
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.db.models.functions import Lower  # noqa: E402
+
+from accounts.models import User  # noqa: E402
+from escrows.access import accessible_escrow_ids, rebuild_escrow_access  # noqa: E402
+from escrows.models import (  # noqa: E402
+    BrokerRepresentation,
+    BrokerRole,
+    BrokerStatus,
+    Escrow,
+    EscrowStatus,
+)
+
+PACK = {
+    Escrow: [
+        "escrow_created_idx",
+        "escrow_status_created_idx",
+        "escrow_owner_status_idx",
+    ],
+    BrokerRepresentation: [
+        "broker_invited_email_ci_idx",
+        "broker_user_status_idx",
+        "broker_escrow_status_role_idx",
+    ],
+}
+
+
+if connection.vendor == "sqlite":
+    # SQLite keeps serving cached EXPLAIN statements after DROP INDEX.
+    settings.DATABASES["default"].setdefault("OPTIONS", {})["cached_statements"] = 0
+
+
+class Rollback(Exception):
+    pass
+
+
+def seed(escrow_count: int, user_count: int) -> list[User]:
+    users = User.objects.bulk_create(
+        User(email=f"bench-{index}@example.com", password="!")
+        for index in range(user_count)
+    )
+    statuses = EscrowStatus.values
+    escrows = Escrow.objects.bulk_create(
+        Escrow(
+            name=f"Bench escrow {index}",
+            created_by=users[index % user_count],
+            status=statuses[index % len(statuses)],
+        )
+        for index in range(escrow_count)
+    )
+    BrokerRepresentation.objects.bulk_create(
+        BrokerRepresentation(
+            escrow=escrow,
+            user=users[(index + 1) % user_count] if index % 3 else None,
+            invited_email=f"Bench-{(index + 1) % user_count}@Example.com",
+            invited_by=escrow.created_by,
+            invited_as=BrokerRole.CO_BROKER,
+            status=BrokerStatus.PENDING if index % 2 else BrokerStatus.ACCEPTED,
+        )
+        for index, escrow in enumerate(escrows)
+    )
+    escrow_ids = [escrow.pk for escrow in escrows]
+    for start in range(0, len(escrow_ids), 1000):
+        rebuild_escrow_access(escrow_ids[start : start + 1000])
+    return users
+
+
+def hot_queries(user: User, escrow_id: int) -> dict[str, object]:
+    return {
+        "escrow list": Escrow.objects.filter(
+            pk__in=accessible_escrow_ids(user)
+        ).order_by("-created_at", "-id")[:20],
+        "escrow list by status": Escrow.objects.filter(
+            pk__in=accessible_escrow_ids(user), status=EscrowStatus.LOCKED
+        ).order_by("-created_at", "-id")[:20],
+        "owner escrows by status": Escrow.objects.filter(
+            created_by=user, status=EscrowStatus.ACTIVE
+        ).order_by("-created_at")[:20],
+        "invitations by email": BrokerRepresentation.objects.alias(
+            invited_email_ci=Lower("invited_email")
+        ).filter(invited_email_ci=user.email.lower(), status=BrokerStatus.PENDING),
+        "brokers by user and status": BrokerRepresentation.objects.filter(
+            user=user, status=BrokerStatus.PENDING
+        ),
+        "escrow brokers by status and role": BrokerRepresentation.objects.filter(
+            escrow_id=escrow_id,
+            status=BrokerStatus.PENDING,
+            invited_as=BrokerRole.CO_BROKER,
+        ),
+    }
+
+
+def analyze():
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            for model in PACK:
+                cursor.execute(
+                    f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}"
+                )
+
+
+def report(label: str, user: User):
+    print(f"\n=== {label} ===")
+    escrow_id = (
+        Escrow.objects.filter(created_by=user).values_list("pk", flat=True).first()
+    )
+    for name, queryset in hot_queries(user, escrow_id).items():
+        started = time.perf_counter()
+        list(queryset)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"\n--- {name} ({elapsed:.2f} ms)")
+        print(queryset.explain())
+
+
+def drop_pack_indexes():
+    with connection.cursor() as cursor:
+        for names in PACK.values():
+            for name in names:
+                cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--escrows", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"Database vendor: {connection.vendor}")
+    try:
+        with transaction.atomic():
+            users = seed(args.escrows, args.users)
+            analyze()
+            report("with index pack", users[1])
+            drop_pack_indexes()
+            analyze()
+            report("without index pack", users[1])
+            raise Rollback
+    except Rollback:
+        print("\nSeed data and index changes rolled back.")
+
+
+if __name__ == "__main__":
+    main()
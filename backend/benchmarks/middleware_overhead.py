@@ -0,0 +1,100 @@
+"""Measure per-request handler overhead with the full and the lean middleware stack.
+
+Requests built with ``RequestFactory`` go through Django's request handler
+(middleware, URL resolution, view, response) in process, with no server or
+socket, so the difference between the stacks is the middleware itself.
+``full`` is the stack from before ``config.middleware.BrowserMiddleware``:
+sessions, CSRF, auth, messages and clickjacking on every request. ``lean`` is
+the current ``MIDDLEWARE``. ``/users/me/`` is called with a JWT bearer token::
+
+    python benchmarks/middleware_overhead.py --requests 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import django
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ.setdefault("THROTTLE_USER", "1000000/min")
+os.environ.setdefault("THROTTLE_ANON", "1000000/min")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.handlers.base import BaseHandler  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+
+from accounts.models import User  # noqa: E402
+from accounts.serializers import LoginSerializer  # noqa: E402
+
+FULL_STACK = [
+    "django.middleware.security.SecurityMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "corsheaders.middleware.CorsMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+STACKS = {"full": FULL_STACK, "lean": settings.MIDDLEWARE}
+
+
+def build_handler(middleware: list[str]) -> BaseHandler:
+    with override_settings(MIDDLEWARE=middleware):
+        handler = BaseHandler()
+        handler.load_middleware()
+    return handler
+
+
+def run(handler: BaseHandler, path: str, headers: dict, requests: int) -> list[float]:
+    factory = RequestFactory(headers=headers)
+    timings = []
+    for _ in range(requests):
+        request = factory.get(path)
+        started = time.perf_counter()
+        response = handler.get_response(request)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+        assert response.status_code == 200, response.status_code
+    return timings
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    user = User.objects.create_user(
+        email="bench-middleware@example.com", password="bench-pass"
+    )
+    token = str(LoginSerializer.get_token(user).access_token)
+    endpoints = {"/health/": {}, "/users/me/": {"authorization": f"Bearer {token}"}}
+    try:
+        print(f"{args.requests} requests per endpoint and stack")
+        print(
+            f"{'endpoint':<12} {'stack':<6} {'mean us':>9} {'p50 us':>9} {'p95 us':>9}"
+        )
+        for path, headers in endpoints.items():
+            for name, middleware in STACKS.items():
+                handler = build_handler(middleware)
+                run(handler, path, headers, 200)  # warm up
+                timings = sorted(run(handler, path, headers, args.requests))
+                p95 = timings[int(len(timings) * 0.95) - 1]
+                print(
+                    f"{path:<12} {name:<6} {statistics.mean(timings):>9.1f} "
+                    f"{statistics.median(timings):>9.1f} {p95:>9.1f}"
+                )
+    finally:
+        user.delete()
+
+
+if __name__ == "__main__":
+    main()
@@ -11,5 +11,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(BASE_DIR / ".env")
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ.setdefault("DJANGO_ROOT_URLCONF", "config.urls_async")
+# Persistent connections are per thread, which ASGI does not keep stable.
+os.environ["DJANGO_ASGI"] = "1"
 
 application = get_asgi_application()
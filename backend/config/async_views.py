@@ -0,0 +1,63 @@
+"""Async read endpoints for DRF views, served under ASGI.
+
+DRF dispatches synchronously, so under an ASGI server a request to a DRF view
+holds a worker thread for its whole duration, database waits included.
+``async_read`` wraps a DRF view in an async Django view. It answers ``GET`` and
+``HEAD`` with the view's async twin of the action (``alist``, ``aretrieve`` or
+``aget``), which awaits its queries through Django's async ORM. Every other
+method goes to the regular DRF view.
+
+Authentication, permissions and throttling stay DRF's ``initial()``, run in a
+single thread hop. Their results are usually cached, so that hop rarely waits
+on the database.
+"""
+
+from __future__ import annotations
+
+from asgiref.sync import sync_to_async
+from rest_framework.viewsets import ViewSetMixin
+
+READ_METHODS = ("GET", "HEAD")
+
+
+def async_read(view_class, actions: dict[str, str] | None = None, **initkwargs):
+    """Async Django view serving reads of ``view_class``.
+
+    ``view_class`` is a viewset, with ``actions``, or an APIView.
+    """
+    if issubclass(view_class, ViewSetMixin):
+        sync_view = view_class.as_view(actions, **initkwargs)
+        read_action = actions["get"]
+    else:
+        sync_view = view_class.as_view(**initkwargs)
+        read_action = "get"
+    fallback = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if request.method not in READ_METHODS:
+            return await fallback(request, *args, **kwargs)
+        self = view_class(**initkwargs)
+        if actions is not None:
+            self.action_map = {"get": read_action, "head": read_action}
+        return await dispatch(self, f"a{read_action}", request, *args, **kwargs)
+
+    # Like DRF's own views: JWT requests carry no CSRF token.
+    view.csrf_exempt = True
+    view.cls = view_class
+    return view
+
+
+async def dispatch(self, handler_name: str, request, *args, **kwargs):
+    """``APIView.dispatch`` awaiting ``handler_name`` instead of the sync handler."""
+    self.args = args
+    self.kwargs = kwargs
+    request = self.initialize_request(request, *args, **kwargs)
+    self.request = request
+    self.headers = self.default_response_headers
+    try:
+        await sync_to_async(self.initial)(request, *args, **kwargs)
+        response = await getattr(self, handler_name)(request, *args, **kwargs)
+    except Exception as exc:
+        response = self.handle_exception(exc)
+    self.response = self.finalize_response(request, response, *args, **kwargs)
+    return self.response
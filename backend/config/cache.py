@@ -0,0 +1,200 @@
+"""Two-tier cache: a bounded in-process LRU in front of the shared Django cache.
+
+Entries are stored together with the versions of the tags they depend on (for
+example ``escrow:12`` or ``user:3``). Tag versions live only in the shared tier,
+and ``invalidate`` bumps them atomically. Every read re-fetches the entry's tag
+versions with one ``get_many`` and drops the entry on any mismatch, so an
+invalidation in one process is seen by all others immediately. A local hit
+therefore costs that single round trip and skips transferring and unpickling
+the payload; a shared hit costs two.
+
+A missing tag version (never set, or evicted) never matches: new versions start
+from a nanosecond timestamp, so a reset tag cannot revive old entries.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+MISS = object()
+
+
+@dataclass
+class CacheStats:
+    local_hits: int = 0
+    shared_hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    sets: int = 0
+    invalidations: int = 0
+    lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        with self.lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            counts = {
+                name: getattr(self, name)
+                for name in (
+                    "local_hits",
+                    "shared_hits",
+                    "misses",
+                    "stale",
+                    "sets",
+                    "invalidations",
+                )
+            }
+        reads = counts["local_hits"] + counts["shared_hits"] + counts["misses"]
+        counts["hit_ratio"] = (
+            (counts["local_hits"] + counts["shared_hits"]) / reads if reads else 0.0
+        )
+        return counts
+
+
+class LocalLRU:
+    """Thread-safe, size-bounded LRU of ``key -> (expires_at, entry)``."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return item[1]
+
+    def set(self, key, entry, timeout: float) -> None:
+        with self.lock:
+            self.entries[key] = (time.monotonic() + timeout, entry)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key) -> None:
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def tag_key(tag: str) -> str:
+    return f"tag:{tag}"
+
+
+class TaggedCache:
+    def __init__(
+        self, alias: str = "default", max_entries: int = 1024, timeout: int = 300
+    ):
+        self.alias = alias
+        self.local = LocalLRU(max_entries)
+        self.timeout = timeout
+        self.stats = CacheStats()
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def get(self, key: str):
+        """Return the cached value for ``key``; ``MISS`` if absent or invalidated."""
+        entry = self.local.get(key)
+        tier = "local_hits"
+        if entry is None:
+            entry = self.shared.get(key)
+            tier = "shared_hits"
+        if entry is None:
+            self.stats.incr("misses")
+            return MISS
+
+        versions, value = entry
+        if self.shared.get_many(list(versions)) != versions:
+            self.local.delete(key)
+            self.stats.incr("stale")
+            self.stats.incr("misses")
+            return MISS
+        if tier == "shared_hits":
+            self.local.set(key, entry, self.timeout)
+        self.stats.incr(tier)
+        return value
+
+    def versions(self, tags) -> dict:
+        """Current versions of ``tags``, creating any that are missing.
+
+        Take them *before* reading the data to cache: an invalidation landing in
+        between then leaves the entry already stale instead of wrongly fresh.
+        """
+        tag_keys = [tag_key(tag) for tag in tags]
+        versions = self.shared.get_many(tag_keys)
+        missing = [name for name in tag_keys if name not in versions]
+        if missing:
+            fresh = time.time_ns()
+            for name in missing:
+                self.shared.add(name, fresh, None)
+            versions.update(self.shared.get_many(missing))
+        return versions
+
+    def set(self, key: str, value, versions: dict, timeout: int | None = None) -> None:
+        timeout = self.timeout if timeout is None else timeout
+        entry = (versions, value)
+        self.shared.set(key, entry, timeout)
+        self.local.set(key, entry, timeout)
+        self.stats.incr("sets")
+
+    def get_or_set(self, key: str, tags, factory, timeout: int | None = None):
+        value = self.get(key)
+        if value is MISS:
+            versions = self.versions(tags)
+            value = factory()
+            self.set(key, value, versions, timeout)
+        return value
+
+    def bump(self, tags) -> None:
+        for name in {tag_key(tag) for tag in tags}:
+            try:
+                self.shared.incr(name)
+            except ValueError:
+                self.shared.set(name, time.time_ns(), None)
+        self.stats.incr("invalidations", len(tags))
+
+    def invalidate(self, *tags: str) -> None:
+        """Invalidate ``tags`` now and again once the surrounding transaction commits.
+
+        The second bump covers readers that repopulated the cache from the
+        pre-commit state in between.
+        """
+        if not tags:
+            return
+        self.bump(tags)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self.bump(tags))
+
+    def clear_local(self) -> None:
+        self.local.clear()
+
+
+api_cache = TaggedCache(
+    max_entries=getattr(settings, "API_CACHE_LOCAL_MAX_ENTRIES", 1024),
+    timeout=getattr(settings, "API_CACHE_TTL", 300),
+)
@@ -0,0 +1,77 @@
+"""Route safe API reads to a read replica, with read-your-writes stickiness.
+
+``READ_REPLICA`` names the replica's database alias (unset disables routing).
+Viewsets opt in with ``ReplicaReadMixin``: once the user is authenticated, a
+``GET``/``HEAD``/``OPTIONS`` request sets a context variable that makes
+``PrimaryReplicaRouter`` send the request's reads to the replica. Writes
+always go to the primary.
+
+A successful write pins its user to the primary for ``REPLICA_STICKY_SECONDS``
+through a key in the shared cache, so they read their own changes while the
+replica catches up. The window should exceed the replica's normal lag.
+"""
+
+from __future__ import annotations
+
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+read_alias: ContextVar[str | None] = ContextVar("read_alias", default=None)
+
+
+def sticky_seconds() -> int:
+    return getattr(settings, "REPLICA_STICKY_SECONDS", 5)
+
+
+def pin_key(user) -> str:
+    return f"db:primary:{user.pk}"
+
+
+def pin_to_primary(user) -> None:
+    cache.set(pin_key(user), 1, sticky_seconds())
+
+
+def is_pinned(user) -> bool:
+    return cache.get(pin_key(user)) is not None
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+
+class ReplicaReadMixin:
+    """Viewset mixin serving safe requests from ``READ_REPLICA``.
+
+    Place it first in the bases so the replica covers every query the
+    request's handler runs.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        replica = getattr(settings, "READ_REPLICA", None)
+        if replica and request.method in SAFE_METHODS and not is_pinned(request.user):
+            read_alias.set(replica)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if read_alias.get() is not None:
+            # Set rather than reset: async views run initial() in a copied context.
+            read_alias.set(None)
+        elif (
+            getattr(settings, "READ_REPLICA", None)
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            pin_to_primary(request.user)
+        return response
@@ -0,0 +1,212 @@
+"""Structured logging that never writes from the request thread.
+
+``QueueStreamHandler`` only puts records on a bounded in-memory queue. A
+``QueueListener`` thread formats them and writes them to the stream, so slow
+stdout or a slow log shipper cannot add to request latency. When the queue is
+full, records are dropped rather than blocking. Drops are counted in the
+``log_records_dropped`` metric, and a warning with their number is logged once
+the queue has room again, or when the handler closes. Forked gunicorn workers
+restart the listeners of open handlers, because threads do not survive
+``fork``.
+
+``RequestContextFilter`` stamps each record with the current request's id,
+user id and route. ``RequestIdMiddleware`` in ``config.middleware`` sets the
+request that the filter reads. ``JSONFormatter`` writes one JSON object per
+line, including any ``extra`` fields; the per-request ``config.profiling``
+record carries the query count and timings that way. ``InfoSamplingFilter``
+keeps a ``LOG_INFO_SAMPLE_RATE`` fraction of INFO and DEBUG records. It keeps
+or drops every record of a request together, and always keeps warnings and
+errors.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import weakref
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from django.utils.functional import SimpleLazyObject, empty
+
+from .metrics import record_dropped_log
+
+current_request: ContextVar = ContextVar("current_request", default=None)
+
+# Standard attributes, and the request django.request attaches (its fields
+# are already in the context).
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+    "request",
+}
+CONTEXT_FIELDS = ("request_id", "user_id", "route")
+
+
+def request_user_id(request):
+    """Id of the request's user, without loading a user nothing has asked for yet."""
+    user = request.__dict__.get("user")
+    if isinstance(user, SimpleLazyObject):
+        user = None if user._wrapped is empty else user._wrapped
+    return getattr(user, "pk", None)
+
+
+class RequestContextFilter(logging.Filter):
+    def filter(self, record):
+        # django.request logs responses after the middleware has returned.
+        request = current_request.get() or getattr(record, "request", None)
+        match = getattr(request, "resolver_match", None)
+        context = {
+            "request_id": getattr(request, "request_id", None),
+            "user_id": request_user_id(request) if request is not None else None,
+            "route": match.view_name if match else None,
+        }
+        for name, value in context.items():
+            if getattr(record, name, None) is None:
+                setattr(record, name, value)
+        return True
+
+
+class InfoSamplingFilter(logging.Filter):
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or self.rate >= 1:
+            return True
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            chance = zlib.crc32(request_id.encode()) % 10_000 / 10_000
+        else:
+            chance = random.random()
+        record.sample_rate = self.rate
+        return chance < self.rate
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name in CONTEXT_FIELDS:
+            entry[name] = getattr(record, name, None)
+        for name, value in vars(record).items():
+            if name not in RECORD_ATTRIBUTES and name not in entry:
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class DrainingQueueListener(QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room rather than fail on a full queue, so stop() still
+        # writes out everything queued before it.
+        self.queue.put(self._sentinel)
+
+
+class QueueStreamHandler(QueueHandler):
+    """Queue records for a background ``QueueListener`` writing to ``stream``.
+
+    Formatters set on this handler apply to the listener's output.
+    """
+
+    def __init__(self, stream=None, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.reported = 0
+        self.output = logging.StreamHandler(stream)
+        super().__init__(queue.Queue(maxsize))
+        self.start_listener()
+        open_handlers.add(self)
+
+    def start_listener(self) -> None:
+        self.listener = DrainingQueueListener(self.queue, self.output)
+        self.listener.start()
+
+    def after_fork(self) -> None:
+        if self.listener is None:
+            return
+        # The parent's queue may have been locked mid-operation.
+        self.queue = queue.Queue(self.maxsize)
+        self.dropped = self.reported = 0
+        self.start_listener()
+
+    def setFormatter(self, fmt):
+        self.output.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Keep the record's fields for the formatter; only resolve what may
+        # not survive the hand-off to the listener thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def drop_warning(self) -> logging.LogRecord:
+        count = self.dropped - self.reported
+        record = logging.makeLogRecord(
+            {
+                "name": __name__,
+                "levelno": logging.WARNING,
+                "levelname": "WARNING",
+                "msg": f"Dropped {count} log records because the log queue was full",
+                "dropped": count,
+            }
+        )
+        self.reported = self.dropped
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            record_dropped_log()
+            return
+        if self.dropped > self.reported:
+            try:
+                self.queue.put_nowait(self.drop_warning())
+            except queue.Full:
+                pass
+
+    def close(self):
+        # Writes out what is still queued; logging.shutdown() calls it at exit.
+        open_handlers.discard(self)
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            if self.dropped > self.reported:
+                self.output.handle(self.drop_warning())
+        self.output.close()
+        super().close()
+
+
+open_handlers: weakref.WeakSet[QueueStreamHandler] = weakref.WeakSet()
+
+
+def restart_listeners() -> None:
+    for handler in list(open_handlers):
+        handler.after_fork()
+
+
+os.register_at_fork(after_in_child=restart_listeners)
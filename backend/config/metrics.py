@@ -0,0 +1,99 @@
+"""Prometheus metrics for the API, served at ``/metrics/``.
+
+``RequestProfileMiddleware`` feeds every finished request to
+``record_request``, which records latency, status and query count per
+resolved URL name. Requests that match no route share the ``unmatched``
+label, so unknown paths cannot add series. Throttles count their rejections
+through ``record_throttle_rejection``, and ``config.logs`` counts the records
+it drops on a full queue through ``record_dropped_log``.
+
+With several gunicorn workers each process holds its own counters. When
+``PROMETHEUS_MULTIPROC_DIR`` is set (``gunicorn.conf.py`` sets it), every
+process writes its values to memory-mapped files in that directory, and
+``/metrics/`` sums the files of all workers at scrape time. The directory
+must be empty when the server starts and set before Django is imported.
+"""
+
+from __future__ import annotations
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.multiprocess import MultiProcessCollector
+
+UNMATCHED = "unmatched"
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to answer a request, middleware included.",
+    ["method", "route"],
+    buckets=(
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.075,
+        0.1,
+        0.25,
+        0.5,
+        0.75,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+    ),
+)
+RESPONSES = Counter(
+    "http_responses",
+    "Responses sent, by status code.",
+    ["method", "route", "status"],
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries run by a request.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+THROTTLE_REJECTIONS = Counter(
+    "throttle_rejections",
+    "Requests rejected by a rate throttle.",
+    ["scope", "route"],
+)
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped",
+    "Log records dropped because the log queue was full.",
+)
+
+
+def record_request(
+    method: str, route: str | None, status: int, queries: int, seconds: float
+) -> None:
+    route = route or UNMATCHED
+    REQUEST_LATENCY.labels(method, route).observe(seconds)
+    RESPONSES.labels(method, route, str(status)).inc()
+    REQUEST_QUERIES.labels(method, route).observe(queries)
+
+
+def record_throttle_rejection(scope: str, route: str | None) -> None:
+    THROTTLE_REJECTIONS.labels(scope, route or UNMATCHED).inc()
+
+
+def record_dropped_log() -> None:
+    LOG_RECORDS_DROPPED.inc()
+
+
+def exposition() -> tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, and their content type."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
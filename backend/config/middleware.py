@@ -0,0 +1,124 @@
+"""Project middleware: request ids, and path-aware browser-only middleware.
+
+``RequestIdMiddleware`` gives every request an id, taken from a well-formed
+incoming ``X-Request-ID`` header or generated. It returns the id in the same
+header and makes the request available to ``config.logs`` for the duration of
+the request.
+
+Sessions, CSRF, authentication from the session, messages and clickjacking
+headers only matter to the admin. The API authenticates with JWT bearer tokens
+in DRF, so running that middleware on every API request costs time (and adds
+``Vary: Cookie``) for nothing. ``BrowserMiddleware`` runs ``BROWSER_MIDDLEWARE``
+as a nested stack for paths under ``BROWSER_PATH_PREFIXES`` and passes every
+other request straight through.
+
+The nested middleware's ``process_view`` hooks (``CsrfViewMiddleware``
+enforces CSRF there) run from this middleware's own ``process_view``. The
+nested classes must support the handler's mode, sync under WSGI and async
+under ASGI, as Django's built-in middleware does.
+"""
+
+from __future__ import annotations
+
+import re
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+from .logs import current_request
+
+REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class RequestIdMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def begin(self, request):
+        incoming = request.headers.get("X-Request-ID", "")
+        request.request_id = (
+            incoming if REQUEST_ID.match(incoming) else uuid.uuid4().hex
+        )
+        return current_request.set(request)
+
+    def end(self, request, response, token):
+        current_request.reset(token)
+        response["X-Request-ID"] = request.request_id
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self.begin(request)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            current_request.reset(token)
+            raise
+        return self.end(request, response, token)
+
+    async def __acall__(self, request):
+        token = self.begin(request)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            current_request.reset(token)
+            raise
+        return self.end(request, response, token)
+
+
+class BrowserMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefixes = tuple(getattr(settings, "BROWSER_PATH_PREFIXES", ("/admin/",)))
+        handler = get_response
+        self.view_hooks = []
+        for path in reversed(getattr(settings, "BROWSER_MIDDLEWARE", ())):
+            middleware = import_string(path)(handler)
+            if hasattr(middleware, "process_view"):
+                self.view_hooks.insert(0, middleware.process_view)
+            handler = convert_exception_to_response(middleware)
+        self.browser_response = handler
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Django adapts sync process_view to async with a thread hop per
+            # request; API requests should not pay it.
+            self.process_view = self.aprocess_view
+
+    def applies_to(self, request) -> bool:
+        return request.path_info.startswith(self.prefixes)
+
+    def __call__(self, request):
+        if self.applies_to(request):
+            return self.browser_response(request)
+        return self.get_response(request)
+
+    def run_view_hooks(self, request, view_func, view_args, view_kwargs):
+        for hook in self.view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.applies_to(request):
+            return self.run_view_hooks(request, view_func, view_args, view_kwargs)
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        if self.applies_to(request):
+            return await sync_to_async(self.run_view_hooks)(
+                request, view_func, view_args, view_kwargs
+            )
+        return None
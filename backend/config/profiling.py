@@ -0,0 +1,225 @@
+"""Per-request SQL and timing profile with a per-route query budget.
+
+``RequestProfileMiddleware`` wraps every request's database connections to
+count queries and time them. It reports the result as a ``Server-Timing``
+header (``db``, ``serialize``, ``app`` and ``total`` in milliseconds) and as
+one ``config.profiling`` log record whose ``extra`` fields carry the route,
+status, query count and timings, and records them in ``config.metrics``.
+
+``serialize`` is the time spent inside ``timed("serialize")`` blocks
+(``QueryPlanMixin.serialize`` wraps serializer output) plus rendering the
+response body. Queries run while serializing count towards ``db`` as well.
+Queries slower than ``SLOW_QUERY_MS`` go to ``config.slow_queries``.
+
+``QUERY_BUDGETS`` maps ``"METHOD url-name"`` or a bare URL name to the most
+queries a request to that route may run, with ``QUERY_BUDGET_DEFAULT`` for the
+rest. Over-budget requests are
+logged as warnings, or raise ``QueryBudgetExceeded`` when
+``QUERY_BUDGET_STRICT`` is on, which ``config.test_runner`` enables so an N+1
+regression fails the test that triggers it.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from .metrics import record_request
+from .slow_queries import record_slow_query
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in strict mode when a request runs more queries than its route allows."""
+
+
+@dataclass
+class RequestProfile:
+    request: object = None
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    db: float = 0.0
+    spans: dict[str, float] = field(default_factory=dict)
+    slow_seconds: float | None = None
+    capturing: bool = False
+
+    def __call__(self, execute, sql, params, many, context):
+        """Connection execute wrapper counting and timing every query."""
+        if self.capturing:
+            # The slow-query log's own EXPLAIN.
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            result = execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db += elapsed
+        if (
+            self.slow_seconds is not None
+            and elapsed >= self.slow_seconds
+            and self.request is not None
+        ):
+            self.capturing = True
+            try:
+                record_slow_query(
+                    self.request, context["connection"], sql, params, many, elapsed
+                )
+            finally:
+                self.capturing = False
+        return result
+
+    def add(self, name: str, seconds: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def timings(self) -> dict[str, float]:
+        """Milliseconds per metric; ``app`` is whatever the others do not cover."""
+        total = time.perf_counter() - self.started
+        serialize = self.spans.get("serialize", 0.0)
+        return {
+            "db": self.db * 1000,
+            "serialize": serialize * 1000,
+            "app": max(total - self.db - serialize, 0.0) * 1000,
+            "total": total * 1000,
+        }
+
+
+current_profile: ContextVar[RequestProfile | None] = ContextVar(
+    "current_profile", default=None
+)
+
+
+@contextmanager
+def timed(name: str):
+    """Add the block's duration to the current request's ``name`` span, if profiled."""
+    profile = current_profile.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.add(name, time.perf_counter() - started)
+
+
+def query_budget(method: str, view_name: str | None) -> int | None:
+    budgets = getattr(settings, "QUERY_BUDGETS", {})
+    for key in (f"{method} {view_name}", view_name):
+        if key in budgets:
+            return budgets[key]
+    return getattr(settings, "QUERY_BUDGET_DEFAULT", None)
+
+
+def server_timing(timings: dict[str, float], queries: int) -> str:
+    metrics = [f'db;dur={timings["db"]:.2f};desc="{queries} queries"']
+    metrics += [
+        f"{name};dur={timings[name]:.2f}" for name in ("serialize", "app", "total")
+    ]
+    return ", ".join(metrics)
+
+
+class RequestProfileMiddleware:
+    """Profile each request.
+
+    Place it first in ``MIDDLEWARE`` so ``total`` covers the whole stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Avoid Django's thread hop for a sync hook under ASGI.
+            self.process_template_response = self.aprocess_template_response
+
+    @contextmanager
+    def profiling(self, request):
+        slow_ms = getattr(settings, "SLOW_QUERY_MS", None)
+        profile = RequestProfile(
+            request, slow_seconds=None if slow_ms is None else slow_ms / 1000
+        )
+        token = current_profile.set(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                yield profile
+        finally:
+            current_profile.reset(token)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with self.profiling(request) as profile:
+            response = self.get_response(request)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        with self.profiling(request) as profile:
+            response = await self.get_response(request)
+        return self.finish(request, response, profile)
+
+    def time_rendering(self, response):
+        profile = current_profile.get()
+        if profile is not None:
+            # The outermost middleware's hook runs last, right before rendering.
+            started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda _: profile.add("serialize", time.perf_counter() - started)
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        return self.time_rendering(response)
+
+    async def aprocess_template_response(self, request, response):
+        return self.time_rendering(response)
+
+    def finish(self, request, response, profile: RequestProfile):
+        timings = profile.timings()
+        match = getattr(request, "resolver_match", None)
+        route = match.view_name if match else None
+        if getattr(settings, "SERVER_TIMING", True):
+            response["Server-Timing"] = server_timing(timings, profile.queries)
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "route": route,
+            "status": response.status_code,
+            "queries": profile.queries,
+            **{f"{name}_ms": round(value, 2) for name, value in timings.items()},
+        }
+        record_request(
+            request.method,
+            route,
+            response.status_code,
+            profile.queries,
+            timings["total"] / 1000,
+        )
+        budget = query_budget(request.method, route)
+        if budget is not None and profile.queries > budget:
+            message = (
+                f"{request.method} {route or request.path} ran {profile.queries} "
+                f"queries, budget {budget}"
+            )
+            if getattr(settings, "QUERY_BUDGET_STRICT", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message, extra={**fields, "query_budget": budget})
+        else:
+            logger.info(
+                "%s %s %s",
+                request.method,
+                request.path,
+                response.status_code,
+                extra=fields,
+            )
+        return response
@@ -0,0 +1,203 @@
+"""On-demand sampling profiler for live requests.
+
+Staff switch it on through ``/ops/profiler/`` for all workers at once. The
+switch profiles requests to one URL name, requests carrying a given header,
+and a random ``sample_rate`` fraction of the rest. It turns itself off after
+its ``duration``.
+
+A profiled request gets a ``StackSampler``: a daemon thread that reads the
+request thread's stack from ``sys._current_frames()`` every ``interval_ms``,
+from just before the view runs until the response is rendered. The samples are
+written to ``PROFILER_DIR`` as one collapsed-stack file per request, one
+``frame;frame;frame count`` line per distinct stack. speedscope opens these
+files directly, and ``flamegraph.pl`` renders them. The response names its
+file in ``X-Profile-File``.
+
+Switched off, a request costs a clock read. Each worker re-reads the switch
+from the shared cache at most once a second. The sampled thread is the one the
+view runs in. Under ASGI that is the event loop for async views and the
+request's thread-sensitive worker thread for sync ones, whose id costs a
+``sync_to_async`` hop, taken only for profiled requests.
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+SWITCH_KEY = "profiler:switch"
+PROFILE_SUFFIX = ".collapsed"
+
+
+class ProfilerSwitch:
+    """The shared switch state, re-read from the cache every ``refresh_seconds``."""
+
+    refresh_seconds = 1.0
+
+    def __init__(self):
+        self.state: dict | None = None
+        self.checked_at = float("-inf")
+
+    def current(self) -> dict | None:
+        now = time.monotonic()
+        if now - self.checked_at >= self.refresh_seconds:
+            self.state = cache.get(SWITCH_KEY)
+            self.checked_at = now
+        return self.state
+
+    def set(self, state: dict | None, duration: int = 0) -> None:
+        if state is None:
+            cache.delete(SWITCH_KEY)
+        else:
+            cache.set(SWITCH_KEY, state, duration)
+        self.state = state
+        self.checked_at = time.monotonic()
+
+
+switch = ProfilerSwitch()
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{code.co_qualname}".replace(";", ":").replace(" ", "_")
+
+
+def collapse(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run, name="stack-sampler", daemon=True
+        )
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            self.stacks[collapse(frame)] += 1
+
+    def start(self) -> StackSampler:
+        self.thread.start()
+        return self
+
+    def stop(self) -> Counter[str]:
+        self.stopped.set()
+        self.thread.join()
+        return self.stacks
+
+
+def profile_dir() -> Path:
+    return Path(
+        getattr(settings, "PROFILER_DIR", None)
+        or Path(tempfile.gettempdir()) / "escrow-profiles"
+    )
+
+
+def profile_files() -> list[Path]:
+    """Written profiles, newest first."""
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    return sorted(directory.glob(f"*{PROFILE_SUFFIX}"), reverse=True)
+
+
+def write_profile(request, stacks: Counter[str]) -> Path:
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    match = getattr(request, "resolver_match", None)
+    route = match.view_name if match else "unmatched"
+    stamp = timezone.now().strftime("%Y%m%dT%H%M%S.%f")
+    path = (
+        directory
+        / f"{stamp}-{request.method}-{route}-{uuid.uuid4().hex[:8]}{PROFILE_SUFFIX}"
+    )
+    path.write_text(
+        "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+    )
+    for stale in profile_files()[getattr(settings, "PROFILER_MAX_FILES", 200) :]:
+        stale.unlink(missing_ok=True)
+    return path
+
+
+def should_profile(state: dict, request) -> bool:
+    match = getattr(request, "resolver_match", None)
+    if state.get("route") and match and match.view_name == state["route"]:
+        return True
+    if state.get("header") and state["header"] in request.headers:
+        return True
+    return random.random() < state.get("sample_rate", 0)
+
+
+class SamplingProfilerMiddleware:
+    """Sample the stacks of requests selected by the profiler switch."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.finish(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.finish(request, await self.get_response(request))
+
+    def sample_interval(self, request) -> float | None:
+        """Seconds between samples when the switch selects ``request``, else None."""
+        state = switch.current()
+        if state is not None and should_profile(state, request):
+            return state["interval_ms"] / 1000
+        return None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        interval = self.sample_interval(request)
+        if interval is not None:
+            request.stack_sampler = StackSampler(
+                threading.get_ident(), interval
+            ).start()
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        interval = self.sample_interval(request)
+        if interval is None:
+            return
+        if iscoroutinefunction(view_func):
+            thread_id = threading.get_ident()
+        else:
+            # Django runs sync views with thread_sensitive=True, in this thread.
+            thread_id = await sync_to_async(threading.get_ident)()
+        request.stack_sampler = StackSampler(thread_id, interval).start()
+
+    def finish(self, request, response):
+        sampler = getattr(request, "stack_sampler", None)
+        if sampler is not None:
+            response["X-Profile-File"] = write_profile(request, sampler.stop()).name
+        return response
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from rest_framework import serializers
+
+
+class ProfilerSwitchSerializer(serializers.Serializer):
+    sample_rate = serializers.FloatField(min_value=0, max_value=1, default=0)
+    route = serializers.CharField(required=False, default="")
+    header = serializers.CharField(required=False, default="")
+    interval_ms = serializers.FloatField(min_value=1, max_value=1000, default=5)
+    duration = serializers.IntegerField(
+        min_value=1, max_value=24 * 60 * 60, default=600
+    )
+
+    def validate(self, attrs):
+        if not (attrs["sample_rate"] or attrs["route"] or attrs["header"]):
+            raise serializers.ValidationError(
+                "Select requests with sample_rate, route or header."
+            )
+        return attrs
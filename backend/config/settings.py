@@ -5,6 +5,7 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -28,23 +29,42 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "rest_framework",
     "corsheaders",
-    "rest_framework_simplejwt.token_blacklist",
     "accounts",
     "escrows",
 ]
 
 MIDDLEWARE = [
+    "config.middleware.RequestIdMiddleware",
+    "config.profiling.RequestProfileMiddleware",
+    "config.sampling.SamplingProfilerMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
+    "config.middleware.BrowserMiddleware",
+]
+
+# Only the admin uses sessions, CSRF and messages; JWT API requests skip them.
+BROWSER_MIDDLEWARE = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
+BROWSER_PATH_PREFIXES = ["/admin/"]
+
+# The admin's middleware checks only look at MIDDLEWARE; BrowserMiddleware
+# runs the session, auth, message, CSRF and clickjacking middleware for it.
+SILENCED_SYSTEM_CHECKS = [
+    "admin.E408",
+    "admin.E409",
+    "admin.E410",
+    "security.W002",
+    "security.W003",
+]
 
-ROOT_URLCONF = "config.urls"
+# config.asgi switches to config.urls_async, which adds async read endpoints.
+ROOT_URLCONF = os.environ.get("DJANGO_ROOT_URLCONF", "config.urls")
 
 TEMPLATES = [
     {
@@ -76,12 +96,87 @@ DATABASES = {
     }
 }
 
+# Connection reuse. By default each thread keeps its connection for
+# DB_CONN_MAX_AGE seconds and pings it before reusing it in a new request.
+# DB_POOL=1 switches PostgreSQL to psycopg's connection pool instead, shared by
+# all threads of a worker process. Under ASGI (config.asgi sets DJANGO_ASGI)
+# persistent per-thread connections are not reused reliably and can pile up,
+# so they are always off there; use the pool to reuse connections.
+DATABASES["default"]["CONN_MAX_AGE"] = int(os.environ.get("DB_CONN_MAX_AGE", "60"))
+if os.environ.get("DJANGO_ASGI", "0") == "1":
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = (
+    os.environ.get("DB_CONN_HEALTH_CHECKS", "1") == "1"
+)
+if os.environ.get("DB_POOL", "0") == "1":
+    from psycopg_pool import ConnectionPool
+
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", "10")),
+            # Seconds an idle connection above min_size is kept, and how long a
+            # request waits for a free connection before failing.
+            "max_idle": float(os.environ.get("DB_POOL_MAX_IDLE", "300")),
+            "timeout": float(os.environ.get("DB_POOL_TIMEOUT", "10")),
+            "check": ConnectionPool.check_connection,
+        }
+    }
+
 if os.environ.get("USE_SQLITE", "0") == "1":
     DATABASES["default"] = {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
     }
 
+# Optional read replica for safe API reads (see config.db_router). With SQLite,
+# db.replica.sqlite3 stands in for it; copy db.sqlite3 over it to "replicate".
+READ_REPLICA = None
+if os.environ.get("USE_SQLITE", "0") == "1":
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.replica.sqlite3",
+    }
+    if os.environ.get("SQLITE_REPLICA", "0") == "1":
+        READ_REPLICA = "replica"
+elif os.environ.get("POSTGRES_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["POSTGRES_REPLICA_HOST"],
+        "PORT": os.environ.get("POSTGRES_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "TEST": {"MIRROR": "default"},
+    }
+    READ_REPLICA = "replica"
+DATABASE_ROUTERS = ["config.db_router.PrimaryReplicaRouter"]
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", "5"))
+
+# Throttle counters, idempotency results and cached users must be shared by all
+# workers; without REDIS_URL each process keeps its own in-memory cache.
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Tagged API response cache (see config.cache): entry lifetimes in seconds and
+# the size of each worker's in-process tier.
+API_CACHE_TTL = int(os.environ.get("API_CACHE_TTL", "300"))
+API_CACHE_LIST_TTL = int(os.environ.get("API_CACHE_LIST_TTL", "30"))
+API_CACHE_LOCAL_MAX_ENTRIES = int(os.environ.get("API_CACHE_LOCAL_MAX_ENTRIES", "1024"))
+# Client cache lifetime (seconds) of locked escrows, which never change again.
+LOCKED_ESCROW_MAX_AGE = int(
+    os.environ.get("LOCKED_ESCROW_MAX_AGE", str(365 * 24 * 60 * 60))
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -116,7 +211,23 @@ CORS_ALLOWED_ORIGINS = [
     if origin
 ]
 CORS_ALLOW_CREDENTIALS = True
-CORS_EXPOSE_HEADERS = ["Content-Type", "Authorization"]
+CORS_ALLOW_HEADERS = (
+    *default_headers,
+    "if-match",
+    "if-none-match",
+    "idempotency-key",
+    "x-request-id",
+)
+CORS_EXPOSE_HEADERS = [
+    "Content-Type",
+    "Authorization",
+    "ETag",
+    "Idempotent-Replayed",
+    "Retry-After",
+    "Server-Timing",
+    "X-Cache",
+    "X-Request-ID",
+]
 
 CSRF_TRUSTED_ORIGINS = [
     origin
@@ -126,16 +237,14 @@ CSRF_TRUSTED_ORIGINS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ),
-    "DEFAULT_PERMISSION_CLASSES": (
-        "rest_framework.permissions.IsAuthenticated",
+        "accounts.authentication.CachedJWTAuthentication",
     ),
+    "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
     "DEFAULT_THROTTLE_CLASSES": (
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "config.throttling.AnonSlidingWindowThrottle",
+        "config.throttling.UserSlidingWindowThrottle",
     ),
     "DEFAULT_THROTTLE_RATES": {
         "anon": os.environ.get("THROTTLE_ANON", "20/min"),
@@ -143,28 +252,121 @@ REST_FRAMEWORK = {
     },
 }
 
+# Seconds an authenticated user's snapshot is reused (see accounts.authentication).
+AUTH_USER_CACHE_TTL = int(os.environ.get("AUTH_USER_CACHE_TTL", "60"))
+
+# Fail read requests that issue SQL while serializing (see escrows.prefetch).
+PREFETCH_PLANNER_STRICT = (
+    os.environ.get("PREFETCH_PLANNER_STRICT", "1" if DEBUG else "0") == "1"
+)
+
+# Per-request profile (see config.profiling): Server-Timing header, and the
+# most queries a request may run, keyed by "METHOD url-name" or url name.
+# Over-budget requests are logged, or raise when strict (always in the test
+# suite, see config.test_runner). Routes without an entry get the default.
+# Reads are planned up front, so their budgets do not grow with the data.
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "1") == "1"
+QUERY_BUDGETS = {
+    "GET escrow-list": 5,
+    "GET escrow-detail": 5,
+    "GET party-list": 2,
+    "GET party-detail": 2,
+    "GET broker-list": 2,
+    "GET broker-detail": 2,
+    "GET commission-pool": 3,
+    "GET my-invitations": 2,
+    "GET me": 1,
+    "escrow-list": 12,
+    "escrow-detail": 12,
+    "party-list": 5,
+    "party-detail": 6,
+    "broker-list": 8,
+    "broker-detail": 12,
+    "commission-pool": 16,
+    "commission-pool-lock": 13,
+}
+QUERY_BUDGET_DEFAULT = int(os.environ.get("QUERY_BUDGET_DEFAULT", "25"))
+QUERY_BUDGET_STRICT = os.environ.get("QUERY_BUDGET_STRICT", "0") == "1"
+TEST_RUNNER = "config.test_runner.TestRunner"
+
+# Request queries taking at least this many milliseconds are logged with
+# their plan to a ring buffer of SLOW_QUERY_LOG_SIZE entries in the shared
+# cache (see config.slow_queries). An empty SLOW_QUERY_MS turns it off.
+# Parameter values may hold personal data and are only kept when
+# SLOW_QUERY_LOG_PARAMS=1.
+SLOW_QUERY_MS = os.environ.get("SLOW_QUERY_MS", "200")
+SLOW_QUERY_MS = float(SLOW_QUERY_MS) if SLOW_QUERY_MS else None
+SLOW_QUERY_LOG_SIZE = int(os.environ.get("SLOW_QUERY_LOG_SIZE", "50"))
+SLOW_QUERY_LOG_PARAMS = os.environ.get("SLOW_QUERY_LOG_PARAMS", "0") == "1"
+
+# Where the sampling profiler writes collapsed-stack files, and how many it
+# keeps (see config.sampling). Defaults to a directory in the temp dir.
+PROFILER_DIR = os.environ.get("PROFILER_DIR", "")
+PROFILER_MAX_FILES = int(os.environ.get("PROFILER_MAX_FILES", "200"))
+
+# Bearer token Prometheus sends to /metrics/; unset disables the endpoint
+# outside DEBUG.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# Idempotency-Key replay window and how long duplicates wait on an in-flight
+# request, in seconds (see escrows.idempotency).
+IDEMPOTENCY_TTL = int(os.environ.get("IDEMPOTENCY_TTL", str(24 * 60 * 60)))
+IDEMPOTENCY_WAIT = float(os.environ.get("IDEMPOTENCY_WAIT", "0.25"))
+
 SIMPLE_JWT = {
-    "ACCESS_TOKEN_LIFETIME": timedelta(minutes=int(os.environ.get("JWT_ACCESS_MINUTES", "5"))),
-    "REFRESH_TOKEN_LIFETIME": timedelta(days=int(os.environ.get("JWT_REFRESH_DAYS", "1"))),
+    "ACCESS_TOKEN_LIFETIME": timedelta(
+        minutes=int(os.environ.get("JWT_ACCESS_MINUTES", "5"))
+    ),
+    "REFRESH_TOKEN_LIFETIME": timedelta(
+        days=int(os.environ.get("JWT_REFRESH_DAYS", "1"))
+    ),
     "SIGNING_KEY": os.environ.get("JWT_SIGNING_KEY", SECRET_KEY),
     "AUTH_HEADER_TYPES": ("Bearer",),
+    # Rotation is tracked per session by accounts.tokens.FamilyRefreshToken.
     "ROTATE_REFRESH_TOKENS": True,
-    "BLACKLIST_AFTER_ROTATION": True,
+    "BLACKLIST_AFTER_ROTATION": False,
     "UPDATE_LAST_LOGIN": True,
 }
 
+# Records are queued and written by a background thread (see config.logs),
+# as JSON lines unless LOG_FORMAT=text. LOG_INFO_SAMPLE_RATE keeps that
+# fraction of requests' INFO records; warnings and errors are always kept.
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+LOG_INFO_SAMPLE_RATE = float(os.environ.get("LOG_INFO_SAMPLE_RATE", "1"))
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
+    "filters": {
+        "request_context": {"()": "config.logs.RequestContextFilter"},
+        "sample_info": {
+            "()": "config.logs.InfoSamplingFilter",
+            "rate": LOG_INFO_SAMPLE_RATE,
+        },
+    },
+    "formatters": {
+        "json": {"()": "config.logs.JSONFormatter"},
+        "text": {
+            "format": "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+        },
+    },
     "handlers": {
         "console": {
-            "class": "logging.StreamHandler",
+            "class": "config.logs.QueueStreamHandler",
+            "formatter": LOG_FORMAT,
+            "filters": ["request_context", "sample_info"],
         }
     },
     "root": {
         "handlers": ["console"],
         "level": os.environ.get("DJANGO_LOG_LEVEL", "INFO"),
     },
+    "loggers": {
+        # One record per request, with query count and timings as extra fields.
+        "config.profiling": {
+            "level": os.environ.get("REQUEST_LOG_LEVEL", "INFO"),
+        },
+    },
 }
 
 AUTH_USER_MODEL = "accounts.User"
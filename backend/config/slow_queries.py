@@ -0,0 +1,118 @@
+"""Slow-query log with the plan of each captured statement.
+
+``RequestProfile`` hands every request query that takes at least
+``SLOW_QUERY_MS`` milliseconds to ``record_slow_query``. It stores the
+parameterized statement, the request's route and view, the innermost
+project stack frame that ran the query, and the database's plan for the
+statement. The plan comes from ``EXPLAIN`` without ``ANALYZE`` on PostgreSQL,
+or ``EXPLAIN QUERY PLAN`` on SQLite, so the statement is not run again.
+Parameter values (emails, tokens, amounts) are only kept, in the entry and its
+log record, when ``SLOW_QUERY_LOG_PARAMS`` is on.
+
+Entries go to a ring buffer of ``SLOW_QUERY_LOG_SIZE`` slots in the shared
+cache, so every worker writes to the same log and ``/ops/slow-queries/``
+shows all of them. Plans are read in a savepoint, so a failed ``EXPLAIN``
+cannot break the request's transaction.
+"""
+
+from __future__ import annotations
+
+import logging
+import traceback
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SEQUENCE_KEY = "slowq:seq"
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+MAX_SQL_LENGTH = 10_000
+
+
+def log_size() -> int:
+    return getattr(settings, "SLOW_QUERY_LOG_SIZE", 50)
+
+
+def slot_keys() -> list[str]:
+    return [f"slowq:{slot}" for slot in range(log_size())]
+
+
+def append(entry: dict) -> None:
+    cache.add(SEQUENCE_KEY, 0, None)
+    sequence = cache.incr(SEQUENCE_KEY)
+    cache.set(f"slowq:{sequence % log_size()}", {**entry, "sequence": sequence}, None)
+
+
+def entries() -> list[dict]:
+    """Logged queries, newest first."""
+    logged = cache.get_many(slot_keys()).values()
+    return sorted(logged, key=lambda entry: entry["sequence"], reverse=True)
+
+
+def clear() -> None:
+    cache.delete_many(slot_keys())
+
+
+def origin_frame() -> str | None:
+    """Innermost frame of project code on the current stack, outside this module."""
+    base_dir = str(settings.BASE_DIR)
+    skipped = {__file__, str(Path(__file__).with_name("profiling.py"))}
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename in skipped or "site-packages" in frame.filename:
+            continue
+        if frame.filename.startswith(base_dir):
+            path = Path(frame.filename).relative_to(base_dir)
+            return f"{path}:{frame.lineno} in {frame.name}"
+    return None
+
+
+def explain(connection, sql: str, params) -> str:
+    if not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return ""
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            return "\n".join(str(row[-1]) for row in cursor.fetchall())
+    except DatabaseError as exc:
+        return f"EXPLAIN failed: {exc}"
+
+
+def printable(params) -> list:
+    if params is None:
+        return []
+    values = params.values() if isinstance(params, dict) else params
+    return [
+        value if isinstance(value, (int, float, str, bool, type(None))) else repr(value)
+        for value in values
+    ]
+
+
+def record_slow_query(
+    request, connection, sql: str, params, many: bool, seconds: float
+) -> None:
+    match = getattr(request, "resolver_match", None)
+    entry = {
+        "at": timezone.now().isoformat(),
+        "ms": round(seconds * 1000, 2),
+        "database": connection.alias,
+        "method": request.method,
+        "path": request.path,
+        "route": match.view_name if match else None,
+        "view": match._func_path if match else None,
+        "frame": origin_frame(),
+        "sql": sql[:MAX_SQL_LENGTH],
+        "plan": "" if many else explain(connection, sql, params),
+    }
+    if getattr(settings, "SLOW_QUERY_LOG_PARAMS", False):
+        entry["params"] = [] if many else printable(params)
+    append(entry)
+    logger.warning(
+        "Slow query (%.1f ms) in %s",
+        entry["ms"],
+        entry["route"] or entry["path"],
+        extra=entry,
+    )
@@ -0,0 +1,30 @@
+"""Test runner enforcing the query guards for the whole suite."""
+
+from __future__ import annotations
+
+import logging
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """``DiscoverRunner`` with ``QUERY_BUDGET_STRICT`` on, whatever the environment.
+
+    An over-budget request then raises ``QueryBudgetExceeded`` in the test that
+    made it. Per-request ``config.profiling`` records are limited to warnings so
+    the test output stays readable.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.strict_budgets = override_settings(QUERY_BUDGET_STRICT=True)
+        self.strict_budgets.enable()
+        profiling = logging.getLogger("config.profiling")
+        self.profiling_level = profiling.level
+        profiling.setLevel(logging.WARNING)
+
+    def teardown_test_environment(self, **kwargs):
+        logging.getLogger("config.profiling").setLevel(self.profiling_level)
+        self.strict_budgets.disable()
+        super().teardown_test_environment(**kwargs)
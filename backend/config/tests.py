@@ -0,0 +1,484 @@
+from __future__ import annotations
+
+import io
+import json
+import logging
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import (
+    AsyncClient,
+    Client,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.urls import resolve
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+
+from accounts.models import User
+from accounts.serializers import LoginSerializer
+from config import logs, sampling, slow_queries
+from config.cache import MISS, TaggedCache
+from config.profiling import QueryBudgetExceeded
+from config.throttling import UserSlidingWindowThrottle
+
+
+class TenPerMinuteThrottle(UserSlidingWindowThrottle):
+    THROTTLE_RATES = {"user": "10/min"}
+
+
+class Clock:
+    def __init__(self, now: float = 600.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Endpoint(APIView):
+    throttle_cost = {"POST": 4}
+
+
+class SlidingWindowThrottleTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.clock = Clock()
+        self.user = User(pk=1, email="broker@example.com")
+
+    def check(self, method: str = "get") -> TenPerMinuteThrottle:
+        request = getattr(APIRequestFactory(), method)("/")
+        request.user = self.user
+        throttle = TenPerMinuteThrottle()
+        throttle.timer = self.clock
+        throttle.allowed = throttle.allow_request(request, Endpoint())
+        return throttle
+
+    def test_limit_is_enforced_and_rejections_are_refunded(self):
+        self.assertTrue(all(self.check().allowed for _ in range(10)))
+        for _ in range(3):
+            rejected = self.check()
+            self.assertFalse(rejected.allowed)
+        # 60s until the window rolls over, then 6s for the old window to decay.
+        self.assertAlmostEqual(rejected.wait(), 66.0)
+
+        # The previous window decays linearly instead of resetting at once.
+        self.clock.now += 60 + 15
+        self.assertTrue(all(self.check().allowed for _ in range(2)))
+        self.assertFalse(self.check().allowed)
+        self.clock.now += 45
+        self.assertTrue(self.check().allowed)
+
+    def test_cost_weights_are_charged_per_method(self):
+        self.assertTrue(self.check("post").allowed)
+        self.assertTrue(self.check("post").allowed)
+        rejected = self.check("post")
+        self.assertFalse(rejected.allowed)
+        self.assertTrue(self.check().allowed)
+        self.assertTrue(self.check().allowed)
+        self.assertFalse(self.check().allowed)
+
+
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_login_costs_more_than_reads(self):
+        client = APIClient()
+        payload = {"email": "nobody@example.com", "password": "wrong-password"}
+        # The default anonymous rate is 20/min and each login attempt costs 5.
+        statuses = [
+            client.post("/auth/login/", payload, format="json").status_code
+            for _ in range(5)
+        ]
+        self.assertEqual(statuses, [401, 401, 401, 401, 429])
+
+
+class TaggedCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_invalidation_reaches_other_processes(self):
+        writer, reader = TaggedCache(max_entries=2), TaggedCache(max_entries=2)
+        reader.get_or_set("a", ["escrow:1"], lambda: "A")
+        reader.get_or_set("b", ["escrow:2"], lambda: "B")
+        self.assertEqual(reader.get("a"), "A")
+
+        writer.invalidate("escrow:1")
+        self.assertIs(reader.get("a"), MISS)
+        self.assertEqual(reader.get("b"), "B")
+        self.assertEqual(reader.stats.stale, 1)
+
+        # The local tier is bounded; evicted entries are refetched from the shared one.
+        reader.get_or_set("c", ["escrow:3"], lambda: "C")
+        reader.get_or_set("d", ["escrow:3"], lambda: "D")
+        self.assertEqual(len(reader.local), 2)
+        self.assertEqual(reader.get("b"), "B")
+        self.assertEqual(reader.stats.shared_hits, 1)
+
+
+class BrowserMiddlewareTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            email="admin@example.com", password="admin-pass"
+        )
+
+    def test_api_requests_skip_browser_middleware(self):
+        response = Client().get("/health/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Frame-Options", response)
+        self.assertNotIn("Cookie", response.get("Vary", ""))
+
+    def test_admin_keeps_sessions_and_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        login_page = client.get("/admin/login/")
+        self.assertEqual(login_page["X-Frame-Options"], "DENY")
+        self.assertIn("csrftoken", login_page.cookies)
+
+        credentials = {"username": "admin@example.com", "password": "admin-pass"}
+        self.assertEqual(client.post("/admin/login/", credentials).status_code, 403)
+        credentials["csrfmiddlewaretoken"] = login_page.cookies["csrftoken"].value
+        self.assertEqual(client.post("/admin/login/", credentials).status_code, 302)
+        self.assertEqual(client.get("/admin/").status_code, 200)
+
+    async def test_async_handler_dispatches_by_path(self):
+        client = AsyncClient(enforce_csrf_checks=True)
+        self.assertNotIn("X-Frame-Options", await client.get("/health/"))
+        login_page = await client.get("/admin/login/")
+        self.assertIn("csrftoken", login_page.cookies)
+        response = await client.post("/admin/login/", {"username": "admin@example.com"})
+        self.assertEqual(response.status_code, 403)
+
+
+class RequestProfileTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(email="me@example.com", password="pass-1234")
+        self.client = APIClient()
+        # A real token, so authentication loads the user: one query with a cold cache.
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {LoginSerializer.get_token(user).access_token}"
+        )
+
+    def test_timings_are_reported_as_header_and_log_fields(self):
+        with self.assertLogs("config.profiling", "INFO") as logs:
+            response = self.client.get("/users/me/")
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^db;dur=[\d.]+;desc="1 queries", serialize;dur=[\d.]+, '
+            r"app;dur=[\d.]+, total;dur=[\d.]+$",
+        )
+        record = logs.records[0]
+        self.assertEqual((record.route, record.status, record.queries), ("me", 200, 1))
+        self.assertGreater(record.total_ms, 0)
+
+    def test_query_budget_raises_when_strict_and_logs_otherwise(self):
+        with self.settings(QUERY_BUDGETS={"GET me": 0}):
+            with self.assertRaisesMessage(
+                QueryBudgetExceeded, "GET me ran 1 queries, budget 0"
+            ):
+                self.client.get("/users/me/")
+            cache.clear()
+            with self.settings(QUERY_BUDGET_STRICT=False), self.assertLogs(
+                "config.profiling", "WARNING"
+            ) as logs:
+                self.assertEqual(self.client.get("/users/me/").status_code, 200)
+        self.assertEqual(logs.records[0].query_budget, 0)
+
+
+@override_settings(METRICS_TOKEN="scrape-token")
+class MetricsTests(TestCase):
+    def sample(self, name: str, **labels) -> float:
+        return REGISTRY.get_sample_value(name, labels) or 0.0
+
+    def scrape(self, token: str = "scrape-token"):
+        return Client().get("/metrics/", headers={"authorization": f"Bearer {token}"})
+
+    def test_requests_are_recorded_per_route(self):
+        health = {"method": "GET", "route": "health"}
+        before = self.sample("http_request_duration_seconds_count", **health)
+        unmatched = self.sample(
+            "http_responses_total", method="GET", route="unmatched", status="404"
+        )
+        Client().get("/health/")
+        Client().get("/no-such-page/")
+
+        self.assertEqual(
+            self.sample("http_request_duration_seconds_count", **health), before + 1
+        )
+        self.assertEqual(
+            self.sample(
+                "http_responses_total", method="GET", route="unmatched", status="404"
+            ),
+            unmatched + 1,
+        )
+        response = self.scrape()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            response["Content-Type"].startswith("text/plain; version=0.0.4")
+        )
+        self.assertIn(
+            'http_request_db_queries_count{method="GET",route="health"}',
+            response.content.decode(),
+        )
+
+    def test_throttle_rejections_are_counted(self):
+        cache.clear()
+        before = self.sample("throttle_rejections_total", scope="anon", route="login")
+        payload = {"email": "nobody@example.com", "password": "wrong-password"}
+        for _ in range(5):
+            APIClient().post("/auth/login/", payload, format="json")
+        self.assertEqual(
+            self.sample("throttle_rejections_total", scope="anon", route="login"),
+            before + 1,
+        )
+
+    def test_scrapes_need_the_token(self):
+        self.assertEqual(self.scrape("wrong").status_code, 401)
+        with self.settings(METRICS_TOKEN=""):
+            self.assertEqual(self.scrape().status_code, 404)
+
+
+@override_settings(SLOW_QUERY_MS=0, SLOW_QUERY_LOG_SIZE=3)
+class SlowQueryLogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(email="me@example.com", password="pass-1234")
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {LoginSerializer.get_token(user).access_token}"
+        )
+        self.admin = APIClient()
+        self.admin.force_authenticate(
+            User.objects.create_superuser(
+                email="admin@example.com", password="admin-pass"
+            )
+        )
+
+    def test_slow_queries_are_logged_with_their_plan(self):
+        with self.assertLogs("config.slow_queries", "WARNING"):
+            self.client.get("/users/me/")
+        [entry] = slow_queries.entries()
+        self.assertEqual((entry["method"], entry["route"]), ("GET", "me"))
+        self.assertEqual(entry["view"], "accounts.views.MeView")
+        self.assertIn('FROM "accounts_user"', entry["sql"])
+        self.assertTrue(entry["frame"].startswith("accounts/"), entry["frame"])
+        self.assertIn("accounts_user", entry["plan"])
+        self.assertNotIn("params", entry)
+
+        cache.clear()
+        with self.settings(SLOW_QUERY_LOG_PARAMS=True), self.assertLogs(
+            "config.slow_queries", "WARNING"
+        ):
+            self.client.get("/users/me/")
+        [entry] = slow_queries.entries()
+        self.assertTrue(entry["params"])
+
+    @override_settings(AUTH_USER_CACHE_TTL=0)
+    def test_log_is_bounded_and_admin_only(self):
+        with self.assertLogs("config.slow_queries", "WARNING"):
+            for _ in range(4):
+                self.client.get("/users/me/")
+            self.assertEqual(self.client.get("/ops/slow-queries/").status_code, 403)
+
+        logged = self.admin.get("/ops/slow-queries/").data
+        self.assertEqual([entry["sequence"] for entry in logged], [5, 4, 3])
+        self.assertEqual(logged[0]["route"], "ops-slow-queries")
+        self.assertEqual(self.admin.delete("/ops/slow-queries/").status_code, 204)
+        self.assertEqual(slow_queries.entries(), [])
+
+
+def spin(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class SamplingProfilerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        sampling.switch.set(None)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(PROFILER_DIR=directory.name))
+        user = User.objects.create_user(email="me@example.com", password="pass-1234")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.admin = APIClient()
+        self.admin.force_authenticate(
+            User.objects.create_superuser(
+                email="admin@example.com", password="admin-pass"
+            )
+        )
+
+    def test_sampler_collapses_stacks(self):
+        sampler = sampling.StackSampler(threading.get_ident(), 0.001).start()
+        spin(0.05)
+        stacks = sampler.stop()
+        self.assertTrue(any(stack.endswith("config.tests.spin") for stack in stacks))
+        self.assertTrue(all(";" in stack and " " not in stack for stack in stacks))
+
+    def test_async_handler_samples_the_thread_running_a_sync_view(self):
+        access = (
+            APIClient()
+            .post(
+                "/auth/login/",
+                {"email": "me@example.com", "password": "pass-1234"},
+                format="json",
+            )
+            .data["access"]
+        )
+        sampling.switch.set({"route": "me", "interval_ms": 1}, 60)
+        samplers = []
+        original = sampling.StackSampler
+
+        def record(thread_id, interval):
+            samplers.append(thread_id)
+            return original(thread_id, interval)
+
+        with mock.patch.object(sampling, "StackSampler", record):
+            response = async_to_sync(AsyncClient().get)(
+                "/users/me/", headers={"authorization": f"Bearer {access}"}
+            )
+        self.assertIn("X-Profile-File", response)
+        # async_to_sync runs the event loop in another thread and the sync view
+        # in this one.
+        self.assertEqual(samplers, [threading.get_ident()])
+
+    def test_switch_selects_requests_by_route_or_header(self):
+        self.assertEqual(
+            self.client.put("/ops/profiler/", {"route": "me"}).status_code, 403
+        )
+        self.assertEqual(
+            self.admin.put("/ops/profiler/", {}, format="json").status_code, 400
+        )
+        response = self.admin.put(
+            "/ops/profiler/", {"route": "me", "interval_ms": 1}, format="json"
+        )
+        self.assertEqual(response.data["switch"]["route"], "me")
+
+        name = self.client.get("/users/me/")["X-Profile-File"]
+        self.assertRegex(name, r"-GET-me-[0-9a-f]{8}\.collapsed$")
+        self.assertNotIn("X-Profile-File", self.client.get("/escrows/"))
+        self.assertEqual(self.admin.get("/ops/profiler/").data["profiles"], [name])
+        profile = self.admin.get(f"/ops/profiler/{name}")
+        self.assertEqual(profile.status_code, 200)
+        for line in b"".join(profile.streaming_content).decode().splitlines():
+            self.assertRegex(line, r"^\S+ \d+$")
+        self.assertEqual(self.admin.get("/ops/profiler/..").status_code, 404)
+
+        self.admin.put("/ops/profiler/", {"header": "X-Profile"}, format="json")
+        self.assertIn(
+            "X-Profile-File", self.client.get("/escrows/", headers={"X-Profile": "1"})
+        )
+        self.assertNotIn("X-Profile-File", self.client.get("/escrows/"))
+
+        self.assertIsNone(self.admin.delete("/ops/profiler/").data["switch"])
+        self.assertNotIn(
+            "X-Profile-File", self.client.get("/escrows/", headers={"X-Profile": "1"})
+        )
+
+
+class BlockingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.released = threading.Event()
+
+    def write(self, text):
+        self.released.wait()
+        return super().write(text)
+
+
+class StructuredLoggingTests(TestCase):
+    def record(self, level=logging.INFO, **extra) -> logging.LogRecord:
+        record = logging.LogRecord(
+            "escrows", level, __file__, 1, "Locked %s", ("escrow 7",), None
+        )
+        record.__dict__.update(extra)
+        return record
+
+    def test_request_id_is_echoed_or_generated(self):
+        self.assertEqual(
+            Client().get("/health/", headers={"X-Request-ID": "edge-42"})[
+                "X-Request-ID"
+            ],
+            "edge-42",
+        )
+        generated = Client().get("/health/", headers={"X-Request-ID": "bad id\n"})[
+            "X-Request-ID"
+        ]
+        self.assertRegex(generated, r"^[0-9a-f]{32}$")
+
+    def test_json_lines_carry_request_context_and_extra_fields(self):
+        request = RequestFactory().get("/escrows/")
+        request.request_id = "req-1"
+        request.user = User(pk=5)
+        request.resolver_match = resolve("/escrows/")
+        token = logs.current_request.set(request)
+        try:
+            record = self.record(queries=3)
+            logs.RequestContextFilter().filter(record)
+        finally:
+            logs.current_request.reset(token)
+        line = json.loads(logs.JSONFormatter().format(record))
+        self.assertEqual(line["message"], "Locked escrow 7")
+        self.assertEqual(
+            (line["request_id"], line["user_id"], line["route"], line["queries"]),
+            ("req-1", 5, "escrow-list", 3),
+        )
+
+    def test_info_sampling_keeps_whole_requests_and_all_warnings(self):
+        sampler = logs.InfoSamplingFilter(rate=0.5)
+        kept = {
+            rid: sampler.filter(self.record(request_id=rid))
+            for rid in map(str, range(200))
+        }
+        self.assertTrue(40 < sum(kept.values()) < 160)
+        self.assertTrue(
+            all(
+                sampler.filter(self.record(request_id=rid)) == keep
+                for rid, keep in kept.items()
+            )
+        )
+        self.assertTrue(
+            all(
+                sampler.filter(self.record(logging.WARNING, request_id=rid))
+                for rid in kept
+            )
+        )
+
+    def test_handler_never_blocks_on_a_slow_stream(self):
+        stream = BlockingStream()
+        handler = logs.QueueStreamHandler(stream, maxsize=2)
+        handler.setFormatter(logs.JSONFormatter())
+        counted = REGISTRY.get_sample_value("log_records_dropped_total")
+        started = time.perf_counter()
+        for _ in range(10):
+            handler.handle(self.record())
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertGreaterEqual(handler.dropped, 7)
+        self.assertEqual(
+            REGISTRY.get_sample_value("log_records_dropped_total") - counted,
+            handler.dropped,
+        )
+
+        stream.released.set()
+        handler.close()
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(len(lines), 10 - handler.dropped + 1)
+        self.assertEqual(lines[0]["message"], "Locked escrow 7")
+        self.assertEqual(
+            (lines[-1]["level"], lines[-1]["dropped"]), ("WARNING", handler.dropped)
+        )
+
+        # A closed handler no longer restarts its listener in forked children.
+        handler.after_fork()
+        self.assertIsNone(handler.listener)
+        self.assertNotIn(handler, logs.open_handlers)
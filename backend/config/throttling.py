@@ -0,0 +1,94 @@
+"""Sliding-window-counter throttles backed by the shared Django cache.
+
+DRF's ``SimpleRateThrottle`` stores the full request history per client and
+rewrites it on every check; with a per-process cache each worker also enforces
+the limit on its own. Here every ``(scope, client)`` pair keeps one integer per
+fixed window, updated with the cache's atomic ``incr``, and the rate is
+estimated as::
+
+    previous_window * (1 - elapsed / duration) + current_window
+
+so a check costs a constant number of cache operations regardless of the rate.
+
+Views may declare ``throttle_cost`` (an int, or a dict keyed by HTTP method) to
+charge more than one unit per request; rejected requests are refunded.
+"""
+
+from __future__ import annotations
+
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+from .metrics import record_throttle_rejection
+
+
+def request_cost(request, view) -> int:
+    cost = getattr(view, "throttle_cost", 1)
+    if isinstance(cost, dict):
+        cost = cost.get(request.method, 1)
+    return cost
+
+
+class SlidingWindowMixin:
+    """Replace ``SimpleRateThrottle``'s history list with two window counters."""
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.cost = request_cost(request, view)
+        self.now = self.timer()
+        window, self.elapsed = divmod(self.now, self.duration)
+        current_key = f"{self.key}:{int(window)}"
+        current = self.increment(current_key, self.cost)
+        self.previous = self.cache.get(f"{self.key}:{int(window) - 1}", 0)
+        self.current = current - self.cost
+
+        weight = 1 - self.elapsed / self.duration
+        if self.previous * weight + current <= self.num_requests:
+            return True
+        try:
+            self.cache.decr(current_key, self.cost)
+        except ValueError:
+            pass
+        match = getattr(request, "resolver_match", None)
+        record_throttle_rejection(self.scope, match.view_name if match else None)
+        return False
+
+    def increment(self, key: str, cost: int) -> int:
+        timeout = 2 * self.duration
+        if self.cache.add(key, cost, timeout):
+            return cost
+        try:
+            return self.cache.incr(key, cost)
+        except ValueError:
+            # The counter expired between add() and incr().
+            self.cache.set(key, cost, timeout)
+            return cost
+
+    def wait(self):
+        """Seconds until a request of the same cost fits, assuming no others arrive."""
+        room = self.num_requests - self.cost
+        if room < 0:
+            return None
+        remaining = self.duration - self.elapsed
+        if self.previous and room - self.current >= 0:
+            needed = (
+                self.duration * (1 - (room - self.current) / self.previous)
+                - self.elapsed
+            )
+            if needed <= remaining:
+                return max(needed, 0)
+        # Once this window becomes the previous one it decays the same way.
+        needed = self.duration * (1 - room / self.current) if self.current else 0
+        return remaining + max(needed, 0)
+
+
+class AnonSlidingWindowThrottle(SlidingWindowMixin, AnonRateThrottle):
+    pass
+
+
+class UserSlidingWindowThrottle(SlidingWindowMixin, UserRateThrottle):
+    pass
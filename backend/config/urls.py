@@ -6,6 +6,8 @@ from django.http import JsonResponse
 from django.urls import include, path
 from django.views.decorators.http import require_GET
 
+from .views import cache_stats, metrics, profile_file, profiler, slow_query_log
+
 
 @require_GET
 def health_check(_request):
@@ -15,6 +17,11 @@ def health_check(_request):
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("health/", health_check, name="health"),
+    path("ops/cache/", cache_stats, name="ops-cache"),
+    path("ops/slow-queries/", slow_query_log, name="ops-slow-queries"),
+    path("ops/profiler/", profiler, name="ops-profiler"),
+    path("ops/profiler/<str:name>", profile_file, name="ops-profile-file"),
+    path("metrics/", metrics, name="metrics"),
     path("", include("accounts.urls")),
     path("", include("escrows.urls")),
 ]
@@ -0,0 +1,47 @@
+"""URL configuration used under ASGI (see ``config.asgi``).
+
+Puts async read endpoints in front of the regular routes. Non-read methods on
+the same paths still reach the DRF views.
+"""
+
+from __future__ import annotations
+
+from django.urls import path, re_path
+
+from accounts.views import MeView
+from escrows.views import BrokerRepresentationViewSet, EscrowViewSet, PartyViewSet
+
+from .async_views import async_read
+from .urls import urlpatterns as sync_urlpatterns
+
+escrow_list = async_read(
+    EscrowViewSet, {"get": "list", "post": "create"}, basename="escrow"
+)
+escrow_detail = async_read(
+    EscrowViewSet,
+    {
+        "get": "retrieve",
+        "put": "update",
+        "patch": "partial_update",
+        "delete": "destroy",
+    },
+    basename="escrow",
+    detail=True,
+)
+
+urlpatterns = [
+    re_path(r"^escrows/$", escrow_list, name="escrow-list"),
+    re_path(r"^escrows/(?P<pk>[^/.]+)/$", escrow_detail, name="escrow-detail"),
+    path(
+        "escrows/<int:escrow_pk>/parties/",
+        async_read(PartyViewSet, {"get": "list", "post": "create"}),
+        name="party-list",
+    ),
+    path(
+        "escrows/<int:escrow_pk>/brokers/",
+        async_read(BrokerRepresentationViewSet, {"get": "list", "post": "create"}),
+        name="broker-list",
+    ),
+    path("users/me/", async_read(MeView), name="me"),
+    *sync_urlpatterns,
+]
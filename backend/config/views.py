@@ -0,0 +1,96 @@
+"""Operational endpoints for staff and monitoring."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from . import sampling, slow_queries
+from .cache import api_cache
+from .metrics import exposition
+from .serializers import ProfilerSwitchSerializer
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def cache_stats(request):
+    """Hit/miss counters of this worker's API cache."""
+    return Response(
+        {**api_cache.stats.as_dict(), "local_entries": len(api_cache.local)}
+    )
+
+
+@api_view(["GET", "DELETE"])
+@permission_classes([permissions.IsAdminUser])
+def slow_query_log(request):
+    """Recently captured slow queries with their plans, newest first.
+
+    ``DELETE`` empties the log.
+    """
+    if request.method == "DELETE":
+        slow_queries.clear()
+        return Response(status=204)
+    return Response(slow_queries.entries())
+
+
+@api_view(["GET", "PUT", "DELETE"])
+@permission_classes([permissions.IsAdminUser])
+def profiler(request):
+    """The sampling profiler's switch and the newest profiles.
+
+    ``PUT`` turns the profiler on and ``DELETE`` turns it off.
+    """
+    if request.method == "PUT":
+        serializer = ProfilerSwitchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        duration = serializer.validated_data["duration"]
+        expires_at = timezone.now() + timedelta(seconds=duration)
+        sampling.switch.set(
+            {**serializer.validated_data, "expires_at": expires_at.isoformat()},
+            duration,
+        )
+    elif request.method == "DELETE":
+        sampling.switch.set(None)
+    profiles = [path.name for path in sampling.profile_files()[:50]]
+    return Response({"switch": sampling.switch.current(), "profiles": profiles})
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def profile_file(request, name):
+    """One collapsed-stack profile, as written by the sampling profiler."""
+    path = sampling.profile_dir() / name
+    if (
+        not name.endswith(sampling.PROFILE_SUFFIX)
+        or path.name != name
+        or not path.is_file()
+    ):
+        raise Http404
+    return FileResponse(path.open("rb"), content_type="text/plain; charset=utf-8")
+
+
+@require_GET
+def metrics(request):
+    """Prometheus scrape endpoint, authenticated with ``METRICS_TOKEN`` as bearer token.
+
+    Without a token it only answers in ``DEBUG``.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if not token and not settings.DEBUG:
+        raise Http404
+    if token and not constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        response = HttpResponse(status=401)
+        response["WWW-Authenticate"] = "Bearer"
+        return response
+    body, content_type = exposition()
+    return HttpResponse(body, content_type=content_type)
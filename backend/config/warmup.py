@@ -0,0 +1,48 @@
+"""Warm a server process before it takes traffic.
+
+``warm_up`` does the work a cold process would otherwise do during its first
+requests. It builds the URL resolver, which imports every view. It imports each
+app's serializers and fills the model metadata caches. It also connects to
+every database once, so a bad configuration fails at startup rather than on
+the first request.
+
+Connections are closed afterwards. Under gunicorn's ``preload_app`` this runs
+in the master, and forked workers must not share its sockets.
+"""
+
+from __future__ import annotations
+
+from importlib import import_module
+
+from django.apps import apps
+from django.db import connections
+from django.urls import get_resolver
+from django.utils.module_loading import module_has_submodule
+
+
+def warm_up() -> dict[str, int]:
+    resolver = get_resolver()
+    resolver.reverse_dict  # noqa: B018 - populates the resolver's lookup tables
+
+    serializer_modules = 0
+    for app_config in apps.get_app_configs():
+        if module_has_submodule(app_config.module, "serializers"):
+            import_module(f"{app_config.name}.serializers")
+            serializer_modules += 1
+
+    models = apps.get_models()
+    for model in models:
+        model._meta.get_fields()
+
+    for connection in connections.all():
+        connection.ensure_connection()
+        connection.close()
+        if connection.settings_dict.get("OPTIONS", {}).get("pool"):
+            connection.close_pool()
+
+    return {
+        "url_patterns": len(resolver.url_patterns),
+        "serializer_modules": serializer_modules,
+        "models": len(models),
+        "databases": len(connections.all()),
+    }
@@ -0,0 +1,121 @@
+"""Maintenance and lookup helpers for the ``EscrowAccess`` membership table."""
+
+from __future__ import annotations
+
+from django.db import transaction
+from django.db.models import Q, QuerySet
+from django.db.models.functions import Lower
+
+from .caching import invalidate_viewers
+from .models import (
+    BrokerRepresentation,
+    BrokerStatus,
+    Escrow,
+    EscrowAccess,
+    EscrowAccessKind,
+    normalize_email,
+)
+
+
+def accessible_escrow_ids(user) -> QuerySet:
+    """Return a ``values("escrow_id")`` subquery of escrows visible to ``user``."""
+    match = Q(user_id=user.pk)
+    email = normalize_email(getattr(user, "email", ""))
+    if email:
+        match |= Q(email=email)
+    return EscrowAccess.objects.filter(match).values("escrow_id")
+
+
+def pending_invitations(user) -> QuerySet:
+    """Pending broker invitations addressed to ``user`` by account or normalized email.
+
+    Served by ``broker_user_status_idx`` and ``broker_invited_email_ci_idx``.
+    """
+    match = Q(user_id=user.pk)
+    email = normalize_email(getattr(user, "email", ""))
+    if email:
+        match |= Q(invited_email_ci=email)
+    return BrokerRepresentation.objects.alias(
+        invited_email_ci=Lower("invited_email")
+    ).filter(match, status=BrokerStatus.PENDING)
+
+
+def grant_creator_access(escrow: Escrow) -> EscrowAccess:
+    return EscrowAccess.objects.create(
+        escrow=escrow,
+        user_id=escrow.created_by_id,
+        kind=EscrowAccessKind.CREATOR,
+    )
+
+
+def sync_creator_access(escrow: Escrow) -> None:
+    """Create or refresh the creator row of ``escrow``."""
+    EscrowAccess.objects.update_or_create(
+        escrow_id=escrow.pk,
+        kind=EscrowAccessKind.CREATOR,
+        defaults={"user_id": escrow.created_by_id, "email": ""},
+    )
+
+
+def broker_access_row(representation: BrokerRepresentation) -> EscrowAccess:
+    return EscrowAccess(
+        escrow_id=representation.escrow_id,
+        user_id=representation.user_id,
+        email=normalize_email(representation.invited_email),
+        kind=EscrowAccessKind.BROKER,
+        broker_representation_id=representation.pk,
+    )
+
+
+def grant_broker_access(representation: BrokerRepresentation) -> None:
+    """Insert the access row of a newly created ``representation``."""
+    broker_access_row(representation).save(force_insert=True)
+
+
+def sync_broker_access(representation: BrokerRepresentation) -> None:
+    """Create or refresh the access row mirroring ``representation``.
+
+    Deleting the representation removes the row through the cascading one-to-one key.
+    """
+    EscrowAccess.objects.update_or_create(
+        broker_representation=representation,
+        defaults={
+            "escrow_id": representation.escrow_id,
+            "user_id": representation.user_id,
+            "email": normalize_email(representation.invited_email),
+            "kind": EscrowAccessKind.BROKER,
+        },
+    )
+
+
+def access_rows_for(escrow: Escrow, representations) -> list[EscrowAccess]:
+    rows = [
+        EscrowAccess(
+            escrow_id=escrow.pk,
+            user_id=escrow.created_by_id,
+            kind=EscrowAccessKind.CREATOR,
+        )
+    ]
+    rows.extend(broker_access_row(representation) for representation in representations)
+    return rows
+
+
+def rebuild_escrow_access(escrow_ids) -> int:
+    """Replace the access rows of ``escrow_ids`` with rows from the source tables."""
+    escrows = Escrow.objects.filter(pk__in=escrow_ids).only("id", "created_by_id")
+    representations: dict[int, list[BrokerRepresentation]] = {}
+    for representation in BrokerRepresentation.objects.filter(
+        escrow_id__in=escrow_ids
+    ).only("id", "escrow_id", "user_id", "invited_email"):
+        representations.setdefault(representation.escrow_id, []).append(representation)
+
+    rows: list[EscrowAccess] = []
+    for escrow in escrows:
+        rows.extend(access_rows_for(escrow, representations.get(escrow.pk, [])))
+
+    with transaction.atomic():
+        EscrowAccess.objects.filter(escrow_id__in=escrow_ids).delete()
+        EscrowAccess.objects.bulk_create(rows)
+        # bulk_create sends no post_save signals.
+        invalidate_viewers(rows)
+    return len(rows)
@@ -0,0 +1,180 @@
+"""Tagged caching of escrow reads on top of ``config.cache``.
+
+Tags used here:
+
+- ``escrow:<id>`` covers an escrow and everything nested in its representation.
+  ``touch_escrow`` bumps it for API writes (including bulk share updates) and
+  ``escrows.signals`` for any other save or delete of the escrow models.
+- ``user:<id>`` and ``email:<address>`` cover the set of escrows a user can see
+  and are bumped whenever an access row is granted to them.
+
+Detail entries are keyed per user because the access check happens when they
+are filled; losing access always goes through a write that bumps the escrow
+tag. List entries are tagged with the viewer and every escrow on the page.
+Entries filled from the read replica may predate a write that already bumped
+their tags, so they expire after ``REPLICA_STICKY_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.response import Response
+
+from config.cache import MISS, api_cache
+from config.db_router import read_alias, sticky_seconds
+
+from .models import normalize_email
+
+
+def escrow_tag(escrow_id) -> str:
+    return f"escrow:{escrow_id}"
+
+
+def user_tag(user_id) -> str:
+    return f"user:{user_id}"
+
+
+def email_tag(email: str) -> str:
+    return f"email:{normalize_email(email)}"
+
+
+def viewer_tags(user_id, email: str | None) -> list[str]:
+    tags = [user_tag(user_id)] if user_id else []
+    if normalize_email(email):
+        tags.append(email_tag(email))
+    return tags
+
+
+def invalidate_escrows(*escrow_ids) -> None:
+    api_cache.invalidate(
+        *(escrow_tag(escrow_id) for escrow_id in escrow_ids if escrow_id)
+    )
+
+
+def invalidate_viewers(rows) -> None:
+    """Invalidate the escrow lists of the users and emails of ``rows`` (access rows)."""
+    tags = set()
+    for row in rows:
+        tags.update(viewer_tags(row.user_id, row.email))
+    api_cache.invalidate(*tags)
+
+
+def fill_timeout(timeout: int | None = None) -> int | None:
+    """Entries filled from a lagging replica live no longer than its sticky window."""
+    if read_alias.get() is None:
+        return timeout
+    return min(api_cache.timeout if timeout is None else timeout, sticky_seconds())
+
+
+def request_key(prefix: str, request) -> str:
+    digest = hashlib.sha256(request.build_absolute_uri().encode()).hexdigest()[:32]
+    return f"api:{prefix}:{request.user.pk}:{digest}"
+
+
+def cached_response(data, status: str, **headers) -> Response:
+    response = Response(data)
+    for name, value in headers.items():
+        response[name] = value
+    response["X-Cache"] = status
+    return response
+
+
+class CachedEscrowReadMixin:
+    """Serve escrow detail and list responses from ``api_cache``.
+
+    Place it first in the bases so it wraps the conditional and planned reads.
+    """
+
+    list_cache_timeout = getattr(settings, "API_CACHE_LIST_TTL", 30)
+    cached_headers = ("ETag", "Cache-Control", "Vary")
+
+    def detail_key(self, request, kwargs) -> str | None:
+        """Cache key of a detail request, or None when it must not be cached."""
+        pk = str(kwargs.get(self.lookup_url_kwarg or self.lookup_field, ""))
+        if request.headers.get("If-None-Match") or not pk.isdigit():
+            return None
+        return request_key(f"escrow:{int(pk)}", request)
+
+    def lookup_detail(self, key: str):
+        """Return ``(hit, versions)``: a cached response, or tag versions to fill."""
+        cached = api_cache.get(key)
+        if cached is not MISS:
+            data, headers = cached
+            return cached_response(data, "HIT", **headers), None
+        pk = int(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        return None, api_cache.versions([escrow_tag(pk)])
+
+    def store_detail(self, key: str, response, versions: dict):
+        if response.status_code == 200:
+            headers = {
+                name: response[name]
+                for name in self.cached_headers
+                if response.has_header(name)
+            }
+            api_cache.set(key, (response.data, headers), versions, fill_timeout())
+        response["X-Cache"] = "MISS"
+        return response
+
+    def lookup_list(self, key: str):
+        cached = api_cache.get(key)
+        if cached is not MISS:
+            return cached_response(cached, "HIT"), None
+        self._listed = ()
+        return None, api_cache.versions(
+            viewer_tags(self.request.user.pk, self.request.user.email)
+        )
+
+    def store_list(self, key: str, response, versions: dict):
+        if response.status_code == 200:
+            versions.update(
+                api_cache.versions([escrow_tag(item.pk) for item in self._listed])
+            )
+            api_cache.set(
+                key, response.data, versions, fill_timeout(self.list_cache_timeout)
+            )
+        response["X-Cache"] = "MISS"
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        key = self.detail_key(request, kwargs)
+        if key is None:
+            return super().retrieve(request, *args, **kwargs)
+        hit, versions = self.lookup_detail(key)
+        if hit is not None:
+            return hit
+        return self.store_detail(
+            key, super().retrieve(request, *args, **kwargs), versions
+        )
+
+    def list(self, request, *args, **kwargs):
+        key = request_key("escrows", request)
+        hit, versions = self.lookup_list(key)
+        if hit is not None:
+            return hit
+        return self.store_list(key, super().list(request, *args, **kwargs), versions)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        key = self.detail_key(request, kwargs)
+        if key is None:
+            return await super().aretrieve(request, *args, **kwargs)
+        hit, versions = await sync_to_async(self.lookup_detail)(key)
+        if hit is not None:
+            return hit
+        response = await super().aretrieve(request, *args, **kwargs)
+        return await sync_to_async(self.store_detail)(key, response, versions)
+
+    async def alist(self, request, *args, **kwargs):
+        key = request_key("escrows", request)
+        hit, versions = await sync_to_async(self.lookup_list)(key)
+        if hit is not None:
+            return hit
+        response = await super().alist(request, *args, **kwargs)
+        return await sync_to_async(self.store_list)(key, response, versions)
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        self._listed = page or ()
+        return page
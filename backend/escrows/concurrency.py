@@ -0,0 +1,160 @@
+"""Optimistic concurrency for escrow resources through ``ETag`` / ``If-Match``.
+
+Versioned models carry an integer ``version`` column that every write bumps.
+The version is published as a strong ``ETag``. A ``PUT``/``PATCH`` with
+``If-Match`` claims the write with a single conditional
+``UPDATE ... SET version = version + 1 WHERE version IN (...)`` and answers 412
+when no row matched, so there is no separate read to race against. A ``GET``
+with a matching ``If-None-Match`` answers 304 after reading only the version
+column, without loading relations or serializing.
+
+Views that render several representations of one version (sparse fieldsets)
+append a variant to the tag, ``"<version>.<variant>"``. ``If-None-Match`` only
+matches the same variant; ``If-Match`` compares versions alone. The
+representation does not depend on the viewer, but responses answer per
+credentials and send ``Vary: Authorization``.
+"""
+
+from __future__ import annotations
+
+from django.db import transaction
+from django.db.models import F
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .caching import invalidate_escrows
+from .models import Escrow, EscrowStatus
+
+
+def etag_for(version: int, variant: str = "") -> str:
+    return quote_etag(f"{version}.{variant}" if variant else str(version))
+
+
+def parse_versions(header: str | None, variant: str | None = None) -> list[int] | None:
+    """Versions named by an ``If-Match``/``If-None-Match`` header.
+
+    Returns None when the header is absent or ``*`` (any version), otherwise the
+    list of integer versions it names; tags this API never issued are ignored, as
+    are tags of another variant when ``variant`` is given.
+    """
+    if not header:
+        return None
+    etags = parse_etags(header)
+    if etags == ["*"]:
+        return None
+    versions = []
+    for etag in etags:
+        value = etag.removeprefix("W/").strip('"')
+        number, _, tag_variant = value.partition(".")
+        if number.isdigit() and variant in (None, tag_variant):
+            versions.append(int(number))
+    return versions
+
+
+def bump_version(queryset, versions: list[int] | None = None) -> int:
+    """Increment ``version`` on the matching rows, optionally only at ``versions``."""
+    if versions is not None:
+        queryset = queryset.filter(version__in=versions)
+    return queryset.update(version=F("version") + 1)
+
+
+def touch_escrow(escrow_id: int) -> bool:
+    """Invalidate an escrow's ETag and cached reads before a nested resource write.
+
+    Returns False, writing nothing, when the escrow is locked. Inside a
+    transaction the UPDATE holds the escrow row until commit, so the write cannot
+    interleave with a concurrent lock.
+    """
+    escrows = Escrow.objects.filter(pk=escrow_id).exclude(status=EscrowStatus.LOCKED)
+    if not bump_version(escrows):
+        return False
+    invalidate_escrows(escrow_id)
+    return True
+
+
+class ConditionalRequestMixin:
+    """Viewset mixin adding ``ETag``, ``If-None-Match`` and ``If-Match`` handling.
+
+    Place it before ``QueryPlanMixin`` so the version column is always loaded.
+    """
+
+    version_field = "version"
+
+    def get_plan_extra_only(self):
+        return (*super().get_plan_extra_only(), self.version_field)
+
+    def get_version_queryset(self):
+        """The queryset narrowed to the single object addressed by the URL."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        return queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+    def etag_variant(self) -> str:
+        """Distinguishes the representations this request may get of one version."""
+        return ""
+
+    def set_etag(self, response, version: int):
+        response["ETag"] = etag_for(version, self.etag_variant())
+        patch_vary_headers(response, ["Authorization"])
+        return response
+
+    def with_etag(self, response, instance):
+        if response.status_code < 400:
+            self.set_etag(response, getattr(instance, self.version_field))
+        return response
+
+    def not_modified(self, version: int):
+        return self.set_etag(Response(status=status.HTTP_304_NOT_MODIFIED), version)
+
+    def expected_versions(self, request) -> list[int] | None:
+        return parse_versions(request.headers.get("If-None-Match"), self.etag_variant())
+
+    def current_version(self) -> int | None:
+        queryset = self.get_version_queryset().prefetch_related(None)
+        return queryset.values_list(self.version_field, flat=True).first()
+
+    def retrieve(self, request, *args, **kwargs):
+        expected = self.expected_versions(request)
+        if expected:
+            current = self.current_version()
+            if current in expected:
+                return self.not_modified(current)
+        instance = self.get_object()
+        return self.with_etag(Response(self.serialize(instance)), instance)
+
+    async def acurrent_version(self) -> int | None:
+        queryset = self.get_version_queryset().prefetch_related(None)
+        return await queryset.values_list(self.version_field, flat=True).afirst()
+
+    async def aretrieve(self, request, *args, **kwargs):
+        expected = self.expected_versions(request)
+        if expected:
+            current = await self.acurrent_version()
+            if current in expected:
+                return self.not_modified(current)
+        instance = await self.aget_object()
+        data = await self.aserialize(instance)
+        return self.with_etag(Response(data), instance)
+
+    def claim_write(self) -> bool:
+        """Bump the addressed row's version, honouring ``If-Match``; False if stale."""
+        expected = parse_versions(self.request.headers.get("If-Match"))
+        return bump_version(self.get_version_queryset(), expected) == 1
+
+    @transaction.atomic
+    def update(self, request, *args, **kwargs):
+        if not self.claim_write():
+            # Raises 404 for rows that are missing or not visible to the user.
+            self.get_object()
+            return Response(
+                {"detail": "The resource has changed; fetch it again before retrying."},
+                status=status.HTTP_412_PRECONDITION_FAILED,
+            )
+        response = super().update(request, *args, **kwargs)
+        return self.with_etag(response, self._updated)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self._updated = serializer.instance
@@ -0,0 +1,88 @@
+"""Migration operations that avoid long table locks on PostgreSQL.
+
+On other backends they behave exactly like the stock ``AddIndex`` and
+``AddConstraint`` operations, so SQLite development databases keep working.
+Migrations using them must set ``atomic = False`` because PostgreSQL refuses to
+build an index concurrently inside a transaction.
+"""
+
+from __future__ import annotations
+
+from django.db import migrations
+
+
+def is_postgresql(schema_editor) -> bool:
+    return schema_editor.connection.vendor == "postgresql"
+
+
+def invalid_index_exists(schema_editor, name: str) -> bool:
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = %s AND NOT i.indisvalid AND pg_table_is_visible(c.oid)",
+            [name],
+        )
+        return cursor.fetchone() is not None
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """``CREATE INDEX CONCURRENTLY`` on PostgreSQL, a plain ``AddIndex`` elsewhere.
+
+    A concurrent build that fails or is cancelled leaves an ``INVALID`` index
+    behind, and the migration is not recorded. Re-running it drops that leftover
+    and builds the index again; indexes the interrupted run finished are kept
+    (``IF NOT EXISTS``). Reversing drops the index with
+    ``DROP INDEX CONCURRENTLY IF EXISTS``; a failed drop also leaves the index
+    ``INVALID``, and simply reversing again removes it.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not is_postgresql(schema_editor):
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if invalid_index_exists(schema_editor, self.index.name):
+            self.drop_index(schema_editor)
+        sql = str(self.index.create_sql(model, schema_editor, concurrently=True))
+        schema_editor.execute(
+            sql.replace("INDEX CONCURRENTLY", "INDEX CONCURRENTLY IF NOT EXISTS", 1)
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not is_postgresql(schema_editor):
+            return super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            self.drop_index(schema_editor)
+
+    def drop_index(self, schema_editor) -> None:
+        name = schema_editor.quote_name(self.index.name)
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+class AddConstraintNotValid(migrations.AddConstraint):
+    """Add a check constraint as ``NOT VALID`` and validate it in a second statement.
+
+    ``VALIDATE CONSTRAINT`` only takes a ``SHARE UPDATE EXCLUSIVE`` lock, so reads
+    and writes continue while existing rows are checked.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not is_postgresql(schema_editor):
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        table = schema_editor.quote_name(model._meta.db_table)
+        name = schema_editor.quote_name(self.constraint.name)
+        schema_editor.execute(
+            f"{self.constraint.create_sql(model, schema_editor)} NOT VALID"
+        )
+        schema_editor.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
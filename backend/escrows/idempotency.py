@@ -0,0 +1,147 @@
+"""``Idempotency-Key`` support for create endpoints.
+
+A client that may retry a ``POST`` sends the same ``Idempotency-Key`` header with
+every attempt. The first attempt runs normally and its response is stored in the
+cache for ``IDEMPOTENCY_TTL`` seconds under ``(user, key)``; retries replay it
+with an ``Idempotent-Replayed: true`` header instead of creating again.
+
+While the first attempt is still running, a short-lived lock taken with
+``cache.add`` marks the key as in flight. Duplicates poll for the stored result
+for up to ``IDEMPOTENCY_WAIT`` seconds (a fraction of a second, since each poll
+holds a worker thread) and then answer 409 with ``Retry-After``. A key
+reused with a different payload answers 422. Responses with a 5xx status are not
+stored, so those requests can be retried.
+
+Deduplication spans processes only when the configured cache is shared between
+them (Redis, Memcached or the database cache).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+RETRY_AFTER_SECONDS = 1
+
+
+def get_cache():
+    return caches[getattr(settings, "IDEMPOTENCY_CACHE", "default")]
+
+
+def describe_upload(value) -> str:
+    return f"{getattr(value, 'name', '')}:{getattr(value, 'size', '')}"
+
+
+def request_fingerprint(request) -> str:
+    """Hash of the parsed request payload, stable across multipart boundaries."""
+    data = request.data
+    items = sorted(data.lists()) if hasattr(data, "lists") else data
+    raw = json.dumps(
+        [request.method, request.path, items], sort_keys=True, default=describe_upload
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def cache_key(request, key: str) -> str:
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return f"idempotency:{request.user.pk}:{digest}"
+
+
+def replay(stored) -> Response:
+    _fingerprint, status_code, body, location = stored
+    response = Response(json.loads(body) if body else None, status=status_code)
+    if location:
+        response["Location"] = location
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+class IdempotentCreateMixin:
+    """Viewset mixin making ``create`` idempotent per user and ``Idempotency-Key``."""
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return super().create(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"detail": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        cache = get_cache()
+        result_key = cache_key(request, key)
+        lock_key = f"{result_key}:lock"
+        fingerprint = request_fingerprint(request)
+        token = uuid.uuid4().hex
+
+        wait = getattr(settings, "IDEMPOTENCY_WAIT", 0.25)
+        deadline = time.monotonic() + wait
+        while not cache.add(
+            lock_key, token, getattr(settings, "IDEMPOTENCY_LOCK_TIMEOUT", 30)
+        ):
+            stored = cache.get(result_key)
+            if stored is not None:
+                return self.replay_if_matching(stored, fingerprint)
+            if time.monotonic() >= deadline:
+                return Response(
+                    {
+                        "detail": (
+                            "A request with this Idempotency-Key is still in progress."
+                        )
+                    },
+                    status=status.HTTP_409_CONFLICT,
+                    headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+                )
+            time.sleep(0.05)
+
+        try:
+            # The previous holder may have finished between our last poll and add().
+            stored = cache.get(result_key)
+            if stored is not None:
+                return self.replay_if_matching(stored, fingerprint)
+            response = super().create(request, *args, **kwargs)
+            if response.status_code < 500:
+                body = (
+                    JSONRenderer().render(response.data)
+                    if response.data is not None
+                    else b""
+                )
+                stored = (
+                    fingerprint,
+                    response.status_code,
+                    body,
+                    response.get("Location"),
+                )
+                cache.set(
+                    result_key,
+                    stored,
+                    getattr(settings, "IDEMPOTENCY_TTL", 24 * 60 * 60),
+                )
+            return response
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    def replay_if_matching(self, stored, fingerprint: str) -> Response:
+        if stored[0] != fingerprint:
+            return Response(
+                {
+                    "detail": (
+                        "This Idempotency-Key was already used "
+                        "with a different request."
+                    )
+                },
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        return replay(stored)
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from escrows.access import rebuild_escrow_access
+from escrows.models import Escrow
+
+
+class Command(BaseCommand):
+    help = "Rebuild the escrow access table from escrows and broker representations."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of escrows rebuilt per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        escrow_ids = Escrow.objects.order_by("pk").values_list("pk", flat=True)
+        last_pk = 0
+        escrows = rows = 0
+        while True:
+            batch = list(escrow_ids.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            rows += rebuild_escrow_access(batch)
+            escrows += len(batch)
+            last_pk = batch[-1]
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {rows} access rows for {escrows} escrows.")
+        )
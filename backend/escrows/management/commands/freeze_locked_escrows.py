@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from escrows.models import Escrow, EscrowStatus
+from escrows.snapshots import freeze_escrow
+
+
+class Command(BaseCommand):
+    help = "Write snapshots for locked escrows that do not have one yet."
+
+    def handle(self, *args, **options):
+        pending = Escrow.objects.filter(
+            status=EscrowStatus.LOCKED,
+            commission_pool__locked=True,
+            snapshot__isnull=True,
+        ).order_by("pk")
+        frozen = 0
+        for escrow_id in pending.values_list("pk", flat=True).iterator():
+            with transaction.atomic():
+                freeze_escrow(escrow_id)
+            frozen += 1
+        self.stdout.write(self.style.SUCCESS(f"Froze {frozen} locked escrows."))
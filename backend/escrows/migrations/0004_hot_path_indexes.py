@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:23
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+from escrows.db_operations import AddConstraintNotValid, AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently on PostgreSQL, which cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ("escrows", "0003_escrow_access"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="brokerrepresentation",
+            index=models.Index(
+                django.db.models.functions.text.Lower("invited_email"),
+                name="broker_invited_email_ci_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="brokerrepresentation",
+            index=models.Index(
+                fields=["user", "status"], name="broker_user_status_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="brokerrepresentation",
+            index=models.Index(
+                fields=["escrow", "status", "invited_as"],
+                name="broker_escrow_status_role_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="escrow",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="escrow_created_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="escrow",
+            index=models.Index(
+                fields=["status", "-created_at", "-id"],
+                name="escrow_status_created_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="escrow",
+            index=models.Index(
+                fields=["created_by", "status", "-created_at"],
+                name="escrow_owner_status_idx",
+            ),
+        ),
+        AddConstraintNotValid(
+            model_name="commissionpool",
+            constraint=models.CheckConstraint(
+                condition=models.Q(("total_amount__gte", 0)),
+                name="commission_pool_total_gte_0",
+            ),
+        ),
+        AddConstraintNotValid(
+            model_name="commissionshare",
+            constraint=models.CheckConstraint(
+                condition=models.Q(("amount__gte", 0)),
+                name="commission_share_amount_gte_0",
+            ),
+        ),
+        AddConstraintNotValid(
+            model_name="escrow",
+            constraint=models.CheckConstraint(
+                condition=models.Q(("property_value__gte", 0)),
+                name="escrow_property_value_gte_0",
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:53
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("escrows", "0005_version_columns"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EscrowSnapshot",
+            fields=[
+                (
+                    "escrow",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="snapshot",
+                        serialize=False,
+                        to="escrows.escrow",
+                    ),
+                ),
+                (
+                    "escrow_data",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+                (
+                    "pool_data",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -3,7 +3,9 @@ from __future__ import annotations
 from decimal import Decimal
 
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils import timezone
 
 
@@ -44,7 +46,40 @@ class PartySide(models.TextChoices):
     BOTH = "BOTH", "Both"
 
 
-class Escrow(models.Model):
+class AccessStateMixin:
+    """Remember the loaded values of the fields mirrored into ``EscrowAccess``.
+
+    ``escrows.signals`` compares them after each save, so the access row is only
+    rewritten when one of ``ACCESS_STATE_FIELDS`` actually changed.
+    """
+
+    ACCESS_STATE_FIELDS: tuple[str, ...] = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_access_state = instance.access_state()
+        return instance
+
+    def access_state(self) -> dict:
+        loaded = self.__dict__
+        return {
+            name: loaded[name] for name in self.ACCESS_STATE_FIELDS if name in loaded
+        }
+
+    def access_state_changed(self) -> bool:
+        loaded = getattr(self, "_loaded_access_state", None)
+        if loaded is None:
+            return True
+        return any(
+            loaded.get(name) != value for name, value in self.access_state().items()
+        )
+
+    def mark_access_synced(self) -> None:
+        self._loaded_access_state = self.access_state()
+
+
+class Escrow(AccessStateMixin, models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     participant_role = models.CharField(max_length=20, choices=PartyRole.choices, default=PartyRole.BUYER)
@@ -77,6 +112,7 @@ class Escrow(models.Model):
         choices=EscrowStatus.choices,
         default=EscrowStatus.DRAFT,
     )
+    version = models.PositiveIntegerField(default=1)
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         related_name="created_escrows",
@@ -85,8 +121,27 @@ class Escrow(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    ACCESS_STATE_FIELDS = ("created_by_id",)
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="escrow_created_idx"),
+            models.Index(
+                fields=["status", "-created_at", "-id"],
+                name="escrow_status_created_idx",
+            ),
+            models.Index(
+                fields=["created_by", "status", "-created_at"],
+                name="escrow_owner_status_idx",
+            ),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(property_value__gte=0),
+                name="escrow_property_value_gte_0",
+            ),
+        ]
 
     def __str__(self) -> str:  # pragma: no cover - display helper
         return self.name
@@ -117,7 +172,7 @@ class BrokerStatus(models.TextChoices):
     DECLINED = "DECLINED", "Declined"
 
 
-class BrokerRepresentation(models.Model):
+class BrokerRepresentation(AccessStateMixin, models.Model):
     escrow = models.ForeignKey(
         Escrow, related_name="broker_representations", on_delete=models.CASCADE
     )
@@ -145,9 +200,19 @@ class BrokerRepresentation(models.Model):
     invited_at = models.DateTimeField(auto_now_add=True)
     responded_at = models.DateTimeField(null=True, blank=True)
 
+    ACCESS_STATE_FIELDS = ("escrow_id", "user_id", "invited_email")
+
     class Meta:
         ordering = ["id"]
         unique_together = ("escrow", "invited_email", "invited_as")
+        indexes = [
+            models.Index(Lower("invited_email"), name="broker_invited_email_ci_idx"),
+            models.Index(fields=["user", "status"], name="broker_user_status_idx"),
+            models.Index(
+                fields=["escrow", "status", "invited_as"],
+                name="broker_escrow_status_role_idx",
+            ),
+        ]
 
     def __str__(self) -> str:  # pragma: no cover - display helper
         return f"{self.invited_email or self.user} ({self.get_invited_as_display()})"
@@ -160,16 +225,77 @@ class CommissionPool(models.Model):
     total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0"))
     locked = models.BooleanField(default=False)
     locked_at = models.DateTimeField(null=True, blank=True)
+    version = models.PositiveIntegerField(default=1)
 
     class Meta:
         ordering = ["escrow_id"]
-
-    def lock(self):
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(total_amount__gte=0),
+                name="commission_pool_total_gte_0",
+            ),
+        ]
+
+    def lock(self) -> bool:
+        """Lock the pool and flip its escrow to LOCKED.
+
+        Callers hold the rows from ``lock_commission_rows`` and read ``self`` after
+        taking them. Locking an already locked pool writes nothing and returns False.
+        """
+        if self.locked:
+            return False
         self.locked = True
         self.locked_at = timezone.now()
+        self.version += 1
+        Escrow.objects.filter(pk=self.escrow_id).update(
+            status=EscrowStatus.LOCKED, version=models.F("version") + 1
+        )
         self.escrow.status = EscrowStatus.LOCKED
-        self.escrow.save(update_fields=["status"])
-        self.save(update_fields=["locked", "locked_at"])
+        self.save(update_fields=["locked", "locked_at", "version"])
+        return True
+
+
+def lock_commission_rows(escrow_id: int, visible_ids) -> bool:
+    """Take ``SELECT ... FOR UPDATE`` locks on an escrow and then its commission pool.
+
+    Every pool writer locks in this order, so concurrent lock and update requests
+    queue behind each other instead of interleaving or deadlocking. Must run inside
+    a transaction. Only an escrow among ``visible_ids`` (a subquery of the
+    caller's accessible escrow ids) is locked; returns False, locking nothing,
+    for any other.
+    """
+    escrows = (
+        Escrow.objects.select_for_update()
+        .filter(pk=escrow_id, pk__in=visible_ids)
+        .order_by()
+    )
+    if not list(escrows.values_list("pk", flat=True)):
+        return False
+    pools = (
+        CommissionPool.objects.select_for_update()
+        .filter(escrow_id=escrow_id)
+        .order_by()
+    )
+    list(pools.values_list("pk", flat=True))
+    return True
+
+
+class EscrowSnapshot(models.Model):
+    """API representation of an escrow and its pool, frozen when the pool locks.
+
+    Written once by ``escrows.snapshots.freeze_escrow``; locked escrows refuse
+    further writes, so the row never needs updating.
+    """
+
+    escrow = models.OneToOneField(
+        Escrow, primary_key=True, related_name="snapshot", on_delete=models.CASCADE
+    )
+    escrow_data = models.JSONField(encoder=DjangoJSONEncoder)
+    pool_data = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:  # pragma: no cover - display helper
+        return f"Snapshot of escrow {self.escrow_id}"
 
 
 class CommissionShare(models.Model):
@@ -184,6 +310,69 @@ class CommissionShare(models.Model):
     class Meta:
         unique_together = ("pool", "broker_representation")
         ordering = ["id"]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(amount__gte=0), name="commission_share_amount_gte_0"
+            ),
+        ]
 
     def __str__(self) -> str:  # pragma: no cover - display helper
         return f"{self.amount} for {self.broker_representation_id}"
+
+
+class EscrowAccessKind(models.TextChoices):
+    CREATOR = "CREATOR", "Creator"
+    BROKER = "BROKER", "Broker"
+
+
+def normalize_email(email: str | None) -> str:
+    return (email or "").strip().lower()
+
+
+class EscrowAccess(models.Model):
+    """Denormalized escrow membership used to resolve which escrows a user can see.
+
+    One row exists for the creator of every escrow and one per broker
+    representation, keyed by the user when known and by the normalized invited
+    email otherwise. ``escrows.signals`` keeps them in step with every save of
+    an escrow or representation, through the helpers in ``escrows.access``.
+    Writes that send no signals (``bulk_create``, ``update()``, raw SQL) must be
+    followed by ``manage.py backfill_escrow_access``.
+    """
+
+    escrow = models.ForeignKey(
+        Escrow, related_name="access_entries", on_delete=models.CASCADE
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="escrow_access_entries",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    email = models.CharField(max_length=254, blank=True)
+    kind = models.CharField(max_length=20, choices=EscrowAccessKind.choices)
+    broker_representation = models.OneToOneField(
+        BrokerRepresentation,
+        related_name="access_entry",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["user", "escrow"], name="escrow_access_user_idx"),
+            models.Index(fields=["email", "escrow"], name="escrow_access_email_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["escrow"],
+                condition=models.Q(kind="CREATOR"),
+                name="escrow_access_single_creator",
+            ),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover - display helper
+        return f"{self.user_id or self.email} -> {self.escrow_id} ({self.kind})"
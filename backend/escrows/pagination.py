@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import json
+
+from django.db import connections
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class EscrowCursorPagination(CursorPagination):
+    """Keyset pagination over ``(created_at, id)``.
+
+    The total is omitted unless the client asks for it with ``?count=exact`` or
+    ``?count=estimate``; the estimate reads the planner's row estimate on
+    PostgreSQL and falls back to an exact count elsewhere.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    count_query_param = "count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.total = self.get_total(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_total(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == "exact":
+            return queryset.count()
+        if mode == "estimate":
+            return estimate_count(queryset)
+        return None
+
+    def get_paginated_response(self, data):
+        payload = {"next": self.get_next_link(), "previous": self.get_previous_link()}
+        if self.total is not None:
+            payload["count"] = self.total
+        payload["results"] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count"] = {"type": "integer", "example": 123}
+        return response_schema
+
+
+class NestedCursorPagination(CursorPagination):
+    """Bounded keyset pagination for the per-escrow party and broker lists."""
+
+    ordering = ("id",)
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+
+class InvitationCursorPagination(CursorPagination):
+    ordering = ("-invited_at", "-id")
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+def estimate_count(queryset) -> int:
+    if connections[queryset.db].vendor != "postgresql":
+        return queryset.count()
+    plan = json.loads(queryset.order_by().explain(format="json"))
+    # Django flattens the driver's decoded [{"Plan": ...}] to its one element;
+    # an undecoded plan keeps the list.
+    if isinstance(plan, list):
+        plan = plan[0]
+    return int(plan["Plan"]["Plan Rows"])
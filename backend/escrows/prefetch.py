@@ -0,0 +1,205 @@
+"""Derive ``select_related`` / ``prefetch_related`` / ``only()`` from a serializer tree.
+
+``plan_queryset`` walks the bound fields of a DRF serializer (after any sparse
+fieldset pruning) and loads exactly what ``to_representation`` will touch:
+forward and reverse one-to-one relations are joined, to-many relations are
+prefetched with their own planned querysets, and every level is restricted to
+the columns its serializer reads. ``QueryPlanMixin`` applies the plan to a
+viewset's queryset and, when ``PREFETCH_PLANNER_STRICT`` is enabled, fails any
+read request that still issues SQL while serializing.
+"""
+
+from __future__ import annotations
+
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Prefetch
+from django.http import Http404
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from config.profiling import timed
+
+
+class LazyRelationLoad(RuntimeError):
+    """Raised in strict mode when serialization triggers a database query."""
+
+
+@dataclass
+class QueryPlan:
+    select_related: list[str] = field(default_factory=list)
+    prefetch_related: list[Prefetch] = field(default_factory=list)
+    only: set[str] | None = field(default_factory=set)
+
+    def apply(self, queryset, extra_only=()):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if self.only is not None:
+            queryset = queryset.only(*sorted(self.only | set(extra_only)))
+        return queryset
+
+
+def unwrap(serializer):
+    return (
+        serializer.child
+        if isinstance(serializer, serializers.ListSerializer)
+        else serializer
+    )
+
+
+def build_plan(
+    serializer, model, prefix: str = "", plan: QueryPlan | None = None
+) -> QueryPlan:
+    """Collect the loading plan for ``serializer`` rendering instances of ``model``.
+
+    ``prefix`` is the ``__`` path of ``model`` from the queryset root when it is
+    reached through ``select_related``; prefetches below it are prefixed too.
+    """
+    plan = plan or QueryPlan()
+    for bound in serializer.fields.values():
+        if bound.write_only:
+            continue
+        source = bound.source
+        if (
+            source == "*"
+            or "." in source
+            or isinstance(bound, serializers.SerializerMethodField)
+        ):
+            plan.only = None
+            continue
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            # Properties and methods may read any column.
+            plan.only = None
+            continue
+
+        path = f"{prefix}{source}"
+        if not isinstance(bound, serializers.BaseSerializer):
+            if plan.only is not None and model_field.concrete:
+                plan.only.add(path)
+            continue
+
+        nested = unwrap(bound)
+        related_model = model_field.related_model
+        if model_field.one_to_one or (model_field.many_to_one and model_field.concrete):
+            plan.select_related.append(path)
+            if plan.only is not None and model_field.concrete:
+                plan.only.add(path)
+            build_plan(nested, related_model, prefix=f"{path}__", plan=plan)
+        else:
+            child_plan = build_plan(nested, related_model)
+            back_reference = model_field.remote_field
+            extra = (back_reference.name,) if back_reference.concrete else ()
+            plan.prefetch_related.append(
+                Prefetch(
+                    path,
+                    queryset=child_plan.apply(
+                        related_model._default_manager.all(), extra
+                    ),
+                )
+            )
+    return plan
+
+
+def plan_queryset(queryset, serializer, extra_only=()):
+    return build_plan(unwrap(serializer), queryset.model).apply(queryset, extra_only)
+
+
+@contextmanager
+def forbid_queries(label: str):
+    """Raise ``LazyRelationLoad`` for any SQL executed inside the block."""
+
+    def blocker(execute, sql, params, many, context):
+        raise LazyRelationLoad(f"{label} issued a query while serializing: {sql}")
+
+    with ExitStack() as stack:
+        for connection in connections.all(initialized_only=True):
+            stack.enter_context(connection.execute_wrapper(blocker))
+        yield
+
+
+class QueryPlanMixin:
+    """Viewset mixin that loads querysets according to the serializer's plan."""
+
+    def get_planning_serializer(self):
+        return self.get_serializer_class()(context=super().get_serializer_context())
+
+    def get_plan_extra_only(self):
+        ordering = getattr(self.paginator, "ordering", None) or ()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        return tuple(name.lstrip("-") for name in ordering)
+
+    def plan(self, queryset):
+        return plan_queryset(
+            queryset, self.get_planning_serializer(), self.get_plan_extra_only()
+        )
+
+    def serialize(self, *args, **kwargs):
+        serializer = self.get_serializer(*args, **kwargs)
+        with timed("serialize"):
+            if not getattr(settings, "PREFETCH_PLANNER_STRICT", False):
+                return serializer.data
+            with forbid_queries(type(self).__name__):
+                return serializer.data
+
+    async def aserialize(self, *args, **kwargs):
+        """``serialize`` for the async actions.
+
+        A strict planner guarantees serializing runs no query, so it stays on the
+        event loop. Otherwise a relation the plan missed loads lazily, which the
+        ORM refuses inside the event loop, so it runs in a worker thread.
+        """
+        if getattr(settings, "PREFETCH_PLANNER_STRICT", False):
+            return self.serialize(*args, **kwargs)
+        return await sync_to_async(self.serialize)(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.serialize(page, many=True))
+        return Response(self.serialize(list(queryset), many=True))
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.serialize(self.get_object()))
+
+    # Async twins used by ``config.async_views``. Serializing planned objects
+    # runs no queries, so only loading them is awaited.
+
+    async def aget_object(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            obj = await queryset.aget(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (
+            queryset.model.DoesNotExist,
+            TypeError,
+            ValueError,
+            ValidationError,
+        ) as exc:
+            raise Http404 from exc
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await sync_to_async(self.paginate_queryset)(queryset)
+        if page is not None:
+            data = await self.aserialize(page, many=True)
+            return self.get_paginated_response(data)
+        objects = [obj async for obj in queryset]
+        return Response(await self.aserialize(objects, many=True))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return Response(await self.aserialize(await self.aget_object()))
@@ -0,0 +1,112 @@
+"""Sparse fieldsets (``?fields=``) and opt-in relation expansion (``?expand=``).
+
+Both parameters take comma separated, dot-nested paths such as
+``fields=id,name,broker_representations.status`` or
+``expand=broker_representations.user``. Without either parameter the full
+representation is returned. Once one of them is given, scalar fields are limited
+to ``fields`` (when present) and nested serializers are only rendered when they
+are named in ``fields`` or ``expand``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+
+def parse_paths(raw: str | None) -> dict | None:
+    if raw is None:
+        return None
+    tree: dict = {}
+    for path in raw.split(","):
+        node = tree
+        for part in path.strip().split("."):
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+class FieldSelection:
+    def __init__(self, fields: dict | None = None, expand: dict | None = None):
+        self.fields = fields
+        self.expand = expand
+
+    @classmethod
+    def from_request(cls, request) -> FieldSelection:
+        params = request.query_params
+        return cls(parse_paths(params.get("fields")), parse_paths(params.get("expand")))
+
+    @property
+    def is_full(self) -> bool:
+        return self.fields is None and self.expand is None
+
+    def digest(self) -> str:
+        """Short stable key of the normalized selection; empty when it is full."""
+        if self.is_full:
+            return ""
+        canonical = json.dumps([self.fields, self.expand], sort_keys=True)
+        return hashlib.sha256(canonical.encode()).hexdigest()[:12]
+
+    def includes_field(self, name: str) -> bool:
+        return self.fields is None or name in self.fields
+
+    def includes_relation(self, name: str) -> bool:
+        if self.is_full:
+            return True
+        return name in (self.fields or {}) or name in (self.expand or {})
+
+    def child(self, name: str) -> FieldSelection:
+        return FieldSelection(
+            (self.fields or {}).get(name) or None,
+            (self.expand or {}).get(name) or None,
+        )
+
+    def prune(self, fields) -> None:
+        """Drop unselected entries from a serializer's bound ``fields`` in place."""
+        if self.is_full:
+            return
+        for name in list(fields):
+            field = fields[name]
+            if isinstance(field, BaseSerializer):
+                if not self.includes_relation(name):
+                    fields.pop(name)
+                    continue
+                nested = field.child if isinstance(field, ListSerializer) else field
+                self.child(name).prune(nested.fields)
+            elif not self.includes_field(name):
+                fields.pop(name)
+
+    def prune_data(self, data):
+        """Apply the selection to an already rendered representation.
+
+        Nested objects and lists are treated as relations, everything else as
+        scalar fields, mirroring ``prune`` on the serializer tree.
+        """
+        if self.is_full:
+            return data
+        if isinstance(data, list):
+            return [self.prune_data(item) for item in data]
+        pruned = {}
+        for name, value in data.items():
+            if isinstance(value, (dict, list)):
+                if self.includes_relation(name):
+                    pruned[name] = self.child(name).prune_data(value)
+            elif self.includes_field(name):
+                pruned[name] = value
+        return pruned
+
+
+class SparseFieldsetMixin:
+    """Serializer mixin taking a ``selection`` keyword that prunes its field tree."""
+
+    def __init__(self, *args, selection: FieldSelection | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.selection = selection
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.selection is not None:
+            self.selection.prune(fields)
+        return fields
@@ -3,7 +3,6 @@ from __future__ import annotations
 from decimal import Decimal
 
 from django.db import transaction
-from django.db.models import Sum
 from django.utils import timezone
 from rest_framework import serializers
 
@@ -23,6 +22,7 @@ from .models import (
     PropertyType,
     TransactionType,
 )
+from .selection import SparseFieldsetMixin
 
 
 class PartySerializer(serializers.ModelSerializer):
@@ -83,11 +83,13 @@ class BrokerRepresentationSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Invalid broker status")
         return value
 
+    @transaction.atomic
     def create(self, validated_data):
         validated_data.setdefault("escrow", self.context["escrow"])
         validated_data["invited_by"] = self.context["request"].user
         return super().create(validated_data)
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         new_status = validated_data.get("status")
         if instance.status == BrokerStatus.ACCEPTED and new_status:
@@ -100,8 +102,60 @@ class BrokerRepresentationSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
+class EscrowSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Escrow
+        fields = [
+            "id",
+            "name",
+            "status",
+            "transaction_type",
+            "currency",
+            "property_value",
+        ]
+        read_only_fields = fields
+
+
+class InvitationSerializer(serializers.ModelSerializer):
+    escrow = EscrowSummarySerializer(read_only=True)
+    invited_by = UserSerializer(read_only=True)
+
+    class Meta:
+        model = BrokerRepresentation
+        fields = [
+            "id",
+            "escrow",
+            "invited_email",
+            "invited_by",
+            "invited_as",
+            "status",
+            "invited_at",
+        ]
+        read_only_fields = fields
+
+
+class EscrowBrokerRepresentationField(serializers.PrimaryKeyRelatedField):
+    """Resolve share brokers against the pool's escrow with one lookup per request."""
+
+    def get_queryset(self):
+        queryset = BrokerRepresentation.objects.only("id", "escrow_id").order_by()
+        pool = self.context.get("pool")
+        return queryset.filter(escrow_id=pool.escrow_id) if pool else queryset
+
+    def to_internal_value(self, data):
+        root = self.root
+        if not hasattr(root, "_broker_representations"):
+            root._broker_representations = {rep.pk: rep for rep in self.get_queryset()}
+        try:
+            return root._broker_representations[int(data)]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+
 class CommissionShareSerializer(serializers.ModelSerializer):
-    broker_representation = serializers.PrimaryKeyRelatedField(
+    broker_representation = EscrowBrokerRepresentationField(
         queryset=BrokerRepresentation.objects.all()
     )
 
@@ -133,43 +187,62 @@ class CommissionPoolSerializer(serializers.ModelSerializer):
         pool = self.instance or self.context.get("pool")
         if pool and pool.locked:
             raise serializers.ValidationError("Commission pool is locked")
+
+        total = attrs.get("total_amount", pool.total_amount if pool else Decimal("0"))
+        if "shares" in attrs:
+            amounts = {
+                share["broker_representation"].pk: share["amount"]
+                for share in attrs["shares"]
+            }
+            assigned = sum(amounts.values(), Decimal("0"))
+        elif pool:
+            assigned = sum((share.amount for share in pool.shares.all()), Decimal("0"))
+        else:
+            assigned = Decimal("0")
+        if assigned > total:
+            raise serializers.ValidationError("Commission shares exceed pool total")
         return super().validate(attrs)
 
-    @transaction.atomic
+    @transaction.atomic(savepoint=False)
     def update(self, instance, validated_data):
         shares_data = validated_data.pop("shares", None)
         instance = super().update(instance, validated_data)
-
         if shares_data is not None:
-            existing = {share.broker_representation_id: share for share in instance.shares.all()}
-            keep_ids: list[int] = []
-            for share in shares_data:
-                broker_rep = share["broker_representation"]
-                amount = share["amount"]
-                keep_ids.append(broker_rep.id)
-                if broker_rep.id in existing:
-                    existing[broker_rep.id].amount = amount
-                    existing[broker_rep.id].save(update_fields=["amount"])
-                else:
-                    CommissionShare.objects.create(
-                        pool=instance,
-                        broker_representation=broker_rep,
-                        amount=amount,
-                    )
-            CommissionShare.objects.filter(pool=instance).exclude(
-                broker_representation_id__in=keep_ids
-            ).delete()
-
-        total_assigned = instance.shares.aggregate(total=Sum("amount")) or {
-            "total": Decimal("0")
-        }
-        assigned = total_assigned.get("total") or Decimal("0")
-        if assigned > instance.total_amount:
-            raise serializers.ValidationError("Commission shares exceed pool total")
+            apply_share_diff(instance, shares_data)
         return instance
 
 
-class EscrowSerializer(serializers.ModelSerializer):
+def apply_share_diff(pool: CommissionPool, shares_data) -> None:
+    """Sync ``pool``'s shares with ``shares_data`` in at most three statements."""
+    desired = {
+        share["broker_representation"].pk: share["amount"] for share in shares_data
+    }
+    existing = {share.broker_representation_id: share for share in pool.shares.all()}
+
+    changed = []
+    for broker_id, amount in desired.items():
+        share = existing.get(broker_id)
+        if share is not None and share.amount != amount:
+            share.amount = amount
+            changed.append(share)
+    created = [
+        CommissionShare(pool=pool, broker_representation_id=broker_id, amount=amount)
+        for broker_id, amount in desired.items()
+        if broker_id not in existing
+    ]
+    removed = [
+        share.pk for broker_id, share in existing.items() if broker_id not in desired
+    ]
+
+    if removed:
+        CommissionShare.objects.filter(pk__in=removed).delete()
+    if changed:
+        CommissionShare.objects.bulk_update(changed, ["amount"])
+    if created:
+        CommissionShare.objects.bulk_create(created)
+
+
+class EscrowSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
     parties = PartySerializer(many=True, read_only=True)
     broker_representations = BrokerRepresentationSerializer(many=True, read_only=True)
@@ -331,7 +404,7 @@ class EscrowSerializer(serializers.ModelSerializer):
         request = self.context["request"]
         escrow = Escrow.objects.create(created_by=request.user, **validated_data)
         CommissionPool.objects.create(escrow=escrow)
-        BrokerRepresentation.objects.create(
+        listing = BrokerRepresentation.objects.create(
             escrow=escrow,
             user=request.user,
             invited_by=request.user,
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .access import (
+    grant_broker_access,
+    grant_creator_access,
+    sync_broker_access,
+    sync_creator_access,
+)
+from config.cache import api_cache
+
+from .caching import email_tag, invalidate_escrows, invalidate_viewers, viewer_tags
+from .concurrency import bump_version
+from .models import (
+    BrokerRepresentation,
+    CommissionPool,
+    CommissionShare,
+    Escrow,
+    EscrowAccess,
+    EscrowStatus,
+    Party,
+    normalize_email,
+)
+
+
+# EscrowAccess mirrors escrow creators and broker representations. Deleting
+# either removes its rows by cascade. Fixtures (``raw``) may already carry
+# the rows, so they are upserted.
+@receiver(post_save, sender=Escrow)
+def maintain_creator_access(sender, instance: Escrow, created, raw=False, **kwargs):
+    if created and not raw:
+        grant_creator_access(instance)
+    elif instance.access_state_changed():
+        sync_creator_access(instance)
+    instance.mark_access_synced()
+
+
+@receiver(post_save, sender=BrokerRepresentation)
+def maintain_broker_access(
+    sender, instance: BrokerRepresentation, created, raw=False, **kwargs
+):
+    if created and not raw:
+        grant_broker_access(instance)
+    elif instance.access_state_changed():
+        sync_broker_access(instance)
+    instance.mark_access_synced()
+
+
+@receiver(post_save, sender=Escrow)
+@receiver(post_delete, sender=Escrow)
+def invalidate_escrow(sender, instance: Escrow, **kwargs):
+    invalidate_escrows(instance.pk)
+
+
+@receiver(post_save, sender=Party)
+@receiver(post_delete, sender=Party)
+@receiver(post_save, sender=BrokerRepresentation)
+@receiver(post_delete, sender=BrokerRepresentation)
+@receiver(post_save, sender=CommissionPool)
+@receiver(post_delete, sender=CommissionPool)
+def invalidate_parent_escrow(sender, instance, **kwargs):
+    invalidate_escrows(instance.escrow_id)
+
+
+# Share deletes are not observed: they happen in bulk under touch_escrow or by
+# cascade from a broker, pool or escrow whose own signal covers them, and a
+# receiver would stop Django from fast-deleting them.
+@receiver(post_save, sender=CommissionShare)
+def invalidate_share_escrow(sender, instance: CommissionShare, **kwargs):
+    pools = CommissionPool.objects.filter(pk=instance.pool_id)
+    invalidate_escrows(pools.values_list("escrow_id", flat=True).first())
+
+
+@receiver(post_save, sender=EscrowAccess)
+def invalidate_granted_viewer(sender, instance: EscrowAccess, **kwargs):
+    invalidate_viewers([instance])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_member_escrows(sender, instance, update_fields=None, **kwargs):
+    """Users are embedded in the escrows they belong to (creator, brokers, inviters).
+
+    Their edits change those representations, so the escrows' ETags move too.
+    Locked escrows are served from snapshots that keep the users as they were.
+    """
+    if kwargs.get("created") or (
+        update_fields is not None and set(update_fields) <= {"last_login"}
+    ):
+        return
+    escrow_ids = set(
+        EscrowAccess.objects.filter(user_id=instance.pk).values_list(
+            "escrow_id", flat=True
+        )
+    )
+    if escrow_ids:
+        bump_version(
+            Escrow.objects.filter(pk__in=escrow_ids).exclude(status=EscrowStatus.LOCKED)
+        )
+    invalidate_escrows(*escrow_ids)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_moved_viewer(sender, instance, created=False, **kwargs):
+    """An email change moves the escrows a user sees through invited-email rows.
+
+    ``User`` keeps its loaded email in ``_loaded_auth_state`` until the save
+    returns, so both the old and the new address are known here. Cached lists
+    are tagged with the viewer's address and cached details with their escrows.
+    """
+    loaded = getattr(instance, "_loaded_auth_state", None) or {}
+    if created or "email" not in loaded:
+        return
+    old, new = normalize_email(loaded["email"]), normalize_email(instance.email)
+    if old == new:
+        return
+    escrow_ids = EscrowAccess.objects.filter(email__in=[old, new]).values_list(
+        "escrow_id", flat=True
+    )
+    invalidate_escrows(*set(escrow_ids))
+    api_cache.invalidate(*viewer_tags(instance.pk, old), email_tag(new))
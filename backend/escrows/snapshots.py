@@ -0,0 +1,112 @@
+"""Frozen representations of locked escrows.
+
+Locking the commission pool makes an escrow immutable: the pool rejects edits
+and escrow and nested writes answer 400. ``freeze_escrow`` stores the full
+escrow representation, pool included, once at lock time. ``FrozenReadMixin``
+then answers detail reads of locked escrows from that row, found by the same
+access-checked query that reads the version, instead of running the planned
+prefetches and serializers. Those responses carry the same selection-aware
+``ETag`` as live reads and are marked ``private`` and ``immutable``, cacheable
+by the client for ``LOCKED_ESCROW_MAX_AGE`` seconds: each ``?fields=``/``?expand=``
+URL has its own tag, and shared caches must not serve one viewer's response to
+another.
+
+Embedded users are frozen as they were when the escrow was locked. Snapshots
+are serialized without a request, so file fields hold relative URLs; reads
+make them absolute for the requesting host, as the live serializers do.
+"""
+
+from __future__ import annotations
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Escrow, EscrowSnapshot
+from .prefetch import plan_queryset
+from .selection import FieldSelection
+from .serializers import EscrowSerializer
+
+
+def freeze_escrow(escrow_id: int) -> EscrowSnapshot:
+    """Store the current full representation of a locked escrow and its pool."""
+    context = {}
+    selection = FieldSelection()
+    planning = EscrowSerializer(context=context, selection=selection)
+    escrow = plan_queryset(Escrow.objects.filter(pk=escrow_id), planning).get()
+    data = EscrowSerializer(escrow, context=context, selection=selection).data
+    return EscrowSnapshot.objects.create(
+        escrow=escrow, escrow_data=data, pool_data=data["commission_pool"]
+    )
+
+
+class FrozenReadMixin:
+    """Serve ``retrieve`` of locked escrows from their ``EscrowSnapshot``.
+
+    Place it before ``ConditionalRequestMixin``, whose ``etag_variant`` and
+    ``set_etag`` it shares. ``snapshot_field`` is the path
+    from the viewset's model to the snapshot data to return.
+    """
+
+    snapshot_field = "snapshot__escrow_data"
+    snapshot_file_fields = ("agreement_upload",)
+
+    def shape_snapshot(self, data):
+        return data
+
+    def absolute_file_urls(self, data, request):
+        urls = {
+            name: request.build_absolute_uri(data[name])
+            for name in self.snapshot_file_fields
+            if data.get(name)
+        }
+        return {**data, **urls} if urls else data
+
+    def current_version(self) -> int | None:
+        if hasattr(self, "_frozen"):
+            return self._frozen[0] if self._frozen else None
+        return super().current_version()
+
+    async def acurrent_version(self) -> int | None:
+        if hasattr(self, "_frozen"):
+            return self.current_version()
+        return await super().acurrent_version()
+
+    def frozen_query(self):
+        """Version and snapshot data of the addressed object; None for malformed ids."""
+        try:
+            queryset = self.get_version_queryset().prefetch_related(None)
+        except (TypeError, ValueError):
+            return None
+        return queryset.values_list(self.version_field, self.snapshot_field)
+
+    def frozen_response(self, request):
+        version, data = self._frozen
+        if version in (self.expected_versions(request) or ()):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(
+                self.shape_snapshot(self.absolute_file_urls(data, request))
+            )
+        self.set_etag(response, version)
+        max_age = getattr(settings, "LOCKED_ESCROW_MAX_AGE", 365 * 24 * 60 * 60)
+        patch_cache_control(response, private=True, max_age=max_age, immutable=True)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        query = self.frozen_query()
+        if query is not None:
+            self._frozen = query.first()
+            if self._frozen is not None and self._frozen[1] is not None:
+                return self.frozen_response(request)
+        # Not locked, or malformed ids which the live path answers with 404.
+        return super().retrieve(request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        query = self.frozen_query()
+        if query is not None:
+            self._frozen = await query.afirst()
+            if self._frozen is not None and self._frozen[1] is not None:
+                return self.frozen_response(request)
+        return await super().aretrieve(request, *args, **kwargs)
@@ -1,16 +1,63 @@
 from __future__ import annotations
 
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
+from inspect import iscoroutinefunction
+from io import StringIO
+from unittest import mock, skipUnless
 
-from django.test import TestCase
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
 from rest_framework.test import APIClient
 
 from accounts.models import User
-from .models import BrokerRole, BrokerStatus, EscrowStatus, PartyRole, TransactionType
+from config.cache import api_cache
+from .models import (
+    BrokerRepresentation,
+    BrokerRole,
+    BrokerStatus,
+    CommissionPool,
+    Escrow,
+    EscrowAccess,
+    EscrowAccessKind,
+    EscrowSnapshot,
+    EscrowStatus,
+    PartyRole,
+    TransactionType,
+)
+from .prefetch import LazyRelationLoad, QueryPlanMixin, forbid_queries
 
 
+@override_settings(PREFETCH_PLANNER_STRICT=True)
 class EscrowAPITests(TestCase):
+    escrow_payload = {
+        "name": "Test Deal",
+        "description": "Downtown property",
+        "participant_role": PartyRole.BROKER,
+        "currency": "USD",
+        "transaction_type": TransactionType.COMMISSION,
+        "property_type": "HOUSE",
+        "property_value": "500000.00",
+        "closing_date": "2025-01-12",
+        "property_address": "123 Main St",
+        "commission_percentage": "3.0",
+        "commission_payer": "BUYER",
+        "commission_payment_date": "2025-01-15",
+        "broker_a_name": "Ana López",
+        "broker_a_percentage": "60",
+        "broker_b_name": "Luis Martínez",
+        "broker_b_percentage": "40",
+    }
+
     def setUp(self):
+        cache.clear()
+        api_cache.clear_local()
         self.user_a = User.objects.create_user(
             email="broker.a@example.com", password="pass1234", first_name="Broker", last_name="A"
         )
@@ -23,29 +70,12 @@ class EscrowAPITests(TestCase):
         client.force_authenticate(user)
         return client
 
+    def rename(self, name: str) -> dict:
+        # Escrow validation re-checks the required fields on partial updates too.
+        return {**self.escrow_payload, "name": name}
+
     def create_escrow(self, client: APIClient):
-        response = client.post(
-            "/escrows/",
-            {
-                "name": "Test Deal",
-                "description": "Downtown property",
-                "participant_role": PartyRole.BROKER,
-                "currency": "USD",
-                "transaction_type": TransactionType.COMMISSION,
-                "property_type": "HOUSE",
-                "property_value": "500000.00",
-                "closing_date": "2025-01-12",
-                "property_address": "123 Main St",
-                "commission_percentage": "3.0",
-                "commission_payer": "BUYER",
-                "commission_payment_date": "2025-01-15",
-                "broker_a_name": "Ana López",
-                "broker_a_percentage": "60",
-                "broker_b_name": "Luis Martínez",
-                "broker_b_percentage": "40",
-            },
-            format="json",
-        )
+        response = client.post("/escrows/", self.escrow_payload, format="json")
         self.assertEqual(response.status_code, 201)
         return response.data
 
@@ -57,7 +87,7 @@ class EscrowAPITests(TestCase):
         self.assertEqual(escrow["status"], EscrowStatus.DRAFT)
         self.assertIn("commission_pool", escrow)
 
-        brokers = client.get(f"/escrows/{escrow['id']}/brokers/").data
+        brokers = client.get(f"/escrows/{escrow['id']}/brokers/").data["results"]
         self.assertEqual(len(brokers), 1)
         self.assertEqual(brokers[0]["status"], BrokerStatus.ACCEPTED)
         self.assertEqual(brokers[0]["invited_as"], BrokerRole.LISTING)
@@ -79,7 +109,7 @@ class EscrowAPITests(TestCase):
         party_id = party_resp.data["id"]
 
         list_resp = client.get(f"/escrows/{escrow['id']}/parties/?role={PartyRole.BUYER}")
-        self.assertEqual(len(list_resp.data), 1)
+        self.assertEqual(len(list_resp.data["results"]), 1)
 
         update_resp = client.patch(
             f"/escrows/{escrow['id']}/parties/{party_id}/",
@@ -107,7 +137,7 @@ class EscrowAPITests(TestCase):
         broker_list_b = client_b.get(
             f"/escrows/{escrow['id']}/brokers/?status={BrokerStatus.PENDING}&invited_as={BrokerRole.CO_BROKER}"
         )
-        self.assertEqual(len(broker_list_b.data), 1)
+        self.assertEqual(len(broker_list_b.data["results"]), 1)
 
         accept_resp = client_b.patch(
             f"/escrows/{escrow['id']}/brokers/{invited_id}/",
@@ -118,7 +148,7 @@ class EscrowAPITests(TestCase):
         self.assertEqual(accept_resp.data["status"], BrokerStatus.ACCEPTED)
         self.assertIsNotNone(accept_resp.data["responded_at"])
 
-        brokers = client_a.get(f"/escrows/{escrow['id']}/brokers/").data
+        brokers = client_a.get(f"/escrows/{escrow['id']}/brokers/").data["results"]
         listing = next(b for b in brokers if b["invited_as"] == BrokerRole.LISTING)
         co_broker = next(b for b in brokers if b["invited_as"] == BrokerRole.CO_BROKER)
 
@@ -148,5 +178,833 @@ class EscrowAPITests(TestCase):
         )
         self.assertEqual(post_lock_resp.status_code, 400)
 
-        locked_list = client_a.get(f"/escrows/?status={EscrowStatus.LOCKED}")
+        locked_list = client_a.get(
+            f"/escrows/?status={EscrowStatus.LOCKED}&count=exact"
+        )
         self.assertGreaterEqual(locked_list.data.get("count", 0), 1)
+
+    def test_escrow_list_uses_access_table(self):
+        client_a = self.client_for(self.user_a)
+        client_b = self.client_for(self.user_b)
+        outsider = self.client_for(
+            User.objects.create_user(email="outsider@example.com", password="pass1234")
+        )
+        escrow = self.create_escrow(client_a)
+
+        self.assertEqual(client_b.get("/escrows/").data["results"], [])
+
+        invite_resp = client_a.post(
+            f"/escrows/{escrow['id']}/brokers/",
+            {
+                "invited_email": "Broker.B@Example.com",
+                "invited_as": BrokerRole.CO_BROKER,
+            },
+            format="json",
+        )
+        self.assertEqual(invite_resp.status_code, 201)
+        client_b.patch(
+            f"/escrows/{escrow['id']}/brokers/{invite_resp.data['id']}/",
+            {"status": BrokerStatus.ACCEPTED},
+            format="json",
+        )
+
+        listed = client_b.get("/escrows/").data["results"]
+        self.assertEqual([item["id"] for item in listed], [escrow["id"]])
+        self.assertEqual(outsider.get("/escrows/").data["results"], [])
+
+        client_a.delete(f"/escrows/{escrow['id']}/brokers/{invite_resp.data['id']}/")
+        self.assertEqual(client_b.get("/escrows/").data["results"], [])
+
+    def test_orm_writes_maintain_access_rows(self):
+        escrow = Escrow.objects.create(name="Shell", created_by=self.user_a)
+        broker = BrokerRepresentation.objects.create(
+            escrow=escrow,
+            invited_email="Broker.B@Example.com",
+            invited_as=BrokerRole.CO_BROKER,
+        )
+        client_a = self.client_for(self.user_a)
+        client_b = self.client_for(self.user_b)
+        self.assertEqual(client_a.get(f"/escrows/{escrow.pk}/").status_code, 200)
+        self.assertEqual(client_b.get(f"/escrows/{escrow.pk}/").status_code, 200)
+
+        broker = BrokerRepresentation.objects.get(pk=broker.pk)
+        broker.invited_email = "someone.else@example.com"
+        broker.save()
+        self.assertEqual(client_b.get(f"/escrows/{escrow.pk}/").status_code, 404)
+
+        escrow = Escrow.objects.get(pk=escrow.pk)
+        escrow.created_by = self.user_b
+        escrow.save()
+        self.assertEqual(client_a.get(f"/escrows/{escrow.pk}/").status_code, 404)
+        self.assertEqual(client_b.get(f"/escrows/{escrow.pk}/").status_code, 200)
+
+        broker.delete()
+        self.assertEqual(
+            list(EscrowAccess.objects.values_list("user_id", "kind")),
+            [(self.user_b.pk, EscrowAccessKind.CREATOR)],
+        )
+
+    def test_backfill_escrow_access_command(self):
+        client_a = self.client_for(self.user_a)
+        escrow = self.create_escrow(client_a)
+        client_a.post(
+            f"/escrows/{escrow['id']}/brokers/",
+            {"invited_email": self.user_b.email, "invited_as": BrokerRole.CO_BROKER},
+            format="json",
+        )
+        EscrowAccess.objects.all().delete()
+
+        call_command("backfill_escrow_access", batch_size=1, stdout=StringIO())
+
+        self.assertEqual(EscrowAccess.objects.filter(escrow_id=escrow["id"]).count(), 3)
+        listed = self.client_for(self.user_b).get("/escrows/").data["results"]
+        self.assertEqual([item["id"] for item in listed], [escrow["id"]])
+
+    def test_escrow_list_cursor_pagination(self):
+        client = self.client_for(self.user_a)
+        created = [self.create_escrow(client)["id"] for _ in range(3)]
+
+        first = client.get("/escrows/?page_size=2").data
+        self.assertNotIn("count", first)
+        self.assertEqual([item["id"] for item in first["results"]], created[::-1][:2])
+
+        second = client.get(first["next"]).data
+        self.assertEqual([item["id"] for item in second["results"]], created[:1])
+        self.assertIsNone(second["next"])
+
+        counted = client.get("/escrows/?page_size=2&count=exact").data
+        self.assertEqual(counted["count"], 3)
+
+    def test_nested_lists_are_bounded(self):
+        client = self.client_for(self.user_a)
+        escrow = self.create_escrow(client)
+        for index in range(3):
+            client.post(
+                f"/escrows/{escrow['id']}/parties/",
+                {"name": f"Party {index}", "role": PartyRole.BUYER},
+                format="json",
+            )
+
+        page = client.get(f"/escrows/{escrow['id']}/parties/?page_size=2").data
+        self.assertEqual(len(page["results"]), 2)
+        self.assertIsNotNone(page["next"])
+        self.assertEqual(len(client.get(page["next"]).data["results"]), 1)
+
+    def test_sparse_fieldsets_and_expansion(self):
+        client = self.client_for(self.user_a)
+        escrow = self.create_escrow(client)
+
+        with self.assertNumQueries(1):
+            sparse = client.get(
+                "/escrows/?fields=id,name,status,currency,property_value"
+            )
+        self.assertEqual(
+            set(sparse.data["results"][0]),
+            {"id", "name", "status", "currency", "property_value"},
+        )
+
+        expanded = client.get(
+            f"/escrows/{escrow['id']}/"
+            "?fields=id,broker_representations.status&expand=commission_pool"
+        ).data
+        self.assertEqual(
+            set(expanded), {"id", "broker_representations", "commission_pool"}
+        )
+        self.assertEqual(
+            expanded["broker_representations"], [{"status": BrokerStatus.ACCEPTED}]
+        )
+        self.assertIn("shares", expanded["commission_pool"])
+
+        collapsed = client.get(f"/escrows/{escrow['id']}/?expand=").data
+        self.assertIn("property_address", collapsed)
+        self.assertNotIn("parties", collapsed)
+        self.assertNotIn("created_by", collapsed)
+
+    def test_escrow_list_query_count_is_constant(self):
+        client_a = self.client_for(self.user_a)
+        for _ in range(2):
+            escrow = self.create_escrow(client_a)
+            client_a.post(
+                f"/escrows/{escrow['id']}/brokers/",
+                {
+                    "invited_email": self.user_b.email,
+                    "invited_as": BrokerRole.CO_BROKER,
+                },
+                format="json",
+            )
+            client_a.post(
+                f"/escrows/{escrow['id']}/parties/",
+                {"name": "Jane Buyer", "role": PartyRole.BUYER},
+                format="json",
+            )
+
+        # escrows + parties + broker representations + commission shares
+        with self.assertNumQueries(4):
+            response = client_a.get("/escrows/")
+        self.assertEqual(len(response.data["results"]), 2)
+        co_broker = response.data["results"][0]["broker_representations"][1]
+        self.assertEqual(co_broker["invited_by"]["id"], self.user_a.id)
+
+    def test_strict_mode_rejects_lazy_relation_loads(self):
+        client = self.client_for(self.user_a)
+        escrow = self.create_escrow(client)
+        instance = Escrow.objects.only("id").get(pk=escrow["id"])
+        with self.assertRaises(LazyRelationLoad), forbid_queries("test"):
+            instance.created_by
+
+    def test_my_invitations_lists_pending_invites(self):
+        client_a = self.client_for(self.user_a)
+        client_b = self.client_for(self.user_b)
+        first = self.create_escrow(client_a)
+        second = self.create_escrow(client_a)
+        invites = [
+            client_a.post(
+                f"/escrows/{escrow['id']}/brokers/",
+                {
+                    "invited_email": "BROKER.B@example.com",
+                    "invited_as": BrokerRole.CO_BROKER,
+                },
+                format="json",
+            ).data
+            for escrow in (first, second)
+        ]
+        client_b.patch(
+            f"/escrows/{first['id']}/brokers/{invites[0]['id']}/",
+            {"status": BrokerStatus.DECLINED},
+            format="json",
+        )
+
+        with self.assertNumQueries(1):
+            response = client_b.get("/me/invitations/")
+        self.assertEqual(
+            [item["id"] for item in response.data["results"]], [invites[1]["id"]]
+        )
+        self.assertEqual(response.data["results"][0]["escrow"]["name"], "Test Deal")
+        self.assertEqual(
+            response.data["results"][0]["invited_by"]["id"], self.user_a.id
+        )
+        self.assertEqual(client_a.get("/me/invitations/").data["results"], [])
+
+    def test_nested_routes_resolve_parent_once(self):
+        client = self.client_for(self.user_a)
+        escrow = self.create_escrow(client)
+        base = f"/escrows/{escrow['id']}"
+        party = client.post(
+            f"{base}/parties/",
+            {"name": "Jane Buyer", "role": PartyRole.BUYER},
+            format="json",
+        ).data
+        invite = client.post(
+            f"{base}/brokers/",
+            {"invited_email": self.user_b.email, "invited_as": BrokerRole.CO_BROKER},
+            format="json",
+        ).data
+
+        # One access-checked parent lookup, then the route's own statements
+        # (savepoints included for the transactional writes; pool writes also
+        # take the escrow and pool row locks first). Every write starts with one
+        # UPDATE moving the escrow's ETag, the pool read first checks for a
+        # frozen snapshot and locking writes that snapshot.
+        routes = [
+            ("get", f"{base}/parties/", None, 2),
+            (
+                "post",
+                f"{base}/parties/",
+                {"name": "Sam Seller", "role": PartyRole.SELLER},
+                5,
+            ),
+            ("get", f"{base}/parties/{party['id']}/", None, 2),
+            ("patch", f"{base}/parties/{party['id']}/", {"name": "Updated"}, 6),
+            ("delete", f"{base}/parties/{party['id']}/", None, 6),
+            ("get", f"{base}/brokers/", None, 2),
+            (
+                "post",
+                f"{base}/brokers/",
+                {
+                    "invited_email": "third@example.com",
+                    "invited_as": BrokerRole.CO_BROKER,
+                },
+                8,
+            ),
+            ("get", f"{base}/brokers/{invite['id']}/", None, 2),
+            (
+                "patch",
+                f"{base}/brokers/{invite['id']}/",
+                {"status": BrokerStatus.DECLINED},
+                8,
+            ),
+            ("delete", f"{base}/brokers/{invite['id']}/", None, 8),
+            ("get", f"{base}/commission-pool/", None, 3),
+            ("patch", f"{base}/commission-pool/", {"total_amount": "10.00"}, 12),
+            ("post", f"{base}/commission-pool/lock/", None, 13),
+        ]
+        for method, url, data, queries in routes:
+            with self.subTest(method=method, url=url), self.assertNumQueries(queries):
+                response = getattr(client, method)(url, data, format="json")
+                self.assertLess(response.status_code, 300)
+
+    def test_nested_routes_enforce_escrow_access(self):
+        escrow = self.create_escrow(self.client_for(self.user_a))
+        outsider = self.client_for(self.user_b)
+        for url in ("parties/", "brokers/", "commission-pool/"):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    outsider.get(f"/escrows/{escrow['id']}/{url}").status_code, 404
+                )
+
+    def test_outsider_pool_write_takes_no_locks(self):
+        escrow = self.create_escrow(self.client_for(self.user_a))
+        outsider = self.client_for(self.user_b)
+        base = f"/escrows/{escrow['id']}/commission-pool/"
+        for method, url, data in (
+            ("patch", base, {"total_amount": "1.00"}),
+            ("post", f"{base}lock/", None),
+        ):
+            with self.subTest(method=method), CaptureQueriesContext(
+                connection
+            ) as queries:
+                response = getattr(outsider, method)(url, data, format="json")
+            self.assertEqual(response.status_code, 404)
+            # The escrow lock matches no row and the pool is never read.
+            statements = [query["sql"] for query in queries]
+            self.assertFalse(any("escrows_commissionpool" in sql for sql in statements))
+        self.assertFalse(CommissionPool.objects.get(escrow_id=escrow["id"]).locked)
+
+    def test_commission_shares_apply_as_bulk_diff(self):
+        client = self.client_for(self.user_a)
+        escrow = self.create_escrow(client)
+        base = f"/escrows/{escrow['id']}"
+        for index in range(4):
+            client.post(
+                f"{base}/brokers/",
+                {
+                    "invited_email": f"co{index}@example.com",
+                    "invited_as": BrokerRole.CO_BROKER,
+                },
+                format="json",
+            )
+        brokers = [
+            item["id"] for item in client.get(f"{base}/brokers/").data["results"]
+        ]
+
+        client.patch(
+            f"{base}/commission-pool/",
+            {
+                "total_amount": "1000.00",
+                "shares": [
+                    {"broker_representation": pk, "amount": "100.00"}
+                    for pk in brokers[:3]
+                ],
+            },
+            format="json",
+        )
+        shares = [
+            {"broker_representation": brokers[0], "amount": "150.00"},
+            {"broker_representation": brokers[1], "amount": "100.00"},
+            {"broker_representation": brokers[3], "amount": "50.00"},
+            {"broker_representation": brokers[4], "amount": "50.00"},
+        ]
+        # savepoint, row locks (2), pool, version claim, shares, broker lookup,
+        # pool update, delete, bulk update, bulk insert, escrow ETag, release,
+        # re-read shares
+        with self.assertNumQueries(16):
+            response = client.patch(
+                f"{base}/commission-pool/", {"shares": shares}, format="json"
+            )
+        self.assertEqual(response.status_code, 200)
+        amounts = {
+            item["broker_representation"]: item["amount"]
+            for item in response.data["shares"]
+        }
+        self.assertEqual(
+            amounts,
+            {
+                brokers[0]: "150.00",
+                brokers[1]: "100.00",
+                brokers[3]: "50.00",
+                brokers[4]: "50.00",
+            },
+        )
+
+        # savepoint, row locks (2), pool, version claim, shares, broker lookup,
+        # rollback and release; the claim is rolled back with the rejected diff.
+        with self.assertNumQueries(9):
+            rejected = client.patch(
+                f"{base}/commission-pool/",
+                {
+                    "shares": [
+                        {"broker_representation": brokers[2], "amount": "5000.00"}
+                    ]
+                },
+                format="json",
+            )
+        self.assertEqual(rejected.status_code, 400)
+        self.assertEqual(len(client.get(f"{base}/commission-pool/").data["shares"]), 4)
+
+    def test_repeated_lock_is_idempotent(self):
+        client = self.client_for(self.user_a)
+        escrow = self.create_escrow(client)
+        url = f"/escrows/{escrow['id']}/commission-pool/lock/"
+
+        first = client.post(url)
+        # savepoint, row locks (2), pool, shares, release: no writes the second time.
+        with self.assertNumQueries(6):
+            second = client.post(url)
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+
+    def test_escrow_etag_and_conditional_requests(self):
+        client = self.client_for(self.user_a)
+        escrow = self.create_escrow(client)
+        url = f"/escrows/{escrow['id']}/"
+
+        detail = client.get(url)
+        etag = detail["ETag"]
+        self.assertEqual(etag, '"1"')
+
+        with self.assertNumQueries(1):
+            not_modified = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified["ETag"], etag)
+
+        updated = client.patch(
+            url, self.rename("Renamed"), format="json", HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(updated.status_code, 200)
+        self.assertEqual(updated["ETag"], '"2"')
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        stale = client.patch(
+            url, self.rename("Lost"), format="json", HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(stale.status_code, 412)
+        self.assertEqual(Escrow.objects.get(pk=escrow["id"]).name, "Renamed")
+
+        outsider = self.client_for(self.user_b)
+        self.assertEqual(
+            outsider.patch(
+                url, self.rename("x"), format="json", HTTP_IF_MATCH='"2"'
+            ).status_code,
+            404,
+        )
+
+        # Nested writes change the escrow representation and therefore its ETag.
+        client.post(
+            f"{url}parties/", {"name": "Jane", "role": PartyRole.BUYER}, format="json"
+        )
+        self.assertEqual(client.get(url)["ETag"], '"3"')
+
+        # So do edits of the users embedded in it.
+        self.user_a.first_name = "Renamed"
+        self.user_a.save()
+        detail = client.get(url)
+        self.assertEqual(detail["ETag"], '"4"')
+        self.assertIn("Authorization", detail["Vary"])
+
+        # Sparse fieldsets are other representations of the same version.
+        sparse = client.get(f"{url}?fields=id,name")
+        self.assertRegex(sparse["ETag"], r'^"4\.[0-9a-f]{12}"$')
+        self.assertEqual(client.get(f"{url}?fields=name,id,")["ETag"], sparse["ETag"])
+        self.assertEqual(
+            client.get(f"{url}?fields=id,name", HTTP_IF_NONE_MATCH='"4"').status_code,
+            200,
+        )
+        self.assertEqual(
+            client.get(
+                f"{url}?fields=id,name", HTTP_IF_NONE_MATCH=sparse["ETag"]
+            ).status_code,
+            304,
+        )
+        self.assertEqual(
+            client.patch(
+                url, self.rename("Sparse"), format="json", HTTP_IF_MATCH=sparse["ETag"]
+            ).status_code,
+            200,
+        )
+
+    def test_commission_pool_if_match(self):
+        client = self.client_for(self.user_a)
+        escrow = self.create_escrow(client)
+        url = f"/escrows/{escrow['id']}/commission-pool/"
+        etag = client.get(url)["ETag"]
+
+        first = client.patch(
+            url, {"total_amount": "10.00"}, format="json", HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(first.status_code, 200)
+        second = client.patch(
+            url, {"total_amount": "20.00"}, format="json", HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(second.status_code, 412)
+
+        refreshed = client.patch(
+            url, {"total_amount": "20.00"}, format="json", HTTP_IF_MATCH=first["ETag"]
+        )
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertEqual(refreshed.data["total_amount"], "20.00")
+        self.assertEqual(client.post(f"{url}lock/")["ETag"], '"4"')
+
+    def test_idempotency_key_replays_create(self):
+        cache.clear()
+        client = self.client_for(self.user_a)
+        headers = {
+            "HTTP_IDEMPOTENCY_KEY": "create-escrow-1",
+            "HTTP_ORIGIN": "http://localhost:5173",
+        }
+
+        first = client.post("/escrows/", self.escrow_payload, format="json", **headers)
+        retry = client.post("/escrows/", self.escrow_payload, format="json", **headers)
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data["id"], first.data["id"])
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertIn("Idempotent-Replayed", retry["Access-Control-Expose-Headers"])
+        self.assertEqual(Escrow.objects.count(), 1)
+        self.assertEqual(BrokerRepresentation.objects.count(), 1)
+
+        # Keys are scoped per user and bound to the original payload.
+        other = self.client_for(self.user_b).post(
+            "/escrows/", self.escrow_payload, format="json", **headers
+        )
+        self.assertNotEqual(other.data["id"], first.data["id"])
+        reused = client.post(
+            "/escrows/", self.rename("Other"), format="json", **headers
+        )
+        self.assertEqual(reused.status_code, 422)
+
+        invite = {"invited_email": "co@example.com", "invited_as": BrokerRole.CO_BROKER}
+        url = f"/escrows/{first.data['id']}/brokers/"
+        invited = client.post(
+            url, invite, format="json", HTTP_IDEMPOTENCY_KEY="invite-1"
+        )
+        again = client.post(url, invite, format="json", HTTP_IDEMPOTENCY_KEY="invite-1")
+        self.assertEqual(again.data, invited.data)
+
+    @override_settings(IDEMPOTENCY_WAIT=0.1)
+    def test_idempotency_key_waits_for_in_flight_request(self):
+        cache.clear()
+        client = self.client_for(self.user_a)
+        first = client.post(
+            "/escrows/", self.escrow_payload, format="json", HTTP_IDEMPOTENCY_KEY="a"
+        )
+        # Another worker holds key "b" and has not stored a response yet.
+        cache.set(
+            f"idempotency:{self.user_a.pk}:{hashlib.sha256(b'b').hexdigest()}:lock", "x"
+        )
+
+        busy = client.post(
+            "/escrows/", self.escrow_payload, format="json", HTTP_IDEMPOTENCY_KEY="b"
+        )
+        self.assertEqual(busy.status_code, 409)
+        self.assertEqual(busy["Retry-After"], "1")
+        self.assertEqual(Escrow.objects.count(), 1)
+        self.assertEqual(first.status_code, 201)
+
+    def test_escrow_reads_are_cached_until_invalidated(self):
+        client = self.client_for(self.user_a)
+        escrow = self.create_escrow(client)
+        url = f"/escrows/{escrow['id']}/"
+
+        self.assertEqual(client.get(url)["X-Cache"], "MISS")
+        api_cache.clear_local()
+        self.assertEqual(client.get(url)["X-Cache"], "HIT")
+        with self.assertNumQueries(0):
+            hit = client.get(url)
+        self.assertEqual(hit["X-Cache"], "HIT")
+        self.assertEqual(hit["ETag"], '"1"')
+
+        # Nested writes bump the escrow tag.
+        client.post(
+            f"{url}parties/", {"name": "Jane", "role": PartyRole.BUYER}, format="json"
+        )
+        refreshed = client.get(url)
+        self.assertEqual(refreshed["X-Cache"], "MISS")
+        self.assertEqual(refreshed["ETag"], '"2"')
+        self.assertEqual(self.client_for(self.user_b).get(url).status_code, 404)
+
+        self.assertEqual(len(client.get("/escrows/").data["results"]), 1)
+        self.assertEqual(client.get("/escrows/")["X-Cache"], "HIT")
+        self.create_escrow(client)
+        listed = client.get("/escrows/")
+        self.assertEqual(listed["X-Cache"], "MISS")
+        self.assertEqual(len(listed.data["results"]), 2)
+
+        # Saves outside the API are picked up through signals.
+        Escrow.objects.get(pk=escrow["id"]).save(update_fields=["name"])
+        self.assertEqual(client.get(url)["X-Cache"], "MISS")
+
+    def test_email_change_invalidates_cached_reads_of_both_addresses(self):
+        escrow = self.create_escrow(self.client_for(self.user_a))
+        url = f"/escrows/{escrow['id']}/"
+        self.client_for(self.user_a).post(
+            f"{url}brokers/",
+            {"invited_email": "moved@example.com", "invited_as": BrokerRole.CO_BROKER},
+            format="json",
+        )
+        client_b = self.client_for(self.user_b)
+        self.assertEqual(client_b.get("/escrows/").data["results"], [])
+        self.assertEqual(client_b.get(url).status_code, 404)
+        api_cache.clear_local()
+
+        user = User.objects.get(pk=self.user_b.pk)
+        user.email = "Moved@Example.com"
+        user.save()
+
+        client_b = self.client_for(User.objects.get(pk=self.user_b.pk))
+        listed = client_b.get("/escrows/")
+        self.assertEqual(listed["X-Cache"], "MISS")
+        self.assertEqual(
+            [item["id"] for item in listed.data["results"]], [escrow["id"]]
+        )
+        self.assertEqual(client_b.get(url).status_code, 200)
+
+    def test_locked_escrow_is_served_from_snapshot(self):
+        client = self.client_for(self.user_a)
+        escrow = self.create_escrow(client)
+        base = f"/escrows/{escrow['id']}"
+        client.patch(
+            f"{base}/commission-pool/", {"total_amount": "10.00"}, format="json"
+        )
+        Escrow.objects.filter(pk=escrow["id"]).update(
+            agreement_upload="agreements/deal.pdf"
+        )
+        client.post(f"{base}/commission-pool/lock/")
+
+        # Renaming the creator afterwards does not change the frozen representation.
+        User.objects.filter(pk=self.user_a.pk).update(first_name="Renamed")
+        with self.assertNumQueries(1):
+            detail = client.get(f"{base}/")
+        self.assertEqual(detail.data["status"], EscrowStatus.LOCKED)
+        self.assertEqual(detail.data["created_by"]["first_name"], "Broker")
+        self.assertEqual(detail.data["commission_pool"]["total_amount"], "10.00")
+        self.assertEqual(
+            detail.data["agreement_upload"],
+            "http://testserver/media/agreements/deal.pdf",
+        )
+        self.assertEqual(detail["ETag"], '"3"')
+        self.assertIn("immutable", detail["Cache-Control"])
+        self.assertIn("private", detail["Cache-Control"])
+        self.assertIn("Authorization", detail["Vary"])
+        cached = client.get(f"{base}/")
+        self.assertEqual(cached["X-Cache"], "HIT")
+        self.assertEqual(cached["Cache-Control"], detail["Cache-Control"])
+
+        sparse = client.get(f"{base}/?fields=id,status&expand=commission_pool")
+        self.assertEqual(set(sparse.data), {"id", "status", "commission_pool"})
+        self.assertNotEqual(sparse["ETag"], detail["ETag"])
+        self.assertEqual(
+            client.get(
+                f"{base}/?fields=id,status&expand=commission_pool",
+                HTTP_IF_NONE_MATCH='"3"',
+            ).status_code,
+            200,
+        )
+        with self.assertNumQueries(1):
+            not_modified = client.get(f"{base}/", HTTP_IF_NONE_MATCH='"3"')
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertIn("immutable", not_modified["Cache-Control"])
+
+        with self.assertNumQueries(1):
+            pool = client.get(f"{base}/commission-pool/")
+        self.assertTrue(pool.data["locked"])
+        self.assertEqual(pool["ETag"], '"3"')
+        self.assertEqual(self.client_for(self.user_b).get(f"{base}/").status_code, 404)
+
+        # Locked escrows refuse writes.
+        writes = [
+            ("patch", f"{base}/", self.rename("Late")),
+            ("delete", f"{base}/", None),
+            (
+                "post",
+                f"{base}/parties/",
+                {"name": "Late Buyer", "role": PartyRole.BUYER},
+            ),
+            (
+                "patch",
+                f"{base}/brokers/{detail.data['broker_representations'][0]['id']}/",
+                {},
+            ),
+            ("patch", f"{base}/commission-pool/", {"total_amount": "20.00"}),
+        ]
+        for method, url, data in writes:
+            with self.subTest(method=method, url=url):
+                self.assertEqual(
+                    getattr(client, method)(url, data, format="json").status_code, 400
+                )
+        self.assertEqual(Escrow.objects.get(pk=escrow["id"]).version, 3)
+
+        # Both the lock and the backfill store the request-independent form.
+        frozen = EscrowSnapshot.objects.get().escrow_data
+        EscrowSnapshot.objects.all().delete()
+        call_command("freeze_locked_escrows", stdout=StringIO())
+        backfilled = EscrowSnapshot.objects.get().escrow_data
+        self.assertEqual(frozen["agreement_upload"], "/media/agreements/deal.pdf")
+        self.assertEqual(backfilled["agreement_upload"], frozen["agreement_upload"])
+        self.assertEqual(backfilled["commission_pool"]["total_amount"], "10.00")
+
+    def test_async_read_endpoints_match_sync_ones(self):
+        client = self.client_for(self.user_a)
+        escrow = self.create_escrow(client)
+        base = f"/escrows/{escrow['id']}"
+        urls = [
+            "/escrows/",
+            f"{base}/",
+            f"{base}/parties/",
+            f"{base}/brokers/",
+            "/users/me/",
+        ]
+        expected = {url: client.get(url).data for url in urls}
+
+        cache.clear()
+        api_cache.clear_local()
+        with override_settings(ROOT_URLCONF="config.urls_async"):
+            for url in urls:
+                with self.subTest(url=url):
+                    self.assertTrue(iscoroutinefunction(resolve(url).func))
+                    response = client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response.data, expected[url])
+            self.assertEqual(client.get(f"{base}/")["X-Cache"], "HIT")
+            self.assertEqual(
+                client.get(f"{base}/", HTTP_IF_NONE_MATCH='"1"').status_code, 304
+            )
+
+            # Writes on the same paths still reach the DRF views.
+            created = client.post(
+                f"{base}/parties/", {"name": "Jane", "role": PartyRole.BUYER}
+            )
+            self.assertEqual(created.status_code, 201)
+            self.assertEqual(len(client.get(f"{base}/parties/").data["results"]), 1)
+            self.assertEqual(
+                self.client_for(self.user_b).get(f"{base}/").status_code, 404
+            )
+            self.assertEqual(
+                self.client_for(self.user_b).get(f"{base}/parties/").status_code, 404
+            )
+            self.assertEqual(APIClient().get("/escrows/").status_code, 401)
+
+    @override_settings(PREFETCH_PLANNER_STRICT=False, QUERY_BUDGETS={})
+    def test_async_reads_load_missed_relations_off_the_event_loop(self):
+        client = self.client_for(self.user_a)
+        escrow = self.create_escrow(client)
+        urls = ["/escrows/", f"/escrows/{escrow['id']}/"]
+        expected = {url: client.get(url).data for url in urls}
+
+        cache.clear()
+        api_cache.clear_local()
+        # Without the plan every relation is loaded lazily while serializing.
+        unplanned = mock.patch.object(QueryPlanMixin, "plan", lambda self, qs: qs)
+        with override_settings(ROOT_URLCONF="config.urls_async"), unplanned:
+            for url in urls:
+                with self.subTest(url=url):
+                    response = client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response.data, expected[url])
+
+
+@skipUnless(
+    connection.vendor == "postgresql", "row locks need a real PostgreSQL database"
+)
+class CommissionPoolConcurrencyTests(TransactionTestCase):
+    def test_parallel_lock_and_patch_requests_serialize(self):
+        owner = User.objects.create_user(email="owner@example.com", password="pass1234")
+        client = APIClient()
+        client.force_authenticate(owner)
+        escrow = client.post(
+            "/escrows/", EscrowAPITests.escrow_payload, format="json"
+        ).data
+        base = f"/escrows/{escrow['id']}/commission-pool/"
+
+        def request(index):
+            worker = APIClient()
+            worker.force_authenticate(owner)
+            try:
+                if index % 2:
+                    return "lock", worker.post(f"{base}lock/")
+                return "patch", worker.patch(
+                    base, {"total_amount": f"{index}.00"}, format="json"
+                )
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(request, range(40)))
+
+        locks = [response for kind, response in results if kind == "lock"]
+        patches = [response for kind, response in results if kind == "patch"]
+        self.assertTrue(all(response.status_code == 200 for response in locks))
+        self.assertEqual(len({response.data["locked_at"] for response in locks}), 1)
+        self.assertTrue(all(response.status_code in (200, 400) for response in patches))
+
+        pool = CommissionPool.objects.select_related("escrow").get(
+            escrow_id=escrow["id"]
+        )
+        self.assertTrue(pool.locked)
+        self.assertEqual(pool.escrow.status, EscrowStatus.LOCKED)
+        applied = {
+            response.data["total_amount"]
+            for response in patches
+            if response.status_code == 200
+        }
+        self.assertTrue(not applied or str(pool.total_amount) in applied)
+
+
+@skipUnless(connection.vendor == "postgresql", "the estimate reads a PostgreSQL plan")
+class EstimatedCountTests(TestCase):
+    def test_list_reports_planner_estimate(self):
+        owner = User.objects.create_user(email="owner@example.com", password="pass1234")
+        client = APIClient()
+        client.force_authenticate(owner)
+        for _ in range(3):
+            client.post("/escrows/", EscrowAPITests.escrow_payload, format="json")
+
+        response = client.get("/escrows/?count=estimate")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.data["count"], int)
+        self.assertGreaterEqual(response.data["count"], 0)
+        self.assertEqual(len(response.data["results"]), 3)
+
+
+@skipUnless(
+    settings.DATABASES.get("replica", {}).get("ENGINE", "").endswith("sqlite3"),
+    "needs the separate SQLite database standing in for the replica",
+)
+@override_settings(READ_REPLICA="replica", REPLICA_STICKY_SECONDS=60)
+class ReplicaRoutingTests(TestCase):
+    # Writes land in "default" only, so the replica behaves as one lagging
+    # behind everything written during the test.
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        api_cache.clear_local()
+        self.user = User.objects.create_user(
+            email="owner@example.com", password="pass1234"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_reads_use_replica_unless_user_recently_wrote(self):
+        escrow = self.client.post(
+            "/escrows/", EscrowAPITests.escrow_payload, format="json"
+        ).data
+        url = f"/escrows/{escrow['id']}/"
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        # Once the pin expires reads go to the replica, which has not caught up.
+        cache.clear()
+        self.assertEqual(self.client.get(url).status_code, 404)
+        with override_settings(ROOT_URLCONF="config.urls_async"):
+            self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get("/escrows/").data["results"], [])
+        self.assertEqual(self.client.get(f"{url}commission-pool/").status_code, 404)
+
+        patched = self.client.patch(
+            f"{url}commission-pool/", {"total_amount": "5.00"}, format="json"
+        )
+        self.assertEqual(patched.status_code, 200)
+        pool = self.client.get(f"{url}commission-pool/")
+        self.assertEqual(pool.data["total_amount"], "5.00")
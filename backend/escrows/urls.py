@@ -5,6 +5,7 @@ from .views import (
     BrokerRepresentationViewSet,
     CommissionPoolViewSet,
     EscrowViewSet,
+    InvitationViewSet,
     PartyViewSet,
 )
 
@@ -28,7 +29,10 @@ commission_pool_detail = CommissionPoolViewSet.as_view(
 )
 commission_pool_lock = CommissionPoolViewSet.as_view({"post": "lock"})
 
+my_invitations = InvitationViewSet.as_view({"get": "list"})
+
 urlpatterns = router.urls + [
+    path("me/invitations/", my_invitations, name="my-invitations"),
     path("escrows/<int:escrow_pk>/parties/", party_list, name="party-list"),
     path(
         "escrows/<int:escrow_pk>/parties/<int:pk>/",
@@ -1,113 +1,299 @@
 from __future__ import annotations
 
-from django.db.models import Q
+from django.db import transaction
+from django.http import Http404
+from django.shortcuts import get_object_or_404
 from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.response import Response
 
-from .models import BrokerRepresentation, BrokerStatus, CommissionPool, Escrow, Party
+from accounts.authentication import ClaimsJWTAuthentication
+from config.db_router import ReplicaReadMixin
+
+from .access import accessible_escrow_ids, pending_invitations
+from .caching import CachedEscrowReadMixin
+from .concurrency import ConditionalRequestMixin, touch_escrow
+from .idempotency import IdempotentCreateMixin
+from .models import (
+    BrokerRepresentation,
+    CommissionPool,
+    Escrow,
+    EscrowStatus,
+    Party,
+    lock_commission_rows,
+)
+from .pagination import (
+    EscrowCursorPagination,
+    InvitationCursorPagination,
+    NestedCursorPagination,
+)
+from .prefetch import QueryPlanMixin
+from .selection import FieldSelection
 from .serializers import (
     BrokerRepresentationSerializer,
     CommissionPoolSerializer,
     EscrowSerializer,
+    InvitationSerializer,
     PartySerializer,
 )
+from .snapshots import FrozenReadMixin, freeze_escrow
+
 
+def escrow_locked() -> ValidationError:
+    return ValidationError("Escrow is locked")
 
-class EscrowViewSet(viewsets.ModelViewSet):
+
+class EscrowViewSet(
+    ReplicaReadMixin,
+    CachedEscrowReadMixin,
+    IdempotentCreateMixin,
+    FrozenReadMixin,
+    ConditionalRequestMixin,
+    QueryPlanMixin,
+    viewsets.ModelViewSet,
+):
     serializer_class = EscrowSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = EscrowCursorPagination
+
+    def get_field_selection(self) -> FieldSelection:
+        if self.request.method not in SAFE_METHODS:
+            return FieldSelection()
+        if not hasattr(self, "_field_selection"):
+            self._field_selection = FieldSelection.from_request(self.request)
+        return self._field_selection
+
+    def etag_variant(self) -> str:
+        return self.get_field_selection().digest()
 
     def get_queryset(self):
         user = self.request.user
         status_filter = self.request.query_params.get("status")
-        qs = (
-            Escrow.objects.select_related("created_by", "commission_pool")
-            .prefetch_related("parties", "broker_representations")
-            .filter(
-                Q(created_by=user)
-                | Q(broker_representations__user=user)
-                | Q(broker_representations__invited_email=user.email)
-            )
-            .distinct()
-        )
+        qs = Escrow.objects.filter(pk__in=accessible_escrow_ids(user))
         if status_filter:
             qs = qs.filter(status=status_filter)
-        return qs
+        return self.plan(qs)
+
+    def get_planning_serializer(self):
+        return self.get_serializer_class()(
+            context=super().get_serializer_context(),
+            selection=self.get_field_selection(),
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("selection", self.get_field_selection())
+        return super().get_serializer(*args, **kwargs)
+
+    def shape_snapshot(self, data):
+        return self.get_field_selection().prune_data(data)
 
     def perform_create(self, serializer):
         serializer.save()
 
+    def perform_update(self, serializer):
+        if serializer.instance.status == EscrowStatus.LOCKED:
+            raise escrow_locked()
+        super().perform_update(serializer)
 
-class PartyViewSet(viewsets.ModelViewSet):
-    serializer_class = PartySerializer
+    def perform_destroy(self, instance):
+        if instance.status == EscrowStatus.LOCKED:
+            raise escrow_locked()
+        super().perform_destroy(instance)
+
+
+class InvitationViewSet(QueryPlanMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Pending co-broker invitations addressed to the current user."""
+
+    # Only the caller's id and email are needed, both carried by the token.
+    authentication_classes = [ClaimsJWTAuthentication]
+    serializer_class = InvitationSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = None
+    pagination_class = InvitationCursorPagination
 
     def get_queryset(self):
-        escrow = Escrow.objects.get(pk=self.kwargs["escrow_pk"])
-        qs = escrow.parties.all()
-        role_filter = self.request.query_params.get("role")
-        if role_filter:
-            qs = qs.filter(role=role_filter)
-        return qs
+        return self.plan(pending_invitations(self.request.user))
+
+
+class EscrowNestedMixin:
+    """Resolve the parent escrow of a nested route once per request.
+
+    The lookup doubles as the access check: escrows the user cannot see answer
+    404. The resolved row is reused by ``get_queryset``, the serializer context
+    and any custom actions.
+    """
+
+    escrow_fields = ("id", "status", "created_by")
+
+    def get_escrow(self) -> Escrow:
+        if not hasattr(self, "_escrow"):
+            queryset = Escrow.objects.filter(
+                pk__in=accessible_escrow_ids(self.request.user)
+            )
+            self._escrow = get_object_or_404(
+                queryset.only(*self.escrow_fields), pk=self.kwargs["escrow_pk"]
+            )
+        return self._escrow
+
+    async def aget_escrow(self) -> Escrow:
+        if not hasattr(self, "_escrow"):
+            queryset = Escrow.objects.filter(
+                pk__in=accessible_escrow_ids(self.request.user)
+            )
+            try:
+                self._escrow = await queryset.only(*self.escrow_fields).aget(
+                    pk=self.kwargs["escrow_pk"]
+                )
+            except Escrow.DoesNotExist as exc:
+                raise Http404 from exc
+        return self._escrow
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
-        context["escrow"] = Escrow.objects.get(pk=self.kwargs["escrow_pk"])
+        context["escrow"] = self.get_escrow()
         return context
 
+    async def alist(self, request, *args, **kwargs):
+        await self.aget_escrow()
+        return await super().alist(request, *args, **kwargs)
+
+    def claim_escrow(self) -> None:
+        """Move the escrow's ETag ahead of a nested write; locked escrows refuse it.
 
-class BrokerRepresentationViewSet(viewsets.ModelViewSet):
+        Nested resources are part of the escrow representation, so every write
+        to them changes the escrow's ETag as well.
+        """
+        if not touch_escrow(self.get_escrow().pk):
+            raise escrow_locked()
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        self.claim_escrow()
+        super().perform_create(serializer)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        self.claim_escrow()
+        super().perform_update(serializer)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        self.claim_escrow()
+        super().perform_destroy(instance)
+
+
+class PartyViewSet(
+    ReplicaReadMixin,
+    IdempotentCreateMixin,
+    EscrowNestedMixin,
+    QueryPlanMixin,
+    viewsets.ModelViewSet,
+):
+    serializer_class = PartySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NestedCursorPagination
+
+    def get_queryset(self):
+        qs = Party.objects.filter(escrow=self.get_escrow())
+        role_filter = self.request.query_params.get("role")
+        if role_filter:
+            qs = qs.filter(role=role_filter)
+        return self.plan(qs)
+
+
+class BrokerRepresentationViewSet(
+    ReplicaReadMixin,
+    IdempotentCreateMixin,
+    EscrowNestedMixin,
+    QueryPlanMixin,
+    viewsets.ModelViewSet,
+):
     serializer_class = BrokerRepresentationSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = None
+    pagination_class = NestedCursorPagination
 
     def get_queryset(self):
-        escrow = Escrow.objects.get(pk=self.kwargs["escrow_pk"])
-        qs = escrow.broker_representations.all()
+        qs = BrokerRepresentation.objects.filter(escrow=self.get_escrow())
         invited_as = self.request.query_params.get("invited_as")
         status_filter = self.request.query_params.get("status")
         if invited_as:
             qs = qs.filter(invited_as=invited_as)
         if status_filter:
             qs = qs.filter(status=status_filter)
-        return qs
-
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context["escrow"] = Escrow.objects.get(pk=self.kwargs["escrow_pk"])
-        return context
+        return self.plan(qs)
 
 
 class CommissionPoolViewSet(
-    mixins.RetrieveModelMixin, mixins.UpdateModelMixin, viewsets.GenericViewSet
+    ReplicaReadMixin,
+    EscrowNestedMixin,
+    FrozenReadMixin,
+    ConditionalRequestMixin,
+    QueryPlanMixin,
+    mixins.RetrieveModelMixin,
+    mixins.UpdateModelMixin,
+    viewsets.GenericViewSet,
 ):
     serializer_class = CommissionPoolSerializer
     permission_classes = [permissions.IsAuthenticated]
+    snapshot_field = "escrow__snapshot__pool_data"
+    snapshot_file_fields = ()
 
     def get_queryset(self):
-        return CommissionPool.objects.filter(escrow_id=self.kwargs["escrow_pk"])
+        queryset = CommissionPool.objects.filter(
+            escrow_id__in=accessible_escrow_ids(self.request.user)
+        ).select_related("escrow")
+        return self.plan(queryset)
+
+    def get_plan_extra_only(self):
+        escrow_fields = tuple(f"escrow__{name}" for name in self.escrow_fields)
+        return (*super().get_plan_extra_only(), *escrow_fields)
+
+    def get_version_queryset(self):
+        return self.get_queryset().filter(escrow_id=self.kwargs["escrow_pk"])
 
     def get_object(self):
-        return self.get_queryset().get()
+        """Resolve the pool and its escrow in one access-checked query per request.
+
+        Writes first take the escrow and pool row locks, so the state they validate
+        against cannot change before they commit. The lock is access-checked too:
+        escrows the user cannot see answer 404 without being locked.
+        """
+        if not hasattr(self, "_pool"):
+            if self.request.method not in SAFE_METHODS:
+                visible = accessible_escrow_ids(self.request.user)
+                if not lock_commission_rows(self.kwargs["escrow_pk"], visible):
+                    raise Http404
+            self._pool = get_object_or_404(
+                self.get_queryset(), escrow_id=self.kwargs["escrow_pk"]
+            )
+        return self._pool
+
+    def get_escrow(self) -> Escrow:
+        return self.get_object().escrow
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context["pool"] = self.get_object()
         return context
 
+    def claim_write(self) -> bool:
+        # Take the row locks and load the pool before claiming its version, then
+        # keep the loaded copy current so the save does not write the old version
+        # back. Locked pools are rejected by the serializer, rolling the claim back.
+        pool = self.get_object()
+        claimed = super().claim_write()
+        if claimed:
+            pool.version += 1
+        return claimed
+
     @action(detail=False, methods=["post"], url_path="lock")
+    @transaction.atomic
     def lock(self, request, escrow_pk=None):
         pool = self.get_object()
-        if pool.locked:
-            return Response({"detail": "Commission pool already locked"}, status=400)
-        pool.lock()
+        if pool.lock():
+            freeze_escrow(pool.escrow_id)
         serializer = self.get_serializer(pool)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-
-    def update(self, request, *args, **kwargs):
-        pool = self.get_object()
-        if pool.locked:
-            return Response({"detail": "Commission pool is locked"}, status=400)
-        return super().update(request, *args, **kwargs)
+        return self.with_etag(
+            Response(serializer.data, status=status.HTTP_200_OK), pool
+        )
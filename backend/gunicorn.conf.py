@@ -0,0 +1,118 @@
+"""Gunicorn settings for the backend, loaded from the working directory.
+
+Workers and threads are sized from the CPUs available to the process: one
+worker per CPU plus one, each running two threads, so database and cache waits
+overlap without a process per connection. Every value can be overridden with
+a ``GUNICORN_*`` environment variable, and command-line flags still win
+(``-k uvicorn.workers.UvicornWorker`` for ``config.asgi``).
+
+With ``preload_app`` the master imports Django and runs ``config.warmup``
+before forking, so workers start warm and share its memory pages.
+``GUNICORN_RELOAD=1`` (used by docker-compose) turns preloading off, reloads
+on code changes, and warms each worker instead.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv(Path(__file__).resolve().parent / ".env")
+
+
+def env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS.
+        return os.cpu_count() or 1
+
+
+cpus = available_cpus()
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = env_int("GUNICORN_WORKERS", cpus + 1)
+threads = env_int("GUNICORN_THREADS", 2)
+worker_class = "gthread" if threads > 1 else "sync"
+
+reload = os.environ.get("GUNICORN_RELOAD", "0") == "1"
+preload_app = not reload
+
+# Recycle workers to cap slow memory growth; the jitter staggers restarts.
+max_requests = env_int("GUNICORN_MAX_REQUESTS", 1000)
+max_requests_jitter = env_int("GUNICORN_MAX_REQUESTS_JITTER", 100)
+
+timeout = env_int("GUNICORN_TIMEOUT", 30)
+graceful_timeout = env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+keepalive = env_int("GUNICORN_KEEPALIVE", 5)
+
+# Heartbeat files on tmpfs, so a slow disk cannot make the master kill workers.
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+# Workers write Prometheus metrics to files here and /metrics/ adds them up
+# (see config.metrics). Set and emptied while gunicorn reads this file, before
+# the master imports the app with preload_app; files left by a previous run
+# would be added to this run's totals. A HUP re-reads this file in the same
+# master, whose environment remembers that the directory is already in use.
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(worker_tmp_dir, "escrow-metrics")
+)
+if os.environ.get("ESCROW_METRICS_DIR_CLEARED") != metrics_dir:
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+    os.environ["ESCROW_METRICS_DIR_CLEARED"] = metrics_dir
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+REPORTED = (
+    "bind",
+    "workers",
+    "worker_class_str",
+    "threads",
+    "preload_app",
+    "reload",
+    "max_requests",
+    "max_requests_jitter",
+    "timeout",
+    "graceful_timeout",
+    "keepalive",
+)
+
+
+def warm(log, where: str) -> None:
+    from config.warmup import warm_up
+
+    counts = warm_up()
+    log.info(
+        "Warmed up %s: %s",
+        where,
+        ", ".join(f"{key}={value}" for key, value in counts.items()),
+    )
+
+
+def when_ready(server):
+    settings = ", ".join(f"{name}={getattr(server.cfg, name)}" for name in REPORTED)
+    server.log.info("Effective settings: %s", settings)
+    if server.cfg.preload_app:
+        warm(server.log, "master")
+
+
+def post_worker_init(worker):
+    if not worker.cfg.preload_app:
+        warm(worker.log, f"worker {worker.pid}")
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges; its counters stay in the totals.
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -96,4 +96,18 @@ apiClient.interceptors.response.use(
   },
 );
 
+const idempotencyKeys = new WeakMap<object, string>();
+
+// Retries of a mutation reuse the same payload object, so they share one
+// Idempotency-Key and the backend replays the first response instead of
+// creating a duplicate.
+export function idempotencyHeaders(payload: object) {
+  let key = idempotencyKeys.get(payload);
+  if (!key) {
+    key = crypto.randomUUID();
+    idempotencyKeys.set(payload, key);
+  }
+  return { 'Idempotency-Key': key };
+}
+
 export default apiClient;
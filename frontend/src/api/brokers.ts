@@ -1,14 +1,32 @@
-import apiClient from './apiClient';
-import { BrokerRepresentation } from './escrows';
+import apiClient, { idempotencyHeaders } from './apiClient';
+import { BrokerRepresentation, listAllPages, PaginatedResponse } from './escrows';
 
 export async function listBrokers(
   escrowId: number,
   params?: { invited_as?: string; status?: string },
 ) {
-  const response = await apiClient.get<BrokerRepresentation[]>(
-    `/escrows/${escrowId}/brokers/`,
-    { params },
-  );
+  return listAllPages<BrokerRepresentation>(`/escrows/${escrowId}/brokers/`, params);
+}
+
+export interface Invitation {
+  id: number;
+  escrow: {
+    id: number;
+    name: string;
+    status: string;
+    transaction_type: string;
+    currency: string;
+    property_value: string;
+  };
+  invited_email: string;
+  invited_by: { id: number; email: string } | null;
+  invited_as: string;
+  status: string;
+  invited_at: string;
+}
+
+export async function listMyInvitations(cursorUrl?: string | null) {
+  const response = await apiClient.get<PaginatedResponse<Invitation>>(cursorUrl ?? '/me/invitations/');
   return response.data;
 }
 
@@ -16,6 +34,7 @@ export async function inviteBroker(escrowId: number, payload: { invited_email: s
   const response = await apiClient.post<BrokerRepresentation>(
     `/escrows/${escrowId}/brokers/`,
     payload,
+    { headers: idempotencyHeaders(payload) },
   );
   return response.data;
 }
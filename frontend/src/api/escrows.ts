@@ -1,7 +1,7 @@
-import apiClient from './apiClient';
+import apiClient, { idempotencyHeaders } from './apiClient';
 
 export interface PaginatedResponse<T> {
-  count: number;
+  count?: number;
   next: string | null;
   previous: string | null;
   results: T[];
@@ -131,16 +131,25 @@ export async function createEscrow(payload: CreateEscrowPayload) {
   });
 
   const response = await apiClient.post<Escrow>('/escrows/', formData, {
-    headers: { 'Content-Type': 'multipart/form-data' },
+    headers: { 'Content-Type': 'multipart/form-data', ...idempotencyHeaders(payload) },
   });
   return response.data;
 }
 
+// Follows the cursor's `next` links so callers get the whole list, not just its first page.
+export async function listAllPages<T>(url: string, params?: Record<string, string | undefined>) {
+  const results: T[] = [];
+  let response = await apiClient.get<PaginatedResponse<T>>(url, { params });
+  results.push(...response.data.results);
+  while (response.data.next) {
+    response = await apiClient.get<PaginatedResponse<T>>(response.data.next);
+    results.push(...response.data.results);
+  }
+  return results;
+}
+
 export async function listParties(escrowId: number, role?: string) {
-  const response = await apiClient.get<Party[]>(`/escrows/${escrowId}/parties/`, {
-    params: role ? { role } : undefined,
-  });
-  return response.data;
+  return listAllPages<Party>(`/escrows/${escrowId}/parties/`, role ? { role } : undefined);
 }
 
 export async function createParty(escrowId: number, payload: Omit<Party, 'id' | 'escrow' | 'created_at'>) {
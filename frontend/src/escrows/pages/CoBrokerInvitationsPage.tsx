@@ -1,33 +1,31 @@
 import styles from '../../components/escrows.module.css';
-import { useEscrows, useRespondToBrokerInvitation } from '@/hooks/escrows';
-import { useAuth } from '@/auth/authHooks';
+import { useMyInvitations, useRespondToBrokerInvitation } from '@/hooks/escrows';
 
 export function CoBrokerInvitationsPage() {
-  const { user } = useAuth();
-  const { data, isLoading } = useEscrows();
+  const { data, isLoading, hasNextPage, fetchNextPage, isFetchingNextPage } = useMyInvitations();
 
-  const invitations = (data?.results ?? [])
-    .flatMap((escrow) =>
-      escrow.broker_representations
-        .filter(
-          (broker) =>
-            broker.status === 'PENDING' &&
-            (broker.invited_email === user?.email || broker.user?.email === user?.email),
-        )
-        .map((broker) => ({ escrow, broker })),
-    )
-    .flat();
+  const invitations = (data?.pages ?? []).flatMap((page) => page.results);
 
   return (
     <section className={styles.page}>
       <h2>Co-broker invitations</h2>
       {isLoading && <p>Loading invitations...</p>}
-      {invitations.length === 0 && <p>No pending invitations.</p>}
+      {!isLoading && invitations.length === 0 && <p>No pending invitations.</p>}
       <div className={styles.grid}>
-        {invitations.map(({ escrow, broker }) => (
-          <InvitationCard key={broker.id} escrowId={escrow.id} escrowName={escrow.name} brokerId={broker.id} />
+        {invitations.map((invitation) => (
+          <InvitationCard
+            key={invitation.id}
+            escrowId={invitation.escrow.id}
+            escrowName={invitation.escrow.name}
+            brokerId={invitation.id}
+          />
         ))}
       </div>
+      {hasNextPage && (
+        <button type="button" onClick={() => fetchNextPage()} disabled={isFetchingNextPage}>
+          {isFetchingNextPage ? 'Loading...' : 'Load more'}
+        </button>
+      )}
     </section>
   );
 }
@@ -1,4 +1,4 @@
-import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
+import { useInfiniteQuery, useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
 
 import {
   createEscrow,
@@ -11,7 +11,7 @@ import {
   type CreateEscrowPayload,
   type Party,
 } from '@/api/escrows';
-import { inviteBroker, listBrokers, respondToInvitation } from '@/api/brokers';
+import { inviteBroker, listBrokers, listMyInvitations, respondToInvitation } from '@/api/brokers';
 import {
   getCommissionPool,
   lockCommissionPool,
@@ -121,6 +121,15 @@ export function useRespondToBroker(escrowId: number, brokerId: number) {
   });
 }
 
+export function useMyInvitations() {
+  return useInfiniteQuery({
+    queryKey: ['me', 'invitations'],
+    queryFn: ({ pageParam }) => listMyInvitations(pageParam),
+    initialPageParam: null as string | null,
+    getNextPageParam: (lastPage) => lastPage.next,
+  });
+}
+
 export function useRespondToBrokerInvitation(escrowId: number) {
   const queryClient = useQueryClient();
   return useMutation({
@@ -128,6 +137,7 @@ export function useRespondToBrokerInvitation(escrowId: number) {
       respondToInvitation(escrowId, brokerId, { status }),
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['escrow', escrowId, 'brokers'] });
+      queryClient.invalidateQueries({ queryKey: ['me', 'invitations'] });
       queryClient.invalidateQueries({ queryKey: ['escrows'] });
       queryClient.invalidateQueries({ queryKey: ['escrow', escrowId] });
     },